@@ -0,0 +1,169 @@
+import os
+from typing import List, Optional, Type
+
+from crewai import Agent
+from langchain_openai import ChatOpenAI
+from langchain_core.tools import BaseTool
+
+from tools import FinancialDocumentTool, InvestmentAnalysisTool, RiskAssessmentTool
+from config import CREW_PARALLEL_TASKS, LLM_MODEL, LLM_TEMPERATURE
+from agents import llm_cache, rate_limiter
+from rate_limit import estimate_tokens, task_job
+from telemetry import annotate, span, task_name, task_span
+from metrics import LLM_REQUESTS, LLM_TOKENS, STAGE_DURATION
+
+# Imported by the registry in agents.py on first use, so crewai and
+# langchain-openai are not loaded until an agent is actually needed
+
+# Completion tokens reserved per call until the real usage is reported
+ESTIMATED_COMPLETION_TOKENS = 500
+
+class RateLimitedChatOpenAI(ChatOpenAI):
+    """ChatOpenAI that waits for the shared rate limiter before each API call.
+    
+    Cache hits never reach _generate, so they use no rate limit capacity.
+    """
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        estimated = sum(estimate_tokens(str(message.content)) for message in messages)
+        estimated += ESTIMATED_COMPLETION_TOKENS
+        
+        with span("llm.generate", {"llm.model": self.model_name, "llm.messages": len(messages)}):
+            with span("llm.rate_limit.wait"):
+                rate_limiter.acquire(tokens=estimated)
+            
+            result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            usage = (result.llm_output or {}).get("token_usage") or {}
+            annotate({
+                "llm.prompt_tokens": usage.get("prompt_tokens"),
+                "llm.completion_tokens": usage.get("completion_tokens"),
+                "llm.total_tokens": usage.get("total_tokens")
+            })
+        
+        LLM_REQUESTS.inc(model=self.model_name)
+        LLM_TOKENS.inc(usage.get("prompt_tokens") or 0, model=self.model_name, direction="prompt")
+        LLM_TOKENS.inc(usage.get("completion_tokens") or 0, model=self.model_name, direction="completion")
+        if usage.get("total_tokens"):
+            rate_limiter.record_usage(estimated, usage["total_tokens"])
+        return result
+
+class TracedAgent(Agent):
+    """Agent that records a span and a stage latency for every task it executes."""
+    
+    def execute_task(self, task, context=None, tools=None):
+        stage = task_name(task) or self.role
+        with task_job(task), task_span(task, self.role), STAGE_DURATION.time(stage=stage):
+            return super().execute_task(task, context=context, tools=tools)
+
+def create_llm() -> ChatOpenAI:
+    """Create and configure the language model with error handling."""
+    try:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable not set")
+            
+        return RateLimitedChatOpenAI(
+            model_name=LLM_MODEL,
+            temperature=LLM_TEMPERATURE,
+            max_retries=3,
+            request_timeout=60,
+            openai_api_key=api_key,
+            cache=llm_cache if llm_cache is not None else False,
+            model_kwargs={
+                "top_p": 0.9,
+                "frequency_penalty": 0.1,
+                "presence_penalty": 0.1,
+            }
+        )
+    except Exception as e:
+        raise RuntimeError(f"Failed to initialize language model: {str(e)}")
+
+class FinancialAnalystAgent(TracedAgent):
+    """Enhanced Financial Analyst Agent with specialized configurations."""
+    
+    def __init__(self, llm: ChatOpenAI, tools: Optional[List[Type[BaseTool]]] = None):
+        super().__init__(
+            role="Senior Financial Analyst",
+            goal=(
+                "Provide accurate, comprehensive, and insightful financial analysis "
+                "based on documents including financial statements, annual reports, "
+                "and market data."
+            ),
+            backstory=(
+                "You are a CFA-certified financial analyst with 15+ years of experience "
+                "in equity research and financial modeling. You have a proven track record "
+                "of identifying key financial trends, performing ratio analysis, and "
+                "providing actionable investment theses. Your analysis is known for "
+                "being thorough, data-driven, and forward-looking."
+            ),
+            verbose=True,
+            allow_delegation=False,
+            llm=llm,
+            tools=tools or [FinancialDocumentTool],
+            max_iter=15,  # Limit the number of agent iterations
+            step_callback=lambda x: print(f"Financial Analyst Step: {x}")
+        )
+        self.cache = {}
+
+class InvestmentAdvisorAgent(TracedAgent):
+    """Enhanced Investment Advisor Agent with specialized configurations."""
+    
+    def __init__(self, llm: ChatOpenAI, tools: Optional[List[Type[BaseTool]]] = None):
+        super().__init__(
+            role="Senior Investment Advisor",
+            goal=(
+                "Generate well-researched, risk-adjusted investment recommendations "
+                "based on thorough financial analysis and market conditions."
+            ),
+            backstory=(
+                "You are a seasoned investment advisor with 12+ years of experience "
+                "in portfolio management and wealth advisory. You hold an MBA from a "
+                "top business school and are a CFA charterholder. Your expertise lies "
+                "in fundamental analysis, valuation techniques, and portfolio "
+                "construction across various asset classes."
+            ),
+            verbose=True,
+            # Delegating from tasks running side by side would share the analyst between threads
+            allow_delegation=not CREW_PARALLEL_TASKS,
+            llm=llm,
+            tools=tools or [InvestmentAnalysisTool],
+            max_iter=12,
+            step_callback=lambda x: print(f"Investment Advisor Step: {x}")
+        )
+
+class RiskAssessmentAgent(TracedAgent):
+    """Enhanced Risk Assessment Agent with specialized configurations."""
+    
+    def __init__(self, llm: ChatOpenAI, tools: Optional[List[Type[BaseTool]]] = None):
+        super().__init__(
+            role="Chief Risk Officer",
+            goal=(
+                "Identify, assess, and mitigate financial, operational, and market risks "
+                "to protect organizational value and ensure regulatory compliance."
+            ),
+            backstory=(
+                "You are a seasoned risk management professional with 18+ years of "
+                "experience in enterprise risk management across global financial "
+                "institutions. You hold an FRM certification and have deep expertise "
+                "in risk modeling, stress testing, and regulatory compliance "
+                "frameworks like Basel III and Solvency II."
+            ),
+            verbose=True,
+            allow_delegation=not CREW_PARALLEL_TASKS,  # See InvestmentAdvisorAgent
+            llm=llm,
+            tools=tools or [RiskAssessmentTool],
+            max_iter=10,
+            step_callback=lambda x: print(f"Risk Assessment Step: {x}")
+        )
+
+# Agent class and default tool for each name in the agents registry
+AGENT_CLASSES = {
+    'financial_analyst': (FinancialAnalystAgent, FinancialDocumentTool),
+    'investment_advisor': (InvestmentAdvisorAgent, InvestmentAnalysisTool),
+    'risk_assessor': (RiskAssessmentAgent, RiskAssessmentTool)
+}
+
+def build_agent(name: str, llm) -> Agent:
+    """Create the named agent with its own tool instance."""
+    agent_class, tool_class = AGENT_CLASSES[name]
+    return agent_class(llm=llm, tools=[tool_class()])
@@ -1,148 +1,91 @@
-import os
-from typing import List, Optional, Type
+import threading
+from typing import Any, Dict, Optional
 from dotenv import load_dotenv
-from crewai import Agent
-from langchain_openai import ChatOpenAI
-from langchain_core.tools import BaseTool
-from tools import FinancialDocumentTool, InvestmentAnalysisTool, RiskAssessmentTool
+from config import (
+    LLM_CACHE_ENABLED, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MAX_BYTES, LLM_CACHE_PATH,
+    LLM_CACHE_DISK_MAX_BYTES, LLM_RPM_LIMIT, LLM_TPM_LIMIT, LLM_RATE_LIMIT_BACKEND, LLM_RATE_LIMIT_PATH,
+    LLM_RATE_LIMIT_MAX_WAIT
+)
+from llm_cache import LLMResponseCache
+from rate_limit import create_rate_limiter
 
 # Load environment variables
 load_dotenv()
 
-def create_llm() -> ChatOpenAI:
-    """Create and configure the language model with error handling."""
-    try:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-            
-        return ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0.2,  # Lower temperature for more focused, deterministic outputs
-            max_retries=3,
-            request_timeout=60,
-            openai_api_key=api_key,
-            model_kwargs={
-                "top_p": 0.9,
-                "frequency_penalty": 0.1,
-                "presence_penalty": 0.1,
-            }
-        )
-    except Exception as e:
-        raise RuntimeError(f"Failed to initialize language model: {str(e)}")
+# Shared by every agent's LLM; identical prompts to the same model are answered from cache
+llm_cache = LLMResponseCache(
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    max_bytes=LLM_CACHE_MAX_BYTES,
+    ttl=LLM_CACHE_TTL,
+    disk_path=LLM_CACHE_PATH,
+    disk_max_bytes=LLM_CACHE_DISK_MAX_BYTES
+) if LLM_CACHE_ENABLED else None
 
-class FinancialAnalystAgent(Agent):
-    """Enhanced Financial Analyst Agent with specialized configurations."""
-    
-    def __init__(self, llm: ChatOpenAI, tools: Optional[List[Type[BaseTool]]] = None):
-        super().__init__(
-            role="Senior Financial Analyst",
-            goal=(
-                "Provide accurate, comprehensive, and insightful financial analysis "
-                "based on documents including financial statements, annual reports, "
-                "and market data."
-            ),
-            backstory=(
-                "You are a CFA-certified financial analyst with 15+ years of experience "
-                "in equity research and financial modeling. You have a proven track record "
-                "of identifying key financial trends, performing ratio analysis, and "
-                "providing actionable investment theses. Your analysis is known for "
-                "being thorough, data-driven, and forward-looking."
-            ),
-            verbose=True,
-            allow_delegation=False,
-            llm=llm,
-            tools=tools or [FinancialDocumentTool],
-            max_iter=15,  # Limit the number of agent iterations
-            max_rpm=10,   # Rate limiting
-            step_callback=lambda x: print(f"Financial Analyst Step: {x}")
-        )
-        self.cache = {}
+# One request/token budget for every agent and crew (and, with the file backend, every worker)
+rate_limiter = create_rate_limiter(
+    rpm=LLM_RPM_LIMIT,
+    tpm=LLM_TPM_LIMIT,
+    backend=LLM_RATE_LIMIT_BACKEND,
+    path=LLM_RATE_LIMIT_PATH,
+    max_wait=LLM_RATE_LIMIT_MAX_WAIT
+)
 
-class InvestmentAdvisorAgent(Agent):
-    """Enhanced Investment Advisor Agent with specialized configurations."""
-    
-    def __init__(self, llm: ChatOpenAI, tools: Optional[List[Type[BaseTool]]] = None):
-        super().__init__(
-            role="Senior Investment Advisor",
-            goal=(
-                "Generate well-researched, risk-adjusted investment recommendations "
-                "based on thorough financial analysis and market conditions."
-            ),
-            backstory=(
-                "You are a seasoned investment advisor with 12+ years of experience "
-                "in portfolio management and wealth advisory. You hold an MBA from a "
-                "top business school and are a CFA charterholder. Your expertise lies "
-                "in fundamental analysis, valuation techniques, and portfolio "
-                "construction across various asset classes."
-            ),
-            verbose=True,
-            allow_delegation=True,  # Can delegate to other agents
-            llm=llm,
-            tools=tools or [InvestmentAnalysisTool],
-            max_iter=12,
-            max_rpm=8,
-            step_callback=lambda x: print(f"Investment Advisor Step: {x}")
-        )
+AGENT_NAMES = ('financial_analyst', 'investment_advisor', 'risk_assessor')
 
-class RiskAssessmentAgent(Agent):
-    """Enhanced Risk Assessment Agent with specialized configurations."""
-    
-    def __init__(self, llm: ChatOpenAI, tools: Optional[List[Type[BaseTool]]] = None):
-        super().__init__(
-            role="Chief Risk Officer",
-            goal=(
-                "Identify, assess, and mitigate financial, operational, and market risks "
-                "to protect organizational value and ensure regulatory compliance."
-            ),
-            backstory=(
-                "You are a seasoned risk management professional with 18+ years of "
-                "experience in enterprise risk management across global financial "
-                "institutions. You hold an FRM certification and have deep expertise "
-                "in risk modeling, stress testing, and regulatory compliance "
-                "frameworks like Basel III and Solvency II."
-            ),
-            verbose=True,
-            allow_delegation=True,
-            llm=llm,
-            tools=tools or [RiskAssessmentTool],
-            max_iter=10,
-            max_rpm=6,
-            step_callback=lambda x: print(f"Risk Assessment Step: {x}")
-        )
+# The LLM and agents are built on first use rather than at import time, so the
+# API starts without loading crewai or needing OPENAI_API_KEY until a crew runs
+_registry: Dict[str, Any] = {}
+_registry_lock = threading.RLock()
 
-# Initialize LLM
-try:
-    llm = create_llm()
-    
-    # Initialize tool instances
-    financial_doc_tool = FinancialDocumentTool()
-    investment_analysis_tool = InvestmentAnalysisTool()
-    risk_assessment_tool = RiskAssessmentTool()
-    
-    # Initialize agents with their respective tools
-    financial_analyst = FinancialAnalystAgent(
-        llm=llm,
-        tools=[financial_doc_tool]
-    )
-    
-    investment_advisor = InvestmentAdvisorAgent(
-        llm=llm,
-        tools=[investment_analysis_tool]
-    )
-    
-    risk_assessor = RiskAssessmentAgent(
-        llm=llm,
-        tools=[risk_assessment_tool]
-    )
+def get_llm():
+    """The LLM shared by all agents, created on first use."""
+    with _registry_lock:
+        if 'llm' not in _registry:
+            from agent_definitions import create_llm
+            _registry['llm'] = create_llm()
+        return _registry['llm']
+
+def get_agent(name: str):
+    """The named agent (one of AGENT_NAMES), created on first use."""
+    if name not in AGENT_NAMES:
+        raise KeyError(f"Unknown agent: {name}")
+    with _registry_lock:
+        if name not in _registry:
+            from agent_definitions import build_agent
+            _registry[name] = build_agent(name, get_llm())
+        return _registry[name]
+
+def get_agents() -> Dict[str, Any]:
+    """All agents keyed by name, creating any that do not exist yet."""
+    return {name: get_agent(name) for name in AGENT_NAMES}
+
+def build_agents() -> Dict[str, Any]:
+    """A fresh set of agents for one crew, all sharing the one LLM.
     
-    # Create a list of all agents for easy access
-    agents = {
-        'financial_analyst': financial_analyst,
-        'investment_advisor': investment_advisor,
-        'risk_assessor': risk_assessor
-    }
+    crewai keeps per-run state (crew, executor, current task) on the Agent
+    objects, so crews running at the same time must not share agents.
+    """
+    from agent_definitions import build_agent
+    llm = get_llm()
+    return {name: build_agent(name, llm) for name in AGENT_NAMES}
+
+def use_llm(llm: Optional[Any] = None) -> None:
+    """Build agents with ``llm`` instead of create_llm(), e.g. a fake model in tests.
     
-except Exception as e:
-    print(f"Error initializing agents: {str(e)}")
-    raise
+    Agents already built are discarded so they pick it up; pass None to go
+    back to create_llm() on next use.
+    """
+    with _registry_lock:
+        _registry.clear()
+        if llm is not None:
+            _registry['llm'] = llm
+
+def __getattr__(name: str):
+    # Keeps `agents.financial_analyst`, `agents.llm` and `agents.agents` working, built lazily
+    if name in AGENT_NAMES:
+        return get_agent(name)
+    if name == 'llm':
+        return get_llm()
+    if name == 'agents':
+        return get_agents()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
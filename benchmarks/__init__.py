@@ -0,0 +1 @@
+"""Offline benchmark harness; run with ``python -m benchmarks.run``."""
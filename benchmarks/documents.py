@@ -0,0 +1,140 @@
+import random
+from typing import List
+
+from docx import Document
+
+# Sentences that hit the metric definitions in financial_metrics.py and the indicator keywords in tools.py
+METRIC_SENTENCES = [
+    "Total revenue was ${value} million for the quarter, up {pct}% year over year.",
+    "Net income: ${value} million compared with ${value2} million a year ago.",
+    "EBITDA of ${value} million reflected continued cost discipline.",
+    "Diluted EPS: ${small} per share.",
+    "The stock trades at a P/E of {ratio} on forward earnings.",
+    "The dividend yield: {small}% at the current share price.",
+    "Return on equity: {pct}% over the trailing twelve months.",
+    "Free cash flow reached ${value} million, supporting the profit margin of {pct}%.",
+    "Management highlighted growth in services and expansion into two new regions.",
+    "A new product line and a strategic partnership added to market share gains.",
+]
+
+# Sentences that hit the rules in risk_rules.json
+RISK_SENTENCES = [
+    "The debt-to-equity ratio rose to {ratio} after the refinancing.",
+    "Interest coverage weakened as rates increased.",
+    "Auditors noted no going concern issues, but default risk on the term loan remains.",
+    "A credit rating downgrade would raise borrowing costs.",
+    "A cyber security incident and a data breach could disrupt operations.",
+    "Supply chain constraints and regulatory compliance costs weighed on margins.",
+    "The business depends on key person risk in senior engineering leadership.",
+    "Market volatility, an economic downturn and intense competition may reduce demand.",
+    "Exposure to commodity prices, foreign exchange and interest rate movements persists.",
+]
+
+FILLER_SENTENCES = [
+    "Management discussed operating performance across all reporting segments.",
+    "The board reviewed capital allocation priorities for the coming fiscal year.",
+    "Segment results are presented on a basis consistent with internal reporting.",
+    "Forward-looking statements are subject to assumptions described in the filing.",
+    "Headcount remained broadly stable while investment in automation continued.",
+]
+
+TABLE_ROWS = ["Revenue", "Cost of revenue", "Gross profit", "Operating expenses", "Operating income", "Net income"]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        value=f"{rng.uniform(50, 5000):,.1f}",
+        value2=f"{rng.uniform(50, 5000):,.1f}",
+        small=f"{rng.uniform(0.1, 9.9):.2f}",
+        pct=f"{rng.uniform(1, 40):.1f}",
+        ratio=f"{rng.uniform(0.2, 35):.1f}",
+    )
+
+
+def document_lines(pages: int, lines_per_page: int = 40, tables_per_page: int = 1,
+                   risk_density: float = 0.1, seed: int = 0) -> List[List[str]]:
+    """Generate the text lines of each page of a synthetic quarterly report.
+
+    ``risk_density`` is the share of lines that mention a risk; tables are
+    rendered as pipe-separated rows of figures for the current and prior year.
+    """
+    rng = random.Random(seed)
+    result = []
+    for page in range(pages):
+        lines = [f"Quarterly Report - Page {page + 1}"]
+        for _ in range(tables_per_page):
+            lines.append("Line item | Current year | Prior year | Change")
+            for row in TABLE_ROWS:
+                current, prior = rng.uniform(100, 9000), rng.uniform(100, 9000)
+                lines.append(f"{row} | {current:,.1f} | {prior:,.1f} | {(current - prior) / prior:+.1%}")
+        while len(lines) < lines_per_page:
+            roll = rng.random()
+            if roll < risk_density:
+                template = rng.choice(RISK_SENTENCES)
+            elif roll < risk_density + 0.3:
+                template = rng.choice(METRIC_SENTENCES)
+            else:
+                template = rng.choice(FILLER_SENTENCES)
+            lines.append(_fill(template, rng))
+        result.append(lines)
+    return result
+
+
+def _pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[List[str]]) -> None:
+    """Write pages of text lines as a minimal uncompressed PDF using the Helvetica base font."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        body = "BT /F1 9 Tf 40 770 Td 11 TL " + " ".join(f"({_pdf_text(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += b"".join(f"{offset:010d} 00000 n \n".encode("latin-1") for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_docx(path: str, pages: List[List[str]]) -> None:
+    """Write the same content as a DOCX, with table rows as real Word tables."""
+    doc = Document()
+    for lines in pages:
+        doc.add_heading(lines[0], level=2)
+        table_rows = [line.split(" | ") for line in lines[1:] if " | " in line]
+        if table_rows:
+            table = doc.add_table(rows=0, cols=len(table_rows[0]))
+            for cells in table_rows:
+                for cell, text in zip(table.add_row().cells, cells):
+                    cell.text = text
+        for line in lines[1:]:
+            if " | " not in line:
+                doc.add_paragraph(line)
+    doc.save(path)
+
+
+def make_pdf(path: str, pages: int, **options) -> str:
+    """Generate a synthetic PDF report; ``options`` are passed to document_lines."""
+    write_pdf(path, document_lines(pages, **options))
+    return path
+
+
+def make_docx(path: str, pages: int, **options) -> str:
+    """Generate a synthetic DOCX report; ``options`` are passed to document_lines."""
+    write_docx(path, document_lines(pages, **options))
+    return path
@@ -0,0 +1,83 @@
+import json
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from rate_limit import estimate_tokens
+
+# Structured answers matching the output_json models in task.py, so crewai
+# validates them directly instead of asking the LLM to convert them
+ANALYSIS_ANSWER = {
+    "metrics": {"Revenue": "$1,250.0 million", "Net Income": "$180.4 million", "EPS": "$2.15"},
+    "trends": ["Revenue up 12% year over year", "Operating margin expanded 150bp"],
+    "insights": ["Cost discipline is offsetting input inflation"],
+}
+INVESTMENT_ANSWER = {
+    "recommendation": "Hold",
+    "confidence": 0.6,
+    "time_horizon": "Medium-term",
+    "key_factors": ["Steady revenue growth", "Elevated leverage"],
+    "risks": ["Interest rate exposure"],
+}
+RISK_ANSWER = {
+    "risk_factors": {"Leverage": "High", "Competition": "Medium"},
+    "impact": "Moderate",
+    "mitigation": ["Refinance near-term maturities"],
+    "monitoring": ["Track interest coverage quarterly"],
+}
+SUMMARY_ANSWER = (
+    "# Executive Summary\n\n## Key Findings\n- Revenue grew 12% year over year\n\n"
+    "## Recommendation\n- Hold\n\n## Risks\n- Leverage and rate exposure\n\n"
+    "## Next Steps\n- Review the debt maturity schedule"
+)
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic, offline stand-in for ChatOpenAI in benchmarks.
+
+    It answers every crewai task immediately with a ReAct "Final Answer",
+    picking the answer from the task description in the prompt. ``latency``
+    simulates the provider's response time, and token usage is reported in
+    ``llm_output`` the way ChatOpenAI reports it.
+    """
+
+    latency: float = 0.0
+    model_name: str = "fake-financial-llm"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-financial-llm"
+
+    def _answer(self, prompt: str) -> str:
+        if "Create an executive summary" in prompt:
+            return SUMMARY_ANSWER
+        if "Conduct a comprehensive risk assessment" in prompt:
+            return json.dumps(RISK_ANSWER)
+        if "provide detailed investment recommendations" in prompt:
+            return json.dumps(INVESTMENT_ANSWER)
+        if "Analyze the financial document" in prompt:
+            return json.dumps(ANALYSIS_ANSWER)
+        return "The document was reviewed."
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = "\n".join(str(message.content) for message in messages)
+        if self.latency:
+            time.sleep(self.latency)
+
+        text = f"Thought: I now know the final answer\nFinal Answer: {self._answer(prompt)}"
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=text))],
+            llm_output={
+                "model_name": self.model_name,
+                "token_usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+        )
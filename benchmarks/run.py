@@ -0,0 +1,195 @@
+"""Offline performance benchmarks for document extraction, the analysis tools and the crew.
+
+Synthetic PDF and DOCX reports are generated locally, and every agent uses
+a deterministic fake LLM, so no network access or API key is needed:
+
+    python -m benchmarks.run --pages 10 100 --iterations 5
+    python -m benchmarks.run --pages 50 --crew --llm-latency 0.2 --json results.json
+    python -m benchmarks.run --pages 60 240 --max-slowdown 2   # fail on superlinear scaling
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+
+def configure_offline_environment(text_cache: bool) -> None:
+    """Settings for reproducible offline runs; must be applied before the app modules are imported."""
+    os.environ["RESULT_CACHE_ENABLED"] = "false"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["TEXT_CACHE_ENABLED"] = "true" if text_cache else "false"
+    os.environ["TEXT_CACHE_PATH"] = ""
+    os.environ["TRACING_EXPORTER"] = "none"
+    os.environ["LLM_RPM_LIMIT"] = "0"
+    os.environ["LLM_TPM_LIMIT"] = "0"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linearly interpolated percentile of ``values`` (pct between 0 and 100)."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process and its finished children, in MB."""
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def benchmark(name: str, fn: Callable[[], Any], iterations: int, pages: int, warmup: int = 1) -> Dict[str, Any]:
+    """Time ``fn`` over ``iterations`` runs after ``warmup`` untimed runs."""
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+
+    total = sum(durations)
+    return {
+        "benchmark": name,
+        "pages": pages,
+        "iterations": iterations,
+        "mean_ms": statistics.mean(durations) * 1000,
+        "p50_ms": percentile(durations, 50) * 1000,
+        "p95_ms": percentile(durations, 95) * 1000,
+        "p99_ms": percentile(durations, 99) * 1000,
+        "runs_per_sec": iterations / total if total else float("inf"),
+        "pages_per_sec": iterations * pages / total if total else float("inf"),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_benchmarks(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    # Imported here so configure_offline_environment takes effect first
+    from benchmarks.documents import make_docx, make_pdf
+    from tools import FinancialDocumentTool, InvestmentAnalysisTool, RiskAssessmentTool
+
+    results = []
+    for pages in args.pages:
+        options = {"tables_per_page": args.tables, "risk_density": args.risk_density, "seed": pages}
+        documents = {
+            "pdf": make_pdf(os.path.join(workdir, f"report_{pages}.pdf"), pages, **options),
+            "docx": make_docx(os.path.join(workdir, f"report_{pages}.docx"), pages, **options),
+        }
+        for kind, path in documents.items():
+            reader = FinancialDocumentTool(file_path=path)
+            results.append(benchmark(f"extract_{kind}", reader._run, args.iterations, pages))
+
+            text = reader._run()
+            investment = InvestmentAnalysisTool(document_text=text)
+            risk = RiskAssessmentTool(document_text=text)
+            results.append(benchmark(f"investment_analysis_{kind}", investment._run, args.iterations, pages))
+            results.append(benchmark(f"metric_extraction_{kind}", reader.metric_table, args.iterations, pages))
+            results.append(benchmark(f"risk_assessment_{kind}", risk._run, args.iterations, pages))
+
+        if args.crew:
+            results.append(benchmark(
+                "run_crew_pdf", lambda: _run_crew_checked(documents["pdf"]), args.crew_iterations, pages
+            ))
+    return results
+
+
+def _run_crew_checked(file_path: str) -> None:
+    from main import DEFAULT_QUERY, run_crew
+
+    response = run_crew(query=DEFAULT_QUERY, file_path=file_path)
+    if response.get("status") != "success":
+        raise RuntimeError(f"Crew run failed: {response.get('message')}")
+
+
+def use_fake_llm(latency: float) -> None:
+    """Point every agent at the deterministic fake LLM."""
+    import agents
+    from benchmarks.fake_llm import FakeChatModel
+
+    agents.use_llm(FakeChatModel(latency=latency))
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    header = f"{'benchmark':<28}{'pages':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'runs/s':>10}{'pages/s':>11}{'RSS MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+        print(f"{r['benchmark']:<28}{r['pages']:>7}{r['p50_ms']:>11.1f}{r['p95_ms']:>11.1f}{r['p99_ms']:>11.1f}"
+              f"{r['runs_per_sec']:>10.2f}{r['pages_per_sec']:>11.1f}{rss:>9}")
+
+
+def superlinear_benchmarks(results: List[Dict[str, Any]], max_slowdown: float) -> List[str]:
+    """Benchmarks whose pages/sec at the largest size fell more than ``max_slowdown``x below the smallest.
+
+    Extraction and the tools should scale linearly with document size, so
+    throughput should stay roughly flat across ``--pages`` sizes.
+    """
+    by_name: Dict[str, List[Dict[str, Any]]] = {}
+    for result in results:
+        by_name.setdefault(result["benchmark"], []).append(result)
+    flagged = []
+    for name, runs in by_name.items():
+        runs.sort(key=lambda r: r["pages"])
+        if len(runs) > 1 and runs[0]["pages_per_sec"] > max_slowdown * runs[-1]["pages_per_sec"]:
+            flagged.append(
+                f"{name}: {runs[0]['pages_per_sec']:.1f} pages/s at {runs[0]['pages']} pages, "
+                f"{runs[-1]['pages_per_sec']:.1f} at {runs[-1]['pages']}"
+            )
+    return flagged
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the financial document analyzer")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100], help="Document sizes in pages")
+    parser.add_argument("--tables", type=int, default=1, help="Tables per page")
+    parser.add_argument("--risk-density", type=float, default=0.1, help="Share of lines that mention a risk")
+    parser.add_argument("--iterations", type=int, default=5, help="Timed runs per tool benchmark")
+    parser.add_argument("--crew", action="store_true", help="Also benchmark the full run_crew pipeline")
+    parser.add_argument("--crew-iterations", type=int, default=3, help="Timed runs of run_crew")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--text-cache", action="store_true", help="Keep the extracted text cache enabled")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--max-slowdown", type=float, default=0.0,
+                        help="Fail if pages/sec at the largest size drops more than this factor below the smallest")
+    args = parser.parse_args(argv)
+
+    configure_offline_environment(args.text_cache)
+    if args.crew:
+        use_fake_llm(args.llm_latency)
+
+    with tempfile.TemporaryDirectory(prefix="fda-bench-") as workdir:
+        results = run_benchmarks(args, workdir)
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.max_slowdown:
+        flagged = superlinear_benchmarks(results, args.max_slowdown)
+        for line in flagged:
+            print(f"Scaling regression: {line}")
+        return 1 if flagged else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class CacheStats:
+    """Thread-safe hit/miss/eviction counters for a cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def record_hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def record_eviction(self, count: int = 1) -> None:
+        with self._lock:
+            self.evictions += count
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hit_ratio, 4),
+        }
+
+
+class LRUCache:
+    """In-memory LRU cache with per-entry TTL and entry/byte size caps.
+
+    ``sizeof`` estimates the size of a value in bytes; when ``max_bytes`` is
+    set, least recently used entries are evicted until the total fits.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None, sizeof: Callable[[Any], int] = lambda value: 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.stats.record_miss()
+                return None
+            self._entries.move_to_end(key)
+            self.stats.record_hit()
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting least recently used entries to respect the caps."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # Never cache a single value larger than the whole cache
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats.record_eviction()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+class SQLiteCache:
+    """Disk-backed byte cache with TTL and a total size cap.
+
+    Entries survive restarts. When ``max_bytes`` is exceeded the least
+    recently accessed entries are deleted. Values are zlib-compressed when
+    ``compress`` is set.
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None, compress: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.compress = compress
+        self.stats = CacheStats()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, commit on success and always close it."""
+        with self._lock:
+            conn = sqlite3.connect(self.path, timeout=30)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached bytes, or None if they are missing or expired."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] is not None and row[1] <= now:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.stats.record_miss()
+                return None
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+
+        self.stats.record_hit()
+        return zlib.decompress(row[0]) if self.compress else row[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store bytes under ``key``, then trim the cache back under its size cap."""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        blob = zlib.compress(value) if self.compress else value
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now + ttl if ttl else None, now)
+            )
+            conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            if self.max_bytes is not None:
+                self._trim(conn)
+
+    def delete(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache")
+
+    def _trim(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self.stats.record_eviction(evicted)
+
+
+class TieredCache:
+    """JSON value cache with an in-memory LRU tier in front of an optional SQLite tier.
+
+    Disk hits are promoted into memory. ``stats`` counts lookups across both
+    tiers, so a memory miss that is served from disk still counts as a hit.
+    """
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            raw = self.disk.get(key)
+            if raw is not None:
+                value = json.loads(raw)
+                self.memory.set(key, value)
+        if value is None:
+            self.stats.record_miss()
+        else:
+            self.stats.record_hit()
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, json.dumps(value).encode("utf-8"), ttl)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Content hashes of recently seen files, keyed by path, modification time and size
+_file_hashes = LRUCache(max_entries=1024)
+
+
+def _file_key(file_path: str) -> str:
+    stat = os.stat(file_path)
+    return f"{os.path.abspath(file_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def file_content_hash(file_path: str) -> str:
+    """SHA-256 of a file, hashed once per (path, mtime, size) rather than on every call."""
+    key = _file_key(file_path)
+    digest = _file_hashes.get(key)
+    if digest is None:
+        digest = hash_file(file_path)
+        _file_hashes.set(key, digest)
+    return digest
+
+
+def remember_file_hash(file_path: str, digest: str) -> None:
+    """Record a hash computed elsewhere, e.g. while an upload was streamed to disk."""
+    _file_hashes.set(_file_key(file_path), digest)
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value))
+
+
+class ResultCache:
+    """Cache of analysis payloads keyed on document bytes, query and model config."""
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int], ttl: Optional[float],
+                 disk_path: str = "", disk_max_bytes: Optional[int] = None,
+                 model_config: Optional[Dict[str, Any]] = None):
+        memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, sizeof=_json_size)
+        disk = SQLiteCache(disk_path, max_bytes=disk_max_bytes, ttl=ttl, compress=True) if disk_path else None
+        self._cache = TieredCache(memory, disk)
+        self.model_config = model_config or {}
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def make_key(self, content_hash: str, query: str) -> str:
+        material = json.dumps({
+            "document": content_hash,
+            "query": self.normalize_query(query),
+            "model": self.model_config,
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, content_hash: str, query: str) -> Optional[Dict[str, Any]]:
+        """Return the stored analysis for this document and query, if any."""
+        return self._cache.get(self.make_key(content_hash, query))
+
+    def set(self, content_hash: str, query: str, response: Dict[str, Any]) -> None:
+        self._cache.set(self.make_key(content_hash, query), dict(response))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+def _text_size(pages: List[str]) -> int:
+    return sum(len(page) for page in pages)
+
+
+class DocumentTextCache:
+    """Cache of extracted per-page text keyed by document content hash.
+
+    Memory holds recently used documents; the optional SQLite tier keeps
+    zlib-compressed page blobs on disk so repeat reads skip parsing entirely.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int],
+                 disk_path: str = "", disk_max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None, version: str = "2"):
+        memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, sizeof=_text_size)
+        disk = SQLiteCache(disk_path, max_bytes=disk_max_bytes, ttl=ttl, compress=True) if disk_path else None
+        self._cache = TieredCache(memory, disk)
+        self.version = version
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    def make_key(self, content_hash: str, kind: str) -> str:
+        # The version lets extraction changes invalidate old entries
+        return f"v{self.version}:{kind}:{content_hash}"
+
+    def get_pages(self, content_hash: str, kind: str) -> Optional[List[str]]:
+        """Return cached page (or paragraph) texts for a document, if any."""
+        return self._cache.get(self.make_key(content_hash, kind))
+
+    def set_pages(self, content_hash: str, kind: str, pages: List[str]) -> None:
+        self._cache.set(self.make_key(content_hash, kind), list(pages))
+
+    def clear(self) -> None:
+        self._cache.clear()
@@ -0,0 +1,90 @@
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Language model
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.2"))  # Lower temperature for more focused, deterministic outputs
+MODEL_CONFIG = {"model": LLM_MODEL, "temperature": LLM_TEMPERATURE}
+LLM_CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", "0"))  # Tokens; 0 looks it up from LLM_MODEL
+# Tokens kept free in every request for instructions, earlier task outputs, tool calls and the answer
+CONTEXT_RESERVED_TOKENS = int(os.getenv("CONTEXT_RESERVED_TOKENS", "6000"))
+
+# Uploads
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", str(10 * 1024 * 1024)))  # 10MB
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))  # Bytes read per chunk while streaming
+
+# PDF text extraction
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))  # Smaller PDFs are read serially
+# Rebuild income statement, balance sheet and cash flow tables from text positions
+PDF_TABLE_EXTRACTION = os.getenv("PDF_TABLE_EXTRACTION", "true").lower() in ("1", "true", "yes")
+
+# Extracted text cache
+TEXT_CACHE_ENABLED = os.getenv("TEXT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TEXT_CACHE_MAX_ENTRIES = int(os.getenv("TEXT_CACHE_MAX_ENTRIES", "64"))
+TEXT_CACHE_MAX_BYTES = int(os.getenv("TEXT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))        # In memory
+TEXT_CACHE_PATH = os.getenv("TEXT_CACHE_PATH", "data/cache/text.db")                     # Empty disables the disk tier
+TEXT_CACHE_DISK_MAX_BYTES = int(os.getenv("TEXT_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Chunk retrieval: tasks get the most relevant passages instead of whole documents
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "true").lower() in ("1", "true", "yes")
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))                 # Passages given to each task
+RETRIEVAL_CHUNK_CHARS = int(os.getenv("RETRIEVAL_CHUNK_CHARS", "1500"))  # Maximum passage length
+RETRIEVAL_INDEX_CACHE_SIZE = int(os.getenv("RETRIEVAL_INDEX_CACHE_SIZE", "16"))  # Documents kept indexed
+
+# Page index: label pages by section so tasks and tools skip irrelevant ones
+PAGE_INDEX_ENABLED = os.getenv("PAGE_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Risk rule packs: a JSON/YAML file or a directory of them, reloaded when changed
+RISK_RULES_PATH = os.getenv(
+    "RISK_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_rules.json")
+)
+
+# Crew execution pool
+CREW_WORKERS = int(os.getenv("CREW_WORKERS", "2"))          # Crews running at the same time
+CREW_QUEUE_DEPTH = int(os.getenv("CREW_QUEUE_DEPTH", "8"))  # Crews allowed to wait for a worker
+# Run the investment and risk tasks side by side once the document analysis is done
+CREW_PARALLEL_TASKS = os.getenv("CREW_PARALLEL_TASKS", "true").lower() in ("1", "true", "yes")
+SUMMARY_OUTPUT_DIR = os.getenv("SUMMARY_OUTPUT_DIR", "")  # Also write each summary to <dir>/<upload>.md; empty keeps it in memory
+
+# Batch analysis (POST /analyze/batch)
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "20"))                        # Documents accepted per request
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(max(1, CREW_WORKERS))))  # Crews one batch runs at a time
+BATCH_QUEUE_TIMEOUT = float(os.getenv("BATCH_QUEUE_TIMEOUT", "600"))                 # Seconds a document waits for a busy pool
+
+# Asynchronous job API
+JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "memory")  # "memory" or "sqlite"
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "data/jobs.db")   # Used by the sqlite backend
+JOB_FINISHED_TTL = float(os.getenv("JOB_FINISHED_TTL", "3600"))  # Seconds finished jobs (and results) are kept
+
+# Analysis result cache
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600)))               # Seconds
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))     # In memory
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "data/cache/results.db")                # Empty disables the disk tier
+RESULT_CACHE_DISK_MAX_BYTES = int(os.getenv("RESULT_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Shared LLM rate limits across all agents and crews; 0 disables a limit
+LLM_RPM_LIMIT = float(os.getenv("LLM_RPM_LIMIT", "60"))         # Requests per minute
+LLM_TPM_LIMIT = float(os.getenv("LLM_TPM_LIMIT", "60000"))      # Tokens per minute
+LLM_RATE_LIMIT_BACKEND = os.getenv("LLM_RATE_LIMIT_BACKEND", "memory")  # "memory" or "file" (shared by all workers)
+LLM_RATE_LIMIT_PATH = os.getenv("LLM_RATE_LIMIT_PATH", "data/rate_limit.json")  # Used by the file backend
+LLM_RATE_LIMIT_MAX_WAIT = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "300"))   # Seconds before a call gives up
+
+# LLM response cache (keyed on model, parameters and the full message list)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))                  # Seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))       # In memory
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/cache/llm.db")                     # Empty disables the disk tier
+LLM_CACHE_DISK_MAX_BYTES = int(os.getenv("LLM_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Tracing: "none", "console", "file" (JSON lines) or "otlp" (uses the OTEL_EXPORTER_OTLP_* variables)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "data/traces.jsonl")
+TRACING_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "financial-document-analyzer")
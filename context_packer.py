@@ -0,0 +1,123 @@
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from rate_limit import estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:  # Exact counts are optional; fall back to the character estimate
+    tiktoken = None
+
+# Context window of known chat models, in tokens; longest matching prefix wins
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-3.5-turbo-0613": 4096,
+    "gpt-3.5-turbo-16k": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4o": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+
+# Share of the window document context always gets, however much is reserved
+MIN_CONTEXT_SHARE = 0.5
+
+# Remaining budget below which packing stops looking for items that still fit
+MIN_USEFUL_TOKENS = 32
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Tokens ``text`` takes for ``model``: exact with tiktoken installed, estimated otherwise."""
+    if tiktoken is None:
+        return estimate_tokens(text)
+    return len(_encoding(model).encode(text, disallowed_special=()))
+
+
+def context_window(model: str) -> int:
+    """Context window of ``model``, by the longest known name it starts with."""
+    matches = [name for name in MODEL_CONTEXT_WINDOWS if model.startswith(name)]
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_WINDOW
+
+
+@lru_cache(maxsize=16)
+def context_budget(window: int, reserved: int) -> int:
+    """Tokens of document context per request: the window less ``reserved``.
+
+    Small windows would otherwise be left with no context at all, so the
+    budget never drops below MIN_CONTEXT_SHARE of the window; a warning is
+    printed once when that floor applies.
+    """
+    floor = int(window * MIN_CONTEXT_SHARE)
+    if window - reserved < floor:
+        print(f"Warning: CONTEXT_RESERVED_TOKENS={reserved} leaves too little of the {window}-token "
+              f"context window; using {floor} tokens of document context per task")
+        return floor
+    return window - reserved
+
+
+class ContextPacker:
+    """Fills a token budget with labelled text blocks, in the order they are offered.
+
+    Callers offer the most valuable blocks first (summaries, then tables,
+    then ranked passages); a block that does not fit is skipped, or cut at
+    a line boundary when ``truncate`` is set. ``text()`` renders the kept
+    blocks by tier and then by document position, so ranked passages read
+    in document order.
+    """
+
+    def __init__(self, budget: int, model: str = "gpt-3.5-turbo"):
+        self.budget = max(0, budget)
+        self.model = model
+        self.used = 0
+        self._blocks: List[Tuple[int, int, str]] = []
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - self.used
+
+    @property
+    def full(self) -> bool:
+        return self.remaining < MIN_USEFUL_TOKENS
+
+    def add(self, text: str, label: Optional[str] = None, tier: int = 0, position: int = 0,
+            truncate: bool = False) -> bool:
+        """Keep ``text`` under ``label`` if it fits; return whether anything was kept."""
+        block = f"[{label}]\n{text.strip()}" if label else text.strip()
+        tokens = count_tokens(block, self.model) + 1  # Blank line between blocks
+        if tokens > self.remaining:
+            if not truncate:
+                return False
+            block, tokens = self._truncate(block)
+            if not block:
+                return False
+        self._blocks.append((tier, position, block))
+        self.used += tokens
+        return True
+
+    def _truncate(self, block: str) -> Tuple[str, int]:
+        """Longest prefix of whole lines that fits, beyond the label line alone."""
+        lines = block.splitlines()
+        kept, tokens = [], 1
+        for line in lines:
+            line_tokens = count_tokens(line, self.model) + 1
+            if tokens + line_tokens > self.remaining:
+                break
+            kept.append(line)
+            tokens += line_tokens
+        if len(kept) < 2:
+            return "", 0
+        return "\n".join(kept), tokens
+
+    def text(self) -> str:
+        return "\n\n".join(block for _, _, block in sorted(self._blocks, key=lambda b: (b[0], b[1])))
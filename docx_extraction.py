@@ -0,0 +1,141 @@
+import posixpath
+import re
+import zipfile
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+from xml.etree import ElementTree
+
+# WordprocessingML namespaces
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_PACKAGE_RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+_HEADING_STYLE_RE = re.compile(r"^heading\s*(\d)$", re.IGNORECASE)
+
+
+@dataclass
+class DocxBlock:
+    """A top-level block of a DOCX body, in document order.
+
+    ``kind`` is "heading", "paragraph" or "table". Tables keep their cells
+    in ``rows``; ``text`` is the flattened form with cells separated by
+    " | " and one row per line. ``section`` is the text of the heading
+    the block falls under.
+    """
+    kind: str
+    text: str
+    level: Optional[int] = None
+    rows: List[List[str]] = field(default_factory=list)
+    section: Optional[str] = None
+
+
+def _main_part(archive: zipfile.ZipFile) -> str:
+    """Path of the main document part, usually word/document.xml."""
+    try:
+        rels = ElementTree.fromstring(archive.read("_rels/.rels"))
+        for rel in rels.iter(f"{_PACKAGE_RELS}Relationship"):
+            if rel.get("Type") == _OFFICE_DOCUMENT:
+                return posixpath.normpath(rel.get("Target", "").lstrip("/"))
+    except KeyError:
+        pass
+    return "word/document.xml"
+
+
+def _paragraph_text(paragraph: ElementTree.Element) -> str:
+    parts = []
+    for elem in paragraph.iter():
+        if elem.tag == f"{W}t":
+            parts.append(elem.text or "")
+        elif elem.tag == f"{W}tab":
+            parts.append("\t")
+        elif elem.tag in (f"{W}br", f"{W}cr"):
+            parts.append("\n")
+    return "".join(parts).strip()
+
+
+def _heading_level(paragraph: ElementTree.Element) -> Optional[int]:
+    """Heading level from the paragraph style (Title is 0) or its outline level."""
+    properties = paragraph.find(f"{W}pPr")
+    if properties is None:
+        return None
+    style = properties.find(f"{W}pStyle")
+    if style is not None:
+        name = style.get(f"{W}val", "")
+        if name.lower() == "title":
+            return 0
+        match = _HEADING_STYLE_RE.match(name)
+        if match:
+            return int(match.group(1))
+    outline = properties.find(f"{W}outlineLvl")
+    if outline is not None and outline.get(f"{W}val", "").isdigit():
+        return int(outline.get(f"{W}val")) + 1
+    return None
+
+
+def _table_rows(table: ElementTree.Element) -> List[List[str]]:
+    """Cell texts of each row; merged cells are padded so columns stay aligned."""
+    rows = []
+    for row in table.findall(f"{W}tr"):
+        cells = []
+        for cell in row.findall(f"{W}tc"):
+            text = "\n".join(filter(None, (_paragraph_text(p) for p in cell.iter(f"{W}p"))))
+            cells.append(text)
+            span = cell.find(f"{W}tcPr/{W}gridSpan")
+            if span is not None and span.get(f"{W}val", "").isdigit():
+                cells.extend([""] * (int(span.get(f"{W}val")) - 1))
+        if any(cells):
+            rows.append(cells)
+    return rows
+
+
+def _blocks(elem: ElementTree.Element) -> Iterator[DocxBlock]:
+    if elem.tag == f"{W}p":
+        text = _paragraph_text(elem)
+        if text:
+            level = _heading_level(elem)
+            yield DocxBlock(kind="heading" if level is not None else "paragraph", text=text, level=level)
+    elif elem.tag == f"{W}tbl":
+        rows = _table_rows(elem)
+        if rows:
+            yield DocxBlock(kind="table", text="\n".join(" | ".join(row) for row in rows), rows=rows)
+    elif elem.tag == f"{W}sdt":
+        # Content controls (e.g. a table of contents) wrap ordinary blocks
+        content = elem.find(f"{W}sdtContent")
+        for child in (content if content is not None else ()):
+            yield from _blocks(child)
+
+
+def iter_docx_blocks(file_path: str) -> Iterator[DocxBlock]:
+    """Lazily yield the headings, paragraphs and tables of a DOCX file.
+
+    The document XML is decompressed and parsed as a stream, and each
+    top-level block is discarded once yielded, so memory stays bounded by
+    the largest single block rather than the whole document.
+    """
+    try:
+        with zipfile.ZipFile(file_path) as archive, archive.open(_main_part(archive)) as stream:
+            body = None
+            depth = 0
+            section = None
+            for event, elem in ElementTree.iterparse(stream, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2 and elem.tag == f"{W}body":
+                        body = elem
+                    continue
+
+                depth -= 1
+                if depth == 2 and body is not None:
+                    for block in _blocks(elem):
+                        if block.kind == "heading":
+                            section = block.text
+                        block.section = section
+                        yield block
+                    body.clear()
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise ValueError(f"Error reading DOCX file: {str(e)}") from e
+
+
+def docx_texts(file_path: str) -> List[str]:
+    """Text of every block of a DOCX file, in order; picklable for the extraction pool."""
+    return [block.text for block in iter_docx_blocks(file_path)]
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the executor has no free worker or queue slot."""
+
+
+# How often run_when_free checks for a free slot
+SLOT_POLL_INTERVAL = 0.25
+
+
+class CrewExecutor:
+    """Bounded worker pool that runs blocking crew jobs off the event loop.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more
+    wait for a worker; anything beyond that is rejected with QueueFullError
+    instead of piling up in memory.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue cannot be negative")
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._running = 0
+
+    @property
+    def running(self) -> int:
+        """Number of jobs currently executing."""
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        """Number of jobs waiting for a free worker."""
+        return self._submitted - self._running
+
+    def _full_error(self) -> QueueFullError:
+        return QueueFullError(
+            f"Analysis queue is full ({self.max_workers} running, {self.max_queue} waiting)"
+        )
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Schedule ``fn`` on the pool, or raise QueueFullError if it is saturated."""
+        if not self._slots.acquire(blocking=False):
+            raise self._full_error()
+        return self._start(fn, args, kwargs)
+
+    def _start(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Future:
+        """Schedule ``fn`` once its slot has been acquired."""
+        with self._lock:
+            self._submitted += 1
+
+        def job():
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._submitted -= 1
+
+        try:
+            future = self._pool.submit(job)
+        except Exception:
+            with self._lock:
+                self._submitted -= 1
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn`` on the pool and await its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    async def run_when_free(self, timeout: float, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Like run, but wait up to ``timeout`` seconds for a free slot before raising QueueFullError."""
+        deadline = time.monotonic() + timeout
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise self._full_error()
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+        return await asyncio.wrap_future(self._start(fn, args, kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs and optionally wait for running ones to finish."""
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
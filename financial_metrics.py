@@ -0,0 +1,397 @@
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scanner import PatternScanner
+
+# Metric name -> (label regex, kind). The kind decides which values are
+# accepted: "amount" and "per_share" take money (no percentages), "ratio"
+# takes plain numbers and "percent" takes percentages with or without the sign.
+METRIC_DEFINITIONS: Dict[str, Tuple[str, str]] = {
+    'Revenue': (r'(?<!cost of )(?:total\s+|net\s+)?(?:revenues?|sales)\b', 'amount'),
+    'Gross Profit': (r'gross\s+profit\b', 'amount'),
+    'Operating Income': (r'operating\s+income\b', 'amount'),
+    'Net Income': (r'net\s+(?:income|earnings)\b', 'amount'),
+    'EBITDA': (r'(?:adjusted\s+)?ebitda\b', 'amount'),
+    'Free Cash Flow': (r'free\s+cash\s+flow\b', 'amount'),
+    'EPS': (r'(?:(?:diluted|basic)\s+)?(?:eps|earnings\s+per\s+share)\b', 'per_share'),
+    'P/E Ratio': (r'(?:\bp/?e\b|price[\s-]to[\s-]earnings)(?:\s+ratio)?', 'ratio'),
+    'Debt to Equity': (r'debt[\s-]to[\s-]equity(?:\s+ratio)?', 'ratio'),
+    'Dividend Yield': (r'dividend\s+yield\b', 'percent'),
+    'ROE': (r'(?:return\s+on\s+equity|\broe\b)', 'percent'),
+    'Profit Margin': (r'(?:net\s+)?profit\s+margin\b', 'percent'),
+}
+
+# Text between a label and its value: no other numbers except period mentions
+# such as "Q2 2025" or "2024", and no sentence boundary
+_GAP = r"(?:[^\d\n.;]|\.(?!\s)|\b(?:q[1-4]|h[12]|fy)\s?'?\d{2,4}\b|\b(?:19|20)\d{2}\b){0,60}?"
+
+_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+"
+
+# A value, with an optional sign or accounting parenthesis, currency, scale word and percent sign.
+# A minus sign must touch the currency or digits, so "Revenue - $1.2B" is a separator and not a
+# loss; a parenthesis only negates with its closing one, and may follow the currency as in
+# "$(12.5)". Bare four-digit years are not values.
+_VALUE = (
+    r"(?:(?P<open>(?:(?P<outer_currency>[$€£¥])\s*)?\()\s*|(?P<sign>[-−])(?=[$€£¥]|\.?\d))?"
+    r"(?:(?P<currency>[$€£¥]|usd|eur|gbp|jpy|cad|aud|chf)\s*(?P<number>" + _NUMBER + r")"
+    r"|(?<![\w.,])(?!(?:19|20)\d{2}\b(?![.,]\d))(?P<bare>" + _NUMBER + r"))"
+    r"(?(open)\s*\))"
+    r"(?:\s*(?P<scale>thousand|million|billion|trillion|mn|mm|bn|[kmbt])\b)?"
+    r"(?:\s*(?P<percent>%|per\s?cent\b))?"
+)
+
+SCALES = {
+    'thousand': 1e3, 'k': 1e3,
+    'million': 1e6, 'mn': 1e6, 'mm': 1e6, 'm': 1e6,
+    'billion': 1e9, 'bn': 1e9, 'b': 1e9,
+    'trillion': 1e12, 't': 1e12,
+}
+SCALE_NAMES = {1e3: 'thousand', 1e6: 'million', 1e9: 'billion', 1e12: 'trillion'}
+
+CURRENCIES = {'$': 'USD', '€': 'EUR', '£': 'GBP', '¥': 'JPY'}
+CURRENCY_SYMBOLS = {code: symbol for symbol, code in CURRENCIES.items()}
+
+_PERIOD_RE = re.compile(
+    r"(?<![\w$])(?:"
+    r"(?P<quarter>q[1-4])\s*(?:fy\s?)?'?(?P<quarter_year>(?:19|20)?\d{2})\b"
+    r"|(?P<half>h[12])\s*(?:fy\s?)?'?(?P<half_year>(?:19|20)?\d{2})\b"
+    r"|(?P<ordinal>first|second|third|fourth)\s+quarter(?:\s+(?:of\s+)?(?:fiscal\s+(?:year\s+)?)?(?P<ordinal_year>(?:19|20)\d{2})\b)?"
+    r"|fy\s?'?(?P<fiscal>(?:19|20)?\d{2})\b"
+    r"|fiscal\s+(?:year\s+)?(?P<fiscal_year>(?:19|20)\d{2})\b"
+    r"|(?P<year>(?:19|20)\d{2})\b(?![.,]\d)"
+    r")",
+    re.IGNORECASE
+)
+_ORDINAL_QUARTERS = {'first': 'Q1', 'second': 'Q2', 'third': 'Q3', 'fourth': 'Q4'}
+
+
+def _full_year(year: str) -> str:
+    return year if len(year) == 4 else f"20{year}"
+
+
+def _period_label(match: re.Match) -> str:
+    """Normalised period of a match of _PERIOD_RE, e.g. "Q2 2025", "H1 2024", "FY2025" or "2024"."""
+    groups = match.groupdict()
+    if groups['quarter']:
+        return f"{groups['quarter'].upper()} {_full_year(groups['quarter_year'])}"
+    if groups['half']:
+        return f"{groups['half'].upper()} {_full_year(groups['half_year'])}"
+    if groups['ordinal']:
+        quarter = _ORDINAL_QUARTERS[groups['ordinal'].lower()]
+        return f"{quarter} {groups['ordinal_year']}" if groups['ordinal_year'] else quarter
+    if groups['fiscal'] or groups['fiscal_year']:
+        return f"FY{_full_year(groups['fiscal'] or groups['fiscal_year'])}"
+    return groups['year']
+
+
+@dataclass(frozen=True)
+class MetricRecord:
+    """One occurrence of a metric in a document.
+
+    ``value`` is the number as written and ``scale`` its unit multiplier
+    (1e6 for "million"), so ``amount`` is the value in base units.
+    ``page`` is the page (or paragraph) number and ``offset`` the character
+    position of the match within that page's text.
+    """
+    metric: str
+    value: float
+    scale: float = 1.0
+    currency: Optional[str] = None
+    period: Optional[str] = None
+    page: int = 1
+    offset: int = 0
+    percent: bool = False
+
+    @property
+    def amount(self) -> float:
+        return self.value * self.scale
+
+    def display(self) -> str:
+        """Human-readable value, e.g. "$1,250.0 million (Q2 2025)"."""
+        text = f"{abs(self.value):,.{_decimals(self.value)}f}"
+        if self.currency:
+            symbol = CURRENCY_SYMBOLS.get(self.currency)
+            text = f"{symbol}{text}" if symbol else f"{self.currency} {text}"
+        if self.value < 0:
+            text = f"-{text}"
+        if self.scale != 1.0:
+            text += f" {SCALE_NAMES.get(self.scale, f'x{self.scale:g}')}"
+        if self.percent:
+            text += "%"
+        return f"{text} ({self.period})" if self.period else text
+
+
+def _decimals(value: float) -> int:
+    return 0 if float(value).is_integer() else min(len(repr(abs(value)).split(".")[1]), 4)
+
+
+class MetricTable:
+    """Metric records stored column-wise in NumPy arrays.
+
+    Metric names, currencies and periods are stored as integer codes into
+    small vocabularies (-1 for none), so a table of thousands of records
+    takes a few dozen bytes per record and filters or aggregates without
+    touching the document text again.
+    """
+
+    AGGREGATES = ("count", "sum", "mean", "min", "max", "first", "last")
+    GROUP_BY = ("metric", "period", "currency", "page")
+
+    def __init__(self, metrics: Sequence[str], currencies: Sequence[str], periods: Sequence[str],
+                 columns: Dict[str, np.ndarray]):
+        self.metrics = list(metrics)
+        self.currencies = list(currencies)
+        self.periods = list(periods)
+        self.metric = columns['metric']
+        self.value = columns['value']
+        self.scale = columns['scale']
+        self.currency = columns['currency']
+        self.period = columns['period']
+        self.page = columns['page']
+        self.offset = columns['offset']
+        self.percent = columns['percent']
+
+    @classmethod
+    def from_records(cls, records: Sequence[MetricRecord], metrics: Sequence[str] = ()) -> "MetricTable":
+        """Build a table; ``metrics`` fixes the order of metric codes (e.g. definition order)."""
+        metric_names = list(dict.fromkeys(list(metrics) + [record.metric for record in records]))
+        currencies = sorted({record.currency for record in records if record.currency})
+        periods = sorted({record.period for record in records if record.period})
+        codes = {
+            'metric': {name: i for i, name in enumerate(metric_names)},
+            'currency': {name: i for i, name in enumerate(currencies)},
+            'period': {name: i for i, name in enumerate(periods)},
+        }
+        count = len(records)
+        columns = {
+            'metric': np.fromiter((codes['metric'][r.metric] for r in records), np.int16, count),
+            'value': np.fromiter((r.value for r in records), np.float64, count),
+            'scale': np.fromiter((r.scale for r in records), np.float64, count),
+            'currency': np.fromiter((codes['currency'].get(r.currency, -1) for r in records), np.int16, count),
+            'period': np.fromiter((codes['period'].get(r.period, -1) for r in records), np.int32, count),
+            'page': np.fromiter((r.page for r in records), np.int32, count),
+            'offset': np.fromiter((r.offset for r in records), np.int64, count),
+            'percent': np.fromiter((r.percent for r in records), np.bool_, count),
+        }
+        return cls(metric_names, currencies, periods, columns)
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def __iter__(self) -> Iterator[MetricRecord]:
+        return (self.record(i) for i in range(len(self)))
+
+    def record(self, i: int) -> MetricRecord:
+        currency, period = int(self.currency[i]), int(self.period[i])
+        return MetricRecord(
+            metric=self.metrics[int(self.metric[i])],
+            value=float(self.value[i]),
+            scale=float(self.scale[i]),
+            currency=self.currencies[currency] if currency >= 0 else None,
+            period=self.periods[period] if period >= 0 else None,
+            page=int(self.page[i]),
+            offset=int(self.offset[i]),
+            percent=bool(self.percent[i]),
+        )
+
+    @property
+    def amounts(self) -> np.ndarray:
+        """Values in base units (value times scale)."""
+        return self.value * self.scale
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns().values())
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        return {
+            'metric': self.metric, 'value': self.value, 'scale': self.scale, 'currency': self.currency,
+            'period': self.period, 'page': self.page, 'offset': self.offset, 'percent': self.percent,
+        }
+
+    def _code(self, vocabulary: List[str], name: Optional[str]) -> int:
+        return vocabulary.index(name) if name in vocabulary else -2  # -2 matches no record
+
+    def mask(self, metric: Optional[str] = None, period: Optional[str] = None,
+             currency: Optional[str] = None, page: Optional[int] = None,
+             percent: Optional[bool] = None) -> np.ndarray:
+        """Boolean mask of the records matching every given filter."""
+        mask = np.ones(len(self), dtype=bool)
+        if metric is not None:
+            mask &= self.metric == self._code(self.metrics, metric)
+        if period is not None:
+            mask &= self.period == self._code(self.periods, period)
+        if currency is not None:
+            mask &= self.currency == self._code(self.currencies, currency)
+        if page is not None:
+            mask &= self.page == page
+        if percent is not None:
+            mask &= self.percent == percent
+        return mask
+
+    def select(self, **filters: Any) -> "MetricTable":
+        """Sub-table of the records matching ``filters`` (see mask)."""
+        mask = self.mask(**filters)
+        columns = {name: column[mask] for name, column in self._columns().items()}
+        return MetricTable(self.metrics, self.currencies, self.periods, columns)
+
+    def aggregate(self, how: str = "sum", by: Optional[str] = None,
+                  **filters: Any) -> Any:
+        """Aggregate the amounts of the matching records.
+
+        ``how`` is one of AGGREGATES; "first" and "last" follow document order.
+        Without ``by`` a single number is returned (None when nothing matches,
+        except for "count"); with ``by`` one of GROUP_BY, a dict keyed by group.
+        """
+        if how not in self.AGGREGATES:
+            raise ValueError(f"Unknown aggregate {how!r}; use one of {', '.join(self.AGGREGATES)}")
+        table = self.select(**filters) if filters else self
+        amounts = table.amounts
+        if by is None:
+            return _reduce(how, amounts)
+        if by not in self.GROUP_BY:
+            raise ValueError(f"Cannot group by {by!r}; use one of {', '.join(self.GROUP_BY)}")
+
+        codes = getattr(table, by)
+        labels = {'metric': self.metrics, 'period': self.periods, 'currency': self.currencies}.get(by)
+        result = {}
+        for code in np.unique(codes):
+            key = int(code) if labels is None else (labels[code] if code >= 0 else None)
+            result[key] = _reduce(how, amounts[codes == code])
+        return result
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-metric overview: occurrences, first value and the range of amounts."""
+        summary = {}
+        for code, name in enumerate(self.metrics):
+            indexes = np.flatnonzero(self.metric == code)
+            if not len(indexes):
+                continue
+            first = self.record(int(indexes[0]))
+            amounts = self.amounts[indexes]
+            summary[name] = {
+                'count': int(len(indexes)),
+                'first': first.display(),
+                'first_amount': first.amount,
+                'min': float(amounts.min()),
+                'max': float(amounts.max()),
+                'currency': first.currency,
+                'percent': first.percent,
+                'periods': sorted({self.periods[p] for p in self.period[indexes] if p >= 0}),
+            }
+        return summary
+
+
+def _reduce(how: str, amounts: np.ndarray) -> Optional[float]:
+    if how == "count":
+        return int(len(amounts))
+    if not len(amounts):
+        return None
+    if how == "first":
+        return float(amounts[0])
+    if how == "last":
+        return float(amounts[-1])
+    return float(getattr(np, how)(amounts))
+
+
+class MetricExtractor:
+    """Find every occurrence of the defined metrics and parse it into a MetricRecord.
+
+    All metric rules are matched in one pass per page with a PatternScanner.
+    Values that do not fit the metric's kind (e.g. "revenue up 12%", which
+    is growth rather than revenue) are skipped. A record's period is the
+    nearest period mention in its sentence, or else the last one on an
+    earlier line of the page, such as a "Q2 2025" heading.
+    """
+
+    def __init__(self, definitions: Optional[Dict[str, Tuple[str, str]]] = None):
+        self.definitions = dict(definitions or METRIC_DEFINITIONS)
+        self._scanner = PatternScanner([
+            (name, f"(?:{label}){_GAP}{_VALUE}") for name, (label, _) in self.definitions.items()
+        ])
+
+    def extract(self, pages: Sequence[str], first_page: int = 1) -> MetricTable:
+        """Extract the metrics of each page (or paragraph) text, numbered from ``first_page``."""
+        records = []
+        for page_number, text in enumerate(pages, start=first_page):
+            if not text:
+                continue
+            period_matches = list(_PERIOD_RE.finditer(text))
+            periods = ([match.start() for match in period_matches], [_period_label(match) for match in period_matches])
+            for name, matches in self._scanner.find_all(text).items():
+                for match in matches:
+                    record = self._parse(name, match, page_number, text, periods)
+                    if record is not None:
+                        records.append(record)
+        records.sort(key=lambda record: (record.page, record.offset))
+        return MetricTable.from_records(records, metrics=list(self.definitions))
+
+    def _parse(self, name: str, match: re.Match, page: int, text: str,
+               periods: Tuple[List[int], List[str]]) -> Optional[MetricRecord]:
+        kind = self.definitions[name][1]
+        currency_text = match.group('currency') or match.group('outer_currency')
+        scale_text = match.group('scale')
+        percent = bool(match.group('percent'))
+
+        if kind in ('amount', 'per_share') and percent:
+            return None
+        if kind == 'ratio' and (currency_text or percent):
+            return None
+        if kind == 'percent':
+            if currency_text or scale_text:
+                return None
+            percent = True
+
+        value = float((match.group('number') or match.group('bare')).replace(",", ""))
+        if match.group('sign') or match.group('open'):
+            value = -value
+        value_start = min(match.start(group) for group in ('open', 'sign', 'currency', 'number', 'bare')
+                          if match.group(group))
+        currency = None
+        if currency_text:
+            currency = CURRENCIES.get(currency_text, currency_text.upper())
+        return MetricRecord(
+            metric=name,
+            value=value,
+            scale=SCALES[scale_text.lower()] if scale_text else 1.0,
+            currency=currency,
+            period=_nearest_period(periods, text, match.start(), value_start, match.end()),
+            page=page,
+            offset=match.start(),
+            percent=percent,
+        )
+
+
+def _nearest_period(periods: Tuple[List[int], List[str]], text: str, start: int, value_start: int,
+                    end: int) -> Optional[str]:
+    """Closest period mention in the match's sentence, else the last one on an earlier line.
+
+    ``periods`` holds the sorted offsets of the page's period mentions and
+    their labels. Mentions inside the value itself (``value_start`` to
+    ``end``) are ignored. Searches stay within the match's line, so the
+    cost does not grow with the page length.
+    """
+    positions, labels = periods
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    line_end = len(text) if line_end == -1 else line_end
+    sentence_start = max(line_start, text.rfind(". ", line_start, start) + 2, text.rfind("; ", line_start, start) + 2)
+    sentence_end = min(
+        (position for position in (text.find(". ", end, line_end), text.find("; ", end, line_end))
+         if position != -1),
+        default=line_end
+    )
+
+    in_sentence = [
+        (abs(positions[i] - start), labels[i])
+        for i in range(bisect_left(positions, sentence_start), bisect_left(positions, sentence_end))
+        if not value_start <= positions[i] < end
+    ]
+    if in_sentence:
+        return min(in_sentence)[1]
+    before = bisect_left(positions, line_start)
+    return labels[before - 1] if before else None
@@ -0,0 +1,244 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+class JobStatus(str, Enum):
+    """Lifecycle states of an analysis job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Job(BaseModel):
+    """An asynchronous document analysis submitted through the jobs API."""
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="Job identifier")
+    status: JobStatus = Field(default=JobStatus.QUEUED, description="Current lifecycle state")
+    stage: str = Field(default="queued", description="Pipeline stage the job is in")
+    filename: Optional[str] = Field(default=None, description="Name of the uploaded file")
+    query: str = Field(default="", description="Analysis query")
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
+    result: Optional[Dict[str, Any]] = Field(default=None, description="Payload built by run_crew")
+    error: Optional[str] = Field(default=None, description="Error message if the job failed")
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def summary(self) -> Dict[str, Any]:
+        """Status view of the job without the (potentially large) result payload."""
+        return self.model_dump(mode="json", exclude={"result"})
+
+
+class JobStore(ABC):
+    """Storage backend for analysis jobs."""
+
+    @abstractmethod
+    def add(self, job: Job) -> Job:
+        """Persist a new job."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return the job with the given id, or None if it does not exist."""
+
+    @abstractmethod
+    def delete(self, job_id: str) -> None:
+        """Remove a job from the store."""
+
+    @abstractmethod
+    def update(self, job_id: str, **fields) -> Job:
+        """Apply field changes to a stored job in one step and return the updated job.
+
+        Raises KeyError if the job does not exist.
+        """
+
+
+def _apply(job: Job, fields: Dict[str, Any]) -> Job:
+    return job.model_copy(update={**fields, "updated_at": _utcnow()})
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local job store; jobs are lost when the worker restarts.
+
+    Finished jobs are dropped ``finished_ttl`` seconds after their last
+    update (None keeps them forever), so polling clients have that long to
+    fetch a result.
+    """
+
+    def __init__(self, finished_ttl: Optional[float] = None):
+        self.finished_ttl = finished_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _expired(self, job: Job, now: float) -> bool:
+        return (self.finished_ttl is not None and job.finished
+                and now - job.updated_at.timestamp() > self.finished_ttl)
+
+    def add(self, job: Job) -> Job:
+        now = time.time()
+        with self._lock:
+            for expired in [j.id for j in self._jobs.values() if self._expired(j, now)]:
+                del self._jobs[expired]
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and self._expired(job, time.time()):
+                del self._jobs[job_id]
+                return None
+            return job
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def update(self, job_id: str, **fields) -> Job:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise KeyError(f"Job not found: {job_id}")
+            job = self._jobs[job_id] = _apply(job, fields)
+        return job
+
+
+def _orphaned(pid: Optional[int]) -> bool:
+    """Whether the worker process that last wrote a job is gone."""
+    # Our own pid can only be left over from an earlier run (e.g. pid 1 in a restarted container)
+    if pid is None or pid == os.getpid():
+        return True
+    if os.name == "nt":  # No signal-0 probe on Windows; assume a single server process
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+class SQLiteJobStore(JobStore):
+    """Job store backed by a SQLite file, so job state survives restarts.
+
+    Each row records the pid of the worker that last wrote it. On startup,
+    queued or running jobs whose worker is no longer alive are marked
+    failed, since nothing will ever pick them up again. Finished jobs are
+    deleted ``finished_ttl`` seconds after they finished, as in
+    InMemoryJobStore.
+    """
+
+    def __init__(self, path: str, finished_ttl: Optional[float] = None):
+        self.path = path
+        self.finished_ttl = finished_ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS jobs "
+                         "(id TEXT PRIMARY KEY, data TEXT NOT NULL, pid INTEGER, finished_at REAL)")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            for column, column_type in (("pid", "INTEGER"), ("finished_at", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._recover_jobs()
+
+    def _recover_jobs(self) -> None:
+        """Fail orphaned jobs and date finished rows written before finished_at existed."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT data, pid FROM jobs WHERE finished_at IS NULL").fetchall()
+        for data, pid in rows:
+            job = Job.model_validate_json(data)
+            if job.finished:
+                with self._connect() as conn:
+                    conn.execute("UPDATE jobs SET finished_at = ? WHERE id = ?",
+                                 (job.updated_at.timestamp(), job.id))
+            elif _orphaned(pid):
+                self.update(job.id, status=JobStatus.FAILED, stage="done",
+                            error="Interrupted: the server restarted before the job finished")
+        with self._connect() as conn:
+            self._expire(conn)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, commit on success and always close it."""
+        with self._lock:
+            conn = sqlite3.connect(self.path, timeout=30)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    def _expiry(self) -> float:
+        """finished_at before which rows are expired; -inf when jobs are kept forever."""
+        return time.time() - self.finished_ttl if self.finished_ttl is not None else float("-inf")
+
+    def _expire(self, conn: sqlite3.Connection) -> None:
+        if self.finished_ttl is not None:
+            conn.execute("DELETE FROM jobs WHERE finished_at < ?", (self._expiry(),))
+
+    @staticmethod
+    def _row(job: Job) -> Tuple[str, int, Optional[float]]:
+        """Columns stored for ``job`` besides its id: data, pid and finished_at."""
+        finished_at = job.updated_at.timestamp() if job.finished else None
+        return json.dumps(job.model_dump(mode="json")), os.getpid(), finished_at
+
+    def add(self, job: Job) -> Job:
+        with self._connect() as conn:
+            self._expire(conn)
+            conn.execute("INSERT OR REPLACE INTO jobs (id, data, pid, finished_at) VALUES (?, ?, ?, ?)",
+                         (job.id, *self._row(job)))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM jobs WHERE id = ? AND (finished_at IS NULL OR finished_at >= ?)",
+                (job_id, self._expiry())
+            ).fetchone()
+        return Job.model_validate_json(row[0]) if row else None
+
+    def delete(self, job_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def update(self, job_id: str, **fields) -> Job:
+        with self._connect() as conn:
+            # Take the write lock before reading, so updates from other workers cannot interleave
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"Job not found: {job_id}")
+            job = _apply(Job.model_validate_json(row[0]), fields)
+            conn.execute("UPDATE jobs SET data = ?, pid = ?, finished_at = ? WHERE id = ?",
+                         (*self._row(job), job_id))
+        return job
+
+
+def create_job_store(backend: str, path: str = "", finished_ttl: Optional[float] = None) -> JobStore:
+    """Build the job store selected by configuration ("memory" or "sqlite")."""
+    backend = backend.lower()
+    if backend == "memory":
+        return InMemoryJobStore(finished_ttl)
+    if backend == "sqlite":
+        return SQLiteJobStore(path, finished_ttl)
+    raise ValueError(f"Unsupported job store backend: {backend}")
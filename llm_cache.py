@@ -0,0 +1,59 @@
+import hashlib
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumpd, load
+
+from cache import CacheStats, LRUCache, SQLiteCache, TieredCache, _json_size
+from telemetry import annotate, span
+
+
+class LLMResponseCache(BaseCache):
+    """LangChain response cache backed by an in-memory LRU and an optional SQLite tier.
+
+    LangChain passes the serialized model with its parameters as ``llm_string``
+    and the full serialized message list as ``prompt``; both are hashed into
+    the key, so a change of model, temperature or any message misses.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int], ttl: Optional[float],
+                 disk_path: str = "", disk_max_bytes: Optional[int] = None):
+        memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, sizeof=_json_size)
+        disk = SQLiteCache(disk_path, max_bytes=disk_max_bytes, ttl=ttl, compress=True) if disk_path else None
+        self._cache = TieredCache(memory, disk)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        digest = hashlib.sha256(llm_string.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Return the cached generations for this model and prompt, if any."""
+        key = self.make_key(prompt, llm_string)
+        with span("llm.cache.lookup"):
+            stored = self._cache.get(key)
+            annotate({"cache.hit": stored is not None})
+        if stored is None:
+            return None
+        try:
+            return [load(generation) for generation in stored]
+        except Exception as e:
+            # Entries written by an incompatible LangChain version are dropped
+            print(f"Warning: Discarding unreadable LLM cache entry: {str(e)}")
+            self._cache.delete(key)
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self._cache.set(
+            self.make_key(prompt, llm_string),
+            [dumpd(generation) for generation in return_val]
+        )
+
+    def clear(self, **kwargs: Any) -> None:
+        self._cache.clear()
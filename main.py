@@ -1,19 +1,39 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 import os
+import time
 import uuid
 import asyncio
-from typing import Dict, Any
+import hashlib
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
-from crewai import Crew, Process, Task
-from agents import financial_analyst, investment_advisor, risk_assessor
+from agents import build_agents, llm_cache
+from rate_limit import RateLimiter, bind_task_jobs, release_task_jobs
+from telemetry import annotate, bind_task_parents, release_task_parents, setup_tracing, span
+from metrics import CONTENT_TYPE, HTTP_REQUESTS, HTTP_REQUEST_DURATION, REGISTRY, STAGE_DURATION, Counter, Gauge
 from task import (
     create_document_analysis_task, 
     create_investment_analysis_task, 
     create_risk_assessment_task,
-    create_executive_summary_task
+    create_executive_summary_task,
+    RETRIEVAL_QUERIES,
+    TASK_SECTIONS,
+    TASK_CONTEXT_SHARES
 )
-from tools import FinancialDocumentTool
+from tools import (
+    FinancialDocumentTool, InvestmentAnalysisTool, RiskAssessmentTool, risk_rule_engine, document_text_cache,
+    INVESTMENT_SECTIONS, RISK_SECTIONS
+)
+from config import (
+    MAX_FILE_SIZE, UPLOAD_CHUNK_SIZE, BATCH_MAX_FILES, BATCH_CONCURRENCY, BATCH_QUEUE_TIMEOUT, CREW_WORKERS, CREW_QUEUE_DEPTH, CREW_PARALLEL_TASKS, SUMMARY_OUTPUT_DIR, RETRIEVAL_ENABLED, JOB_STORE_BACKEND, JOB_STORE_PATH, JOB_FINISHED_TTL, MODEL_CONFIG,
+    RESULT_CACHE_ENABLED, RESULT_CACHE_TTL, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_PATH, RESULT_CACHE_DISK_MAX_BYTES, LLM_MODEL, LLM_CONTEXT_WINDOW, CONTEXT_RESERVED_TOKENS
+)
+from context_packer import context_budget, context_window
+from executor import CrewExecutor, QueueFullError
+from cache import ResultCache, remember_file_hash
+from jobs import Job, JobStatus, create_job_store
 
 app = FastAPI(
     title="Financial Document Analyzer",
@@ -21,27 +41,188 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Export spans for the request -> crew -> task -> tool -> LLM path (TRACING_EXPORTER)
+setup_tracing(app)
+
 # Ensure data directory exists
 os.makedirs("data", exist_ok=True)
 
-def run_crew(query: str, file_path: str) -> Dict[str, Any]:
+DEFAULT_QUERY = "Analyze this financial document for investment insights"
+
+# Analysis modes accepted by /analyze: the full LLM crew, the rule-based fast
+# path, or the crew with a fast-path fallback when the worker pool is full
+ANALYSIS_MODES = ("crew", "fast", "auto")
+
+# Worker pool that runs crews so the event loop stays free for other requests
+crew_executor = CrewExecutor(max_workers=CREW_WORKERS, max_queue=CREW_QUEUE_DEPTH)
+
+# Store for jobs submitted through the asynchronous /jobs API
+job_store = create_job_store(JOB_STORE_BACKEND, JOB_STORE_PATH, JOB_FINISHED_TTL)
+
+# Analyses keyed on document bytes + query, so re-uploads skip the crew
+result_cache = ResultCache(
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=RESULT_CACHE_MAX_BYTES,
+    ttl=RESULT_CACHE_TTL,
+    disk_path=RESULT_CACHE_PATH,
+    disk_max_bytes=RESULT_CACHE_DISK_MAX_BYTES,
+    model_config=MODEL_CONFIG
+) if RESULT_CACHE_ENABLED else None
+
+# Allowance for multipart boundaries and form fields on top of the file itself
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
+class UploadSizeLimitMiddleware:
+    """Refuse POST bodies over the upload limit while they are received.
+    
+    A declared Content-Length over the limit is refused before reading the
+    body. Bodies without one (chunked transfer) are counted as they arrive,
+    and the 413 is sent as soon as they cross the limit, before multipart
+    parsing has spooled the rest to disk; the app then sees a disconnect.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        
+        max_files = BATCH_MAX_FILES if scope["path"] == "/analyze/batch" else 1
+        limit = (MAX_FILE_SIZE + UPLOAD_OVERHEAD_BYTES) * max_files
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        too_large = JSONResponse(status_code=413, content={"detail": _file_too_large_message()})
+        if content_length.isdigit() and int(content_length) > limit:
+            await too_large(scope, receive, send)
+            return
+        
+        received = 0
+        rejected = False
+        
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected = True
+                    await too_large(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+        
+        async def guarded_send(message):
+            # Once the 413 is out, whatever the app answers to the disconnect is dropped
+            if not rejected:
+                await send(message)
+        
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time them per route template (not per raw path)"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=str(status))
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, route=route)
+
+def _cache_stats() -> Dict[str, Any]:
+    caches = {"result": result_cache, "document_text": document_text_cache, "llm": llm_cache}
+    return {name: cache.stats for name, cache in caches.items() if cache is not None}
+
+REGISTRY.register(Gauge(
+    "crew_jobs_in_flight", "Crews currently running on the worker pool.",
+    callback=lambda: {(): crew_executor.running}
+))
+REGISTRY.register(Gauge(
+    "crew_queue_depth", "Crews waiting for a free worker.",
+    callback=lambda: {(): crew_executor.queued}
+))
+REGISTRY.register(Counter(
+    "cache_lookups_total", "Cache lookups since start by cache and result.", ["cache", "result"],
+    callback=lambda: {
+        key: value for name, stats in _cache_stats().items()
+        for key, value in (((name, "hit"), stats.hits), ((name, "miss"), stats.misses))
+    }
+))
+REGISTRY.register(Gauge(
+    "cache_hit_ratio", "Share of cache lookups served from cache.", ["cache"],
+    callback=lambda: {(name,): stats.hit_ratio for name, stats in _cache_stats().items()}
+))
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    """Wait for in-flight crews before the worker exits"""
+    crew_executor.shutdown(wait=True)
+
+def run_crew(query: str, file_path: str,
+             on_stage: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
     """Run the financial analysis crew with the given query and file path"""
+    with span("crew.run", {
+        "document.path": file_path,
+        "document.size_bytes": os.path.getsize(file_path) if os.path.exists(file_path) else None,
+        "crew.parallel_tasks": CREW_PARALLEL_TASKS,
+        "query.length": len(query)
+    }):
+        response = _run_crew(query, file_path, on_stage)
+        annotate({"crew.status": response.get("status"), "crew.fallback": response.get("fallback")})
+        return response
+
+def _run_crew(query: str, file_path: str,
+              on_stage: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    report_stage = on_stage or (lambda stage: None)
     try:
         # Create tasks using factory functions
-        doc_analysis_task = create_document_analysis_task(file_path)
-        invest_analysis_task = create_investment_analysis_task(doc_analysis_task, query)
-        risk_task = create_risk_assessment_task(doc_analysis_task)
+        report_stage("preparing_tasks")
+        excerpts = _task_excerpts(query, file_path)
+        # Each crew gets its own agents: crewai keeps run state on them, and
+        # other crews may be running on the worker pool at the same time
+        crew_agents = build_agents()
+        doc_analysis_task = create_document_analysis_task(
+            file_path, excerpts=excerpts["document_analysis"],
+            agent=crew_agents["financial_analyst"]
+        )
+        
+        # Investment and risk analysis depend only on the document analysis, so they
+        # can run in parallel; the summary task joins both before it starts
+        invest_analysis_task = create_investment_analysis_task(
+            doc_analysis_task, query, async_execution=CREW_PARALLEL_TASKS,
+            excerpts=excerpts["investment_analysis"], agent=crew_agents["investment_advisor"]
+        )
+        risk_task = create_risk_assessment_task(
+            doc_analysis_task, async_execution=CREW_PARALLEL_TASKS,
+            excerpts=excerpts["risk_assessment"], agent=crew_agents["risk_assessor"]
+        )
         
         # Create executive summary task
         summary_task = create_executive_summary_task(
             document_analysis_task=doc_analysis_task,
             investment_analysis_task=invest_analysis_task,
-            risk_assessment_task=risk_task
+            risk_assessment_task=risk_task,
+            output_file=_summary_path(file_path),
+            excerpts=excerpts["executive_summary"],
+            agent=crew_agents["financial_analyst"]
         )
         
-        # Create a new crew with all agents and tasks
+        # Create a new crew with all agents and tasks; crewai is only loaded once a crew runs
+        from crewai import Crew, Process
+        
         financial_crew = Crew(
-            agents=[financial_analyst, investment_advisor, risk_assessor],
+            agents=list(crew_agents.values()),
             tasks=[
                 doc_analysis_task,
                 invest_analysis_task,
@@ -53,18 +234,36 @@ def run_crew(query: str, file_path: str) -> Dict[str, Any]:
         )
         
         # Execute the crew with the input parameters
-        result = financial_crew.kickoff({
-            'query': query,
-            'file_path': file_path
-        })
-        
-        # Read the executive summary if it was created
-        summary = ""
-        if os.path.exists("executive_summary.md"):
-            with open("executive_summary.md", "r") as f:
-                summary = f.read()
-            # Optionally remove the file after reading
-            os.remove("executive_summary.md")
+        # LLM calls of this crew take turns with other crews at the rate limiter
+        report_stage("running_crew")
+        stages = {
+            "document_analysis": doc_analysis_task,
+            "investment_analysis": invest_analysis_task,
+            "risk_assessment": risk_task,
+            "summary": summary_task
+        }
+        bind_task_parents(stages)
+        bind_task_jobs(stages, file_path)
+        try:
+            with RateLimiter.job(file_path):
+                result = financial_crew.kickoff({
+                    'query': query,
+                    'file_path': file_path
+                })
+        finally:
+            release_task_parents(stages)
+            release_task_jobs(stages)
+        
+        # Errors in parallel tasks are raised on their own threads; catch them here
+        # instead of returning a summary built on missing context
+        failed = [task.agent.role for task in financial_crew.tasks if task.output is None]
+        if failed:
+            raise RuntimeError(f"Tasks produced no output: {', '.join(failed)}")
+        
+        # The summary is read from the task output in memory, so concurrent crews
+        # never share a file
+        report_stage("collecting_summary")
+        summary = summary_task.output.raw_output if summary_task.output else ""
         
         return {
             "status": "success",
@@ -75,12 +274,11 @@ def run_crew(query: str, file_path: str) -> Dict[str, Any]:
     except Exception as e:
         # Check for OpenAI quota error
         if "insufficient_quota" in str(e):
-            # Return mock response when API quota is exceeded
-            return {
-                "status": "success",
-                "analysis": "Mock analysis since OpenAI API quota exceeded. Here's a sample analysis based on the document structure:\n\n## Financial Overview\n- Revenue: $1.2B (up 15% YoY)\n- Net Income: $150M (up 10% YoY)\n- EBITDA Margin: 25%\n\n## Key Insights\n- Strong revenue growth in Q2 2025\n- Improved operational efficiency\n- Healthy cash flow position\n\n## Recommendations\n- Maintain current investment strategy\n- Consider expansion in emerging markets\n- Monitor supply chain risks",
-                "executive_summary": "# Executive Summary (Mock Data)\n\n## Overview\nThis is a mock executive summary generated because the OpenAI API quota has been exceeded. In a production environment with a valid API key, this would contain AI-generated analysis of the uploaded financial document.\n\n## Key Findings\n- Document successfully processed\n- Financial metrics extracted\n- Risk assessment completed\n\n## Next Steps\n1. Add valid OpenAI API key to .env file\n2. Restart the application\n3. Upload document again for AI-powered analysis"
-            }
+            # Fall back to the rule-based analysis when API quota is exceeded
+            response = run_fast_analysis(query=query, file_path=file_path)
+            if response.get("status") == "success":
+                response["fallback"] = "OpenAI API quota exceeded"
+                return response
         
         # For other errors, return the error message
         return {
@@ -88,6 +286,82 @@ def run_crew(query: str, file_path: str) -> Dict[str, Any]:
             "message": f"Error in crew execution: {str(e)}"
         }
 
+def _task_excerpts(query: str, file_path: str) -> Dict[str, str]:
+    """Pack each task's document context into its token budget, keyed like TASK_CONTEXT_SHARES"""
+    if not RETRIEVAL_ENABLED:
+        return {task: "" for task in TASK_CONTEXT_SHARES}
+    
+    document = FinancialDocumentTool(file_path=file_path)
+    budget = context_budget(LLM_CONTEXT_WINDOW or context_window(LLM_MODEL), CONTEXT_RESERVED_TOKENS)
+    requests = {}
+    for task, share in TASK_CONTEXT_SHARES.items():
+        retrieval_query = RETRIEVAL_QUERIES.get(task, query)
+        if task == "investment_analysis":
+            retrieval_query = f"{query} {retrieval_query}"
+        requests[task] = (retrieval_query, int(budget * share), TASK_SECTIONS[task])
+    return document.packed_contexts(requests)
+
+def run_fast_analysis(query: str, file_path: str) -> Dict[str, Any]:
+    """Analyze a document with the rule-based tools only, without any LLM call"""
+    with span("fast_analysis.run", {"document.path": file_path}):
+        return _run_fast_analysis(query, file_path)
+
+def _run_fast_analysis(query: str, file_path: str) -> Dict[str, Any]:
+    try:
+        # Each tool reads only the page sections it needs; boilerplate and exhibits are skipped
+        document = FinancialDocumentTool(file_path=file_path)
+        investment_text = document._run(sections=list(INVESTMENT_SECTIONS))
+        risk_text = document._run(sections=list(RISK_SECTIONS))
+        
+        # Investment metrics and opportunities
+        investment_tool = InvestmentAnalysisTool(document_text=investment_text)
+        metric_table = document.metric_table(sections=list(INVESTMENT_SECTIONS))
+        metrics = investment_tool._extract_financial_metrics(metric_table)
+        opportunities = investment_tool._identify_opportunities(investment_tool._scan())
+        
+        # Risks across all rule pack categories
+        risk_tool = RiskAssessmentTool(document_text=risk_text)
+        rule_set = risk_rule_engine.rule_set
+        risks = rule_set.classify(risk_text)
+        risk_level, risk_summary = risk_tool._assess_overall_risk(rule_set.categories, risks)
+        
+        analysis = "\n\n".join([
+            investment_tool._format_report(metrics, opportunities),
+            risk_tool._format_report(rule_set.categories, risks)
+        ])
+        
+        summary = ["# Executive Summary (Rule-Based)\n", "## Overview"]
+        summary.append(f"Rule-based triage for: {query}")
+        summary.append(f"**Risk Level:** {risk_level}. {risk_summary}")
+        summary.append("\n## Key Metrics")
+        summary.extend(f"- {metric}: {value}" for metric, value in metrics.items())
+        if not metrics:
+            summary.append("No specific financial metrics found in the document.")
+        summary.append("\n## Top Risks")
+        top_risks = sorted(
+            (risk for category_risks in risks.values() for risk in category_risks),
+            key=lambda risk: risk.count, reverse=True
+        )[:5]
+        summary.extend(f"- {risk.description}" for risk in top_risks)
+        if not top_risks:
+            summary.append("No significant risks identified.")
+        summary.append("\n## Next Steps")
+        summary.append("- Run the full analysis (mode=crew) for investment recommendations")
+        
+        return {
+            "status": "success",
+            "mode": "fast",
+            "analysis": analysis,
+            "metrics": metric_table.summary(),
+            "executive_summary": "\n".join(summary)
+        }
+        
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error in fast analysis: {str(e)}"
+        }
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -97,12 +371,22 @@ async def root():
         "version": "1.0.0"
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: requests, crew pool, stage latencies, LLM tokens and cache hit ratios"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.post("/analyze")
 async def analyze_financial_document(
     file: UploadFile = File(..., description="Financial document to analyze (PDF/DOCX)"),
     query: str = Form(
-        default="Analyze this financial document for investment insights",
+        default=DEFAULT_QUERY,
         description="Specific analysis query or instructions"
+    ),
+    mode: str = Form(
+        default="crew",
+        description="'crew' for the full AI analysis, 'fast' for rule-based analysis without "
+                    "LLM calls, 'auto' to use the fast path when the AI workers are saturated"
     )
 ):
     """
@@ -111,33 +395,28 @@ async def analyze_financial_document(
     This endpoint accepts a financial document and returns an analysis including
     financial metrics, investment recommendations, and risk assessment.
     """
-    # Validate file type
-    file_ext = Path(file.filename).suffix.lower() if file.filename else ''
-    if file_ext not in ['.pdf', '.docx', '.doc']:
-        raise HTTPException(
-            status_code=400,
-            detail="Unsupported file type. Please upload a PDF or DOCX file."
-        )
-    
-    file_id = str(uuid.uuid4())
-    file_path = f"data/financial_document_{file_id}{file_ext}"
+    mode = _validate_mode(mode)
+    file_ext = _validate_file_type(file)
+    file_path = _new_upload_path(file_ext)
+    query = query.strip() or DEFAULT_QUERY
     
     try:
         # Save uploaded file
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        content_hash = await _save_upload(file, file_path)
         
-        # Process the document with all analysts
-        response = run_crew(
-            query=query.strip() or "Analyze this financial document for investment insights",
-            file_path=file_path
-        )
+        # Process the document with all analysts on the worker pool
+        response = await _analyze_saved_document(query, file_path, content_hash, mode)
         
         # Add file info to response
         response["file_processed"] = file.filename
         return response
         
+    except HTTPException:
+        raise
+        
+    except QueueFullError as e:
+        raise _busy_error(e)
+        
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -145,12 +424,362 @@ async def analyze_financial_document(
         )
     
     finally:
-        # Clean up uploaded file
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                print(f"Warning: Failed to clean up file {file_path}: {str(e)}")
+        _cleanup_file(file_path)
+
+@app.post("/analyze/batch")
+async def analyze_financial_documents_batch(
+    files: List[UploadFile] = File(..., description="Financial documents to analyze (PDF/DOCX)"),
+    query: str = Form(
+        default=DEFAULT_QUERY,
+        description="Analysis query or instructions shared by all documents"
+    ),
+    mode: str = Form(
+        default="crew",
+        description="Analysis mode for every document, as for /analyze"
+    )
+):
+    """
+    Analyze several financial documents, e.g. a company's quarterly reports, in one request.
+    
+    Identical files are analysed once, text is extracted for all documents in
+    parallel and at most BATCH_CONCURRENCY crews of the batch run at a time.
+    Returns one result per uploaded file plus a combined executive summary.
+    """
+    mode = _validate_mode(mode)
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files. A batch accepts at most {BATCH_MAX_FILES} documents."
+        )
+    file_exts = [_validate_file_type(file) for file in files]
+    query = query.strip() or DEFAULT_QUERY
+    file_paths: List[str] = []
+    
+    try:
+        # (filename, content hash) per upload; the first copy of each content is analysed
+        uploads: List[Tuple[Optional[str], str]] = []
+        unique_paths: Dict[str, str] = {}
+        for file, file_ext in zip(files, file_exts):
+            file_path = _new_upload_path(file_ext)
+            file_paths.append(file_path)
+            content_hash = await _save_upload(file, file_path)
+            uploads.append((file.filename, content_hash))
+            unique_paths.setdefault(content_hash, file_path)
+        annotate({"batch.documents": len(uploads), "batch.unique_documents": len(unique_paths)})
+        
+        # Fill the document text cache for all documents at once, so the
+        # analyses below start from already extracted text; the parsing runs
+        # on the extraction process pool, so the documents are read in parallel
+        if document_text_cache is not None:
+            await asyncio.gather(*(asyncio.to_thread(_extract_text, path) for path in unique_paths.values()))
+        
+        limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+        # Crews of other requests may fill the pool; wait for them rather than fail
+        # the document, except in auto mode, which falls back to the fast path
+        queue_timeout = BATCH_QUEUE_TIMEOUT if mode == "crew" else 0
+        
+        async def analyze(content_hash: str, file_path: str) -> Dict[str, Any]:
+            async with limit:
+                try:
+                    return await _analyze_saved_document(query, file_path, content_hash, mode, queue_timeout)
+                except QueueFullError as e:
+                    return {"status": "error", "message": _busy_error(e).detail}
+                except Exception as e:
+                    return {"status": "error", "message": f"Error processing financial document: {str(e)}"}
+        
+        responses = await asyncio.gather(*(
+            analyze(content_hash, file_path) for content_hash, file_path in unique_paths.items()
+        ))
+        by_hash = dict(zip(unique_paths, responses))
+        
+        results = []
+        first_filename: Dict[str, Optional[str]] = {}
+        for filename, content_hash in uploads:
+            result = {**by_hash[content_hash], "file_processed": filename}
+            if content_hash in first_filename:
+                result["duplicate_of"] = first_filename[content_hash]
+            else:
+                first_filename[content_hash] = filename
+            results.append(result)
+        
+        succeeded = sum(result.get("status") == "success" for result in results)
+        return {
+            "status": "success" if succeeded == len(results) else "partial" if succeeded else "error",
+            "query": query,
+            "documents": len(results),
+            "unique_documents": len(unique_paths),
+            "results": results,
+            "combined_summary": _combined_summary(query, results)
+        }
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing financial documents: {str(e)}"
+        )
+    
+    finally:
+        for file_path in file_paths:
+            _cleanup_file(file_path)
+
+@app.post("/jobs", status_code=202)
+async def submit_analysis_job(
+    file: UploadFile = File(..., description="Financial document to analyze (PDF/DOCX)"),
+    query: str = Form(
+        default=DEFAULT_QUERY,
+        description="Specific analysis query or instructions"
+    )
+):
+    """
+    Submit a financial document for analysis without waiting for the result.
+    
+    Returns a job id immediately; poll `GET /jobs/{job_id}` for progress and
+    fetch the analysis from `GET /jobs/{job_id}/result` once it has completed.
+    """
+    file_ext = _validate_file_type(file)
+    file_path = _new_upload_path(file_ext)
+    job = Job(filename=file.filename, query=query.strip() or DEFAULT_QUERY)
+    
+    try:
+        content_hash = await _save_upload(file, file_path)
+        
+        cached = _cached_response(content_hash, job.query)
+        if cached is not None:
+            cached["file_processed"] = file.filename
+            job.status, job.stage, job.result = JobStatus.COMPLETED, "done", cached
+            job_store.add(job)
+            _cleanup_file(file_path)
+        else:
+            job_store.add(job)
+            crew_executor.submit(_run_job, job.id, job.query, file_path, file.filename, content_hash)
+    
+    except HTTPException:
+        raise
+    
+    except QueueFullError as e:
+        job_store.delete(job.id)
+        _cleanup_file(file_path)
+        raise _busy_error(e)
+    
+    except Exception as e:
+        job_store.delete(job.id)
+        _cleanup_file(file_path)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error submitting financial document: {str(e)}"
+        )
+    
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "result_url": f"/jobs/{job.id}/result"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Report the status and pipeline stage of a submitted job"""
+    return _get_job_or_404(job_id).summary()
+
+@app.get("/jobs/{job_id}/result")
+async def get_analysis_job_result(job_id: str):
+    """Return the analysis of a finished job, in the same format as /analyze"""
+    job = _get_job_or_404(job_id)
+    
+    if not job.finished:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job {job_id} has not finished yet (status: {job.status.value})"
+        )
+    
+    if job.result is None:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing financial document: {job.error}"
+        )
+    
+    return job.result
+
+def _run_job(job_id: str, query: str, file_path: str, filename: Optional[str],
+             content_hash: str) -> None:
+    """Worker entry point for jobs submitted through /jobs"""
+    try:
+        job_store.update(job_id, status=JobStatus.RUNNING, stage="starting")
+        response = run_crew(
+            query=query,
+            file_path=file_path,
+            on_stage=lambda stage: job_store.update(job_id, stage=stage)
+        )
+        _store_response(content_hash, query, response)
+        response["file_processed"] = filename
+        
+        if response.get("status") == "error":
+            job_store.update(job_id, status=JobStatus.FAILED, stage="done",
+                             result=response, error=response.get("message"))
+        else:
+            job_store.update(job_id, status=JobStatus.COMPLETED, stage="done", result=response)
+    
+    except Exception as e:
+        job_store.update(job_id, status=JobStatus.FAILED, stage="done", error=str(e))
+    
+    finally:
+        _cleanup_file(file_path)
+
+async def _analyze_saved_document(query: str, file_path: str, content_hash: str,
+                                  mode: str, queue_timeout: float = 0) -> Dict[str, Any]:
+    """Analyze an uploaded document in the given mode, using and filling the result cache"""
+    if mode == "fast":
+        return await asyncio.to_thread(run_fast_analysis, query=query, file_path=file_path)
+    
+    cached = _cached_response(content_hash, query)
+    if cached is not None:
+        return cached
+    
+    try:
+        if queue_timeout:
+            response = await crew_executor.run_when_free(queue_timeout, run_crew, query=query, file_path=file_path)
+        else:
+            response = await crew_executor.run(
+                run_crew,
+                query=query,
+                file_path=file_path
+            )
+    except QueueFullError:
+        if mode != "auto":
+            raise
+        response = await asyncio.to_thread(run_fast_analysis, query=query, file_path=file_path)
+        response["fallback"] = "Analysis workers are saturated"
+    _store_response(content_hash, query, response)
+    return response
+
+def _extract_text(file_path: str) -> None:
+    """Read a document into the text cache; failures are reported by its analysis instead"""
+    try:
+        FinancialDocumentTool(file_path=file_path).read_pages(in_pool=True)
+    except Exception as e:
+        print(f"Warning: Failed to pre-extract {file_path}: {str(e)}")
+
+def _combined_summary(query: str, results: List[Dict[str, Any]]) -> str:
+    """Markdown overview of a batch followed by the executive summary of each distinct document"""
+    lines = ["# Combined Executive Summary\n", f"Analysis of {len(results)} documents for: {query}\n"]
+    lines.append("| Document | Status | Mode |")
+    lines.append("|----------|--------|------|")
+    for result in results:
+        status = result.get("status", "unknown")
+        if result.get("duplicate_of"):
+            status += f" (same content as {result['duplicate_of']})"
+        lines.append(f"| {result.get('file_processed')} | {status} | {result.get('mode', 'crew')} |")
+    
+    for result in results:
+        if result.get("duplicate_of"):
+            continue
+        lines.append(f"\n## {result.get('file_processed')}\n")
+        if result.get("status") == "success":
+            lines.append(str(result.get("executive_summary") or "No executive summary was produced."))
+        else:
+            lines.append(f"Analysis failed: {result.get('message', 'unknown error')}")
+    return "\n".join(lines)
+
+def _cached_response(content_hash: str, query: str) -> Optional[Dict[str, Any]]:
+    """Return a copy of a previously stored analysis, marked as cached"""
+    if result_cache is None:
+        return None
+    cached = result_cache.get(content_hash, query)
+    annotate({"result_cache.hit": cached is not None})
+    return {**cached, "cached": True} if cached is not None else None
+
+def _store_response(content_hash: str, query: str, response: Dict[str, Any]) -> None:
+    """Cache real crew analyses; errors and fast-path fallbacks are not stored"""
+    if result_cache is None or response.get("status") != "success" or response.get("fallback"):
+        return
+    try:
+        result_cache.set(content_hash, query, response)
+    except Exception as e:
+        print(f"Warning: Failed to cache analysis result: {str(e)}")
+
+def _get_job_or_404(job_id: str) -> Job:
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+def _validate_mode(mode: str) -> str:
+    """Return the normalised analysis mode, rejecting unknown ones"""
+    mode = mode.strip().lower()
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported analysis mode. Use one of: {', '.join(ANALYSIS_MODES)}."
+        )
+    return mode
+
+def _validate_file_type(file: UploadFile) -> str:
+    """Return the lower-cased extension of an upload, rejecting unsupported types"""
+    file_ext = Path(file.filename).suffix.lower() if file.filename else ''
+    if file_ext not in ['.pdf', '.docx', '.doc']:
+        raise HTTPException(
+            status_code=400,
+            detail="Unsupported file type. Please upload a PDF or DOCX file."
+        )
+    return file_ext
+
+def _summary_path(file_path: str) -> Optional[str]:
+    """Per-upload file the executive summary is persisted to, if SUMMARY_OUTPUT_DIR is set"""
+    if not SUMMARY_OUTPUT_DIR:
+        return None
+    os.makedirs(SUMMARY_OUTPUT_DIR, exist_ok=True)
+    return os.path.join(SUMMARY_OUTPUT_DIR, f"{Path(file_path).stem}_summary.md")
+
+def _new_upload_path(file_ext: str) -> str:
+    file_id = str(uuid.uuid4())
+    return f"data/financial_document_{file_id}{file_ext}"
+
+async def _save_upload(file: UploadFile, file_path: str) -> str:
+    """Stream an upload to disk in chunks and return its SHA-256 hex digest.
+    
+    The size limit is enforced again per file while copying (the request
+    body limit in UploadSizeLimitMiddleware includes multipart overhead).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with span("upload.save", {"document.filename": file.filename}), STAGE_DURATION.time(stage="upload"):
+        try:
+            with open(file_path, "wb") as f:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_FILE_SIZE:
+                        raise HTTPException(status_code=413, detail=_file_too_large_message())
+                    digest.update(chunk)
+                    f.write(chunk)
+        except Exception:
+            _cleanup_file(file_path)
+            raise
+        finally:
+            annotate({"document.size_bytes": size})
+    # The tools look documents up by content hash; spare them re-reading the upload
+    remember_file_hash(file_path, digest.hexdigest())
+    return digest.hexdigest()
+
+def _file_too_large_message() -> str:
+    return f"File size exceeds maximum limit of {MAX_FILE_SIZE // (1024 * 1024)}MB"
+
+def _busy_error(error: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Server is busy: {str(error)}. Please retry shortly.",
+        headers={"Retry-After": "30"}
+    )
+
+def _cleanup_file(file_path: str) -> None:
+    """Remove an uploaded file, logging instead of raising on failure"""
+    if os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+        except Exception as e:
+            print(f"Warning: Failed to clean up file {file_path}: {str(e)}")
 
 if __name__ == "__main__":
     import uvicorn
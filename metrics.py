@@ -0,0 +1,208 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; covers fast cache hits through multi-minute crew runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    """A named metric family with a fixed set of label names."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> List[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """(sample name, label names, label values, value) for every series."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for name, label_names, label_values, value in self.samples():
+            lines.append(f"{name}{_format_labels(label_names, label_values)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class _ValueMetric(Metric):
+    """One value per label set, set by the application or read from ``callback`` at scrape time.
+
+    A callback returns ``{label values: value}``, e.g. ``{("result",): 12}``.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+        self._values: Dict[LabelValues, float] = {}
+
+    def samples(self):
+        if self.callback is not None:
+            values = self.callback()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [(self.name, self.label_names, key, value) for key, value in sorted(values.items())]
+
+
+class Counter(_ValueMetric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_ValueMetric):
+    """Value that can go up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets, with sum and count."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the block in seconds, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        samples = []
+        bucket_labels = self.label_names + ("le",)
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", bucket_labels, key + (_format_value(bound),), cumulative))
+                samples.append((f"{self.name}_sum", self.label_names, key, total[0]))
+                samples.append((f"{self.name}_count", self.label_names, key, cumulative))
+        return samples
+
+
+class Registry:
+    """Collection of metrics rendered together for a scrape."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        rendered = []
+        for metric in metrics:
+            try:
+                rendered.append(metric.render())
+            except Exception as e:
+                # One failing callback must not break the whole scrape
+                print(f"Warning: Failed to collect metric {metric.name}: {str(e)}")
+        return "\n".join(rendered) + "\n"
+
+
+REGISTRY = Registry()
+
+# Application metrics shared by the API, tools and agents
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by method, route and status code.", ["method", "route", "status"]
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ["route"]
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "pipeline_stage_duration_seconds",
+    "Latency of analysis pipeline stages (upload, extraction, each agent task, summary).", ["stage"]
+))
+LLM_REQUESTS = REGISTRY.register(Counter(
+    "llm_requests_total", "LLM API calls made (cache hits excluded).", ["model"]
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "llm_tokens_total", "LLM tokens by direction (prompt is input, completion is output).", ["model", "direction"]
+))
+EXTRACTION_PAGES = REGISTRY.register(Counter(
+    "extraction_pages_total", "PDF pages and DOCX paragraphs extracted (cache misses only).", ["type"]
+))
+EXTRACTION_SECONDS = REGISTRY.register(Counter(
+    "extraction_seconds_total", "Time spent extracting document text; pages/sec is the ratio of the rates.", ["type"]
+))
+EXTRACTION_THROUGHPUT = REGISTRY.register(Gauge(
+    "extraction_pages_per_second", "Throughput of the most recent extraction.", ["type"]
+))
+
+
+def record_extraction(kind: str, pages: int, seconds: float) -> None:
+    """Record one document extraction for the throughput metrics."""
+    EXTRACTION_PAGES.inc(pages, type=kind)
+    EXTRACTION_SECONDS.inc(seconds, type=kind)
+    if seconds > 0:
+        EXTRACTION_THROUGHPUT.set(pages / seconds, type=kind)
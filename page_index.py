@@ -0,0 +1,141 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+from scanner import PatternScanner
+
+# Bumped when the classifier changes, so cached indexes are rebuilt
+INDEX_VERSION = "1"
+
+# Page labels, in the order ties are broken
+SECTIONS = ('statement', 'mdna', 'risk_factors', 'notes', 'boilerplate', 'other')
+
+# Prose sections that run over many pages: untitled pages continue the previous one
+CONTINUING_SECTIONS = frozenset({'mdna', 'risk_factors', 'notes'})
+
+# Section headings, matched at the start of a heading-like line (short, no full stop after the title)
+SECTION_TITLES = [
+    ('risk_factors', r"(?:item\s+1a\.?\s*)?risk factors\b"),
+    ('mdna', r"(?:item\s+[57]\.?\s*)?(?:management'?s discussion and analysis|operating and financial review)"),
+    ('notes', r"notes to (?:the )?(?:consolidated |condensed )*financial statements"),
+    ('statement', r"(?:consolidated |condensed )*(?:balance sheets?|income statements?"
+                  r"|statements? of (?:operations|income|earnings|comprehensive income|financial position"
+                  r"|cash flows?|(?:changes in )?(?:stockholders'?|shareholders'?) equity))"),
+    ('boilerplate', r"(?:signatures|exhibit index|index to exhibits|table of contents|certifications?"
+                    r"|forward-looking statements|cautionary (?:note|statement))\b"),
+    # Any other numbered 10-K item ends the current section
+    ('other', r"item\s+\d{1,2}[ab]?\.?\s"),
+]
+_TITLE_RE = re.compile(
+    "|".join(f"(?P<{label}>^[ \\t]*{pattern}(?=[^.\\n]{{0,80}}$))" for label, pattern in SECTION_TITLES),
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Phrases typical of each section; each mention is weak evidence
+SECTION_KEYWORDS = {
+    'statement': ["total assets", "total liabilities", "total current", "net income", "operating activities",
+                  "investing activities", "financing activities", "stockholders' equity", "shareholders' equity",
+                  "cost of revenue", "cost of sales", "earnings per share", "retained earnings"],
+    'mdna': ["compared to", "compared with", "primarily due to", "driven by", "results of operations",
+             "liquidity and capital resources", "year over year", "increased", "decreased", "outlook"],
+    'risk_factors': ["adversely affect", "adverse effect", "could harm", "no assurance", "cannot assure",
+                     "may not be able", "could cause", "subject to risks", "uncertaint"],
+    'notes': [r"note \d+", "accounting polic", "fair value", "recognized", "amortiz", "carrying amount",
+              "useful lives", r"asc \d+", "ifrs \d+", "deferred tax"],
+    'boilerplate': ["pursuant to", "incorporated by reference", "exhibit", "hereby", "duly authorized",
+                    r"section (?:13|15\(d\)|302|906)", "securities exchange act", "signature"],
+}
+SECTION_SCANNER = PatternScanner([
+    ((section, keyword), r'\b' + keyword)
+    for section, keywords in SECTION_KEYWORDS.items() for keyword in keywords
+])
+
+_TOKEN_RE = re.compile(r"\S+")
+_NUMERIC_RE = re.compile(r"^[(\-$€£]*\d[\d,.]*\)?%?$")
+# Caption pdf_tables gives each rebuilt statement table
+_TABLE_CAPTION = "[Table: "
+
+# Lines at the top and bottom of a page checked for running headers and footers
+RUNNING_LINES = 2
+# A page needs this much keyword evidence, per 100 words, to get a label without a heading
+MIN_KEYWORD_SCORE = 1.0
+# Share of numeric tokens above which a page with statement line items is a statement
+STATEMENT_NUMERIC_SHARE = 0.25
+
+
+@dataclass
+class PageIndex:
+    """Section label of each page (or DOCX block) of a document, in order."""
+    labels: List[str]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def positions(self, sections: Iterable[str]) -> List[int]:
+        """Zero-based positions of the pages labelled with any of ``sections``."""
+        wanted = set(sections)
+        return [position for position, label in enumerate(self.labels) if label in wanted]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of pages per label, in SECTIONS order."""
+        counts = Counter(self.labels)
+        return {section: counts[section] for section in SECTIONS if counts[section]}
+
+
+def classify_page(text: str, previous: Optional[str] = None) -> str:
+    """Label one page from its headings, keywords and share of numbers.
+
+    A heading decides the label outright (the first one on the page). An
+    untitled page continues ``previous`` when that is a prose section,
+    unless it is plainly a statement; otherwise the section with the most
+    keyword mentions per 100 words wins, or 'other' if the evidence is thin.
+    """
+    title = _TITLE_RE.search(text)
+    if title:
+        return title.lastgroup
+
+    tokens = _TOKEN_RE.findall(text)
+    if not tokens:
+        return previous if previous in CONTINUING_SECTIONS else 'other'
+
+    hits = Counter({section: len(matches) for (section, _), matches in SECTION_SCANNER.find_all(text).items()})
+    numeric_share = sum(1 for token in tokens if _NUMERIC_RE.match(token)) / len(tokens)
+    if _TABLE_CAPTION in text or (numeric_share >= STATEMENT_NUMERIC_SHARE and hits['statement']):
+        return 'statement'
+    if previous in CONTINUING_SECTIONS:
+        return previous
+
+    scores = {section: hits[section] * 100 / len(tokens) for section in SECTION_KEYWORDS}
+    best = max(SECTION_KEYWORDS, key=lambda section: scores[section])
+    return best if scores[best] >= MIN_KEYWORD_SCORE else 'other'
+
+
+def _edge_lines(text: str) -> List[str]:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return lines[:RUNNING_LINES] + lines[-RUNNING_LINES:]
+
+
+def running_lines(pages: Sequence[str]) -> FrozenSet[str]:
+    """Header and footer lines repeated on at least half the pages, such as "Table of Contents" links."""
+    if len(pages) < 4:
+        return frozenset()
+    counts = Counter(line for text in pages for line in set(_edge_lines(text)))
+    return frozenset(line for line, count in counts.items() if count >= len(pages) / 2)
+
+
+def build_page_index(pages: Sequence[str]) -> PageIndex:
+    """Classify every page of a document, carrying sections across untitled pages.
+
+    Running headers and footers are dropped first, so a title repeated on
+    every page does not label them all.
+    """
+    repeated = running_lines(pages)
+    labels: List[str] = []
+    previous = None
+    for text in pages:
+        if repeated:
+            text = "\n".join(line for line in text.splitlines() if line.strip() not in repeated)
+        previous = classify_page(text, previous)
+        labels.append(previous)
+    return PageIndex(labels)
@@ -0,0 +1,140 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+import PyPDF2
+
+from pdf_tables import statement_page_text
+
+# (page_number, text, warning) for each page; page_number is zero-based
+PageResult = Tuple[int, str, Optional[str]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def open_pdf(file) -> PyPDF2.PdfReader:
+    """Open a PDF reader, decrypting with an empty password when needed."""
+    reader = PyPDF2.PdfReader(file)
+
+    # Check if PDF is encrypted
+    if reader.is_encrypted:
+        # Try empty password as many PDFs have empty owner passwords
+        try:
+            reader.decrypt('')
+        except Exception as e:
+            raise ValueError("Cannot read encrypted PDF file") from e
+
+    return reader
+
+
+def read_pages(reader: PyPDF2.PdfReader, start: int, end: int, tables: bool = False) -> List[PageResult]:
+    """Extract the text of pages ``start`` to ``end - 1`` from an open reader.
+
+    Per-page failures are reported as warnings instead of raising, so one
+    damaged page does not lose the rest of the document. With ``tables``,
+    tables on financial statement pages are rebuilt from text positions
+    and rendered as CSV (see pdf_tables).
+    """
+    results = []
+    for page_num in range(start, end):
+        try:
+            page = reader.pages[page_num]
+            page_text = page.extract_text() or ""
+            if tables:
+                try:
+                    page_text = statement_page_text(page, page_num + 1, page_text)
+                except Exception as e:
+                    print(f"Warning: Could not rebuild tables on page {page_num + 1}: {str(e)}")
+            results.append((page_num, page_text.strip(), None))
+        except Exception as e:
+            results.append((page_num, "", str(e)))
+    return results
+
+
+def iter_pdf_pages(file_path: str, tables: bool = False) -> Iterator[PageResult]:
+    """Lazily yield ``(page_number, text, warning)`` for each page of a PDF.
+
+    Only one page's text is held at a time, and closing the generator early
+    stops parsing and closes the file.
+    """
+    with open(file_path, 'rb') as file:
+        reader = open_pdf(file)
+        for page_num in range(len(reader.pages)):
+            yield read_pages(reader, page_num, page_num + 1, tables)[0]
+
+
+def extract_page_range(file_path: str, start: int, end: int, tables: bool = False) -> List[PageResult]:
+    """Pool worker: open the PDF and extract pages ``start`` to ``end - 1``."""
+    with open(file_path, 'rb') as file:
+        return read_pages(open_pdf(file), start, end, tables)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared extraction pool, recreating it if the worker count changed."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawn rather than fork: the API process runs crews on threads
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the shared extraction pool, if one was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def run_in_pool(fn: Callable[..., Any], *args, workers: int) -> Any:
+    """Run a module-level extraction function on the shared pool and wait for its result.
+
+    Documents read side by side are then parsed in separate processes
+    instead of taking turns on the GIL.
+    """
+    return _get_pool(workers).submit(fn, *args).result()
+
+
+def split_pages(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Split ``page_count`` pages into at most ``parts`` contiguous ranges."""
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def extract_pages_parallel(file_path: str, page_count: int, workers: int,
+                           tables: bool = False) -> List[PageResult]:
+    """Extract all pages on the process pool and return them in page order.
+
+    Pages are split into twice as many ranges as workers so a slow range
+    (scanned pages, large tables) does not leave the other workers idle.
+    """
+    pool = _get_pool(workers)
+    futures = [
+        pool.submit(extract_page_range, file_path, start, end, tables)
+        for start, end in split_pages(page_count, workers * 2)
+    ]
+    results: List[PageResult] = []
+    for future in futures:
+        results.extend(future.result())
+    return results
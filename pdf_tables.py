@@ -0,0 +1,272 @@
+import csv
+import io
+import re
+from dataclasses import dataclass, field
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+import PyPDF2
+
+# Statement titles, matched case-insensitively against the page text
+STATEMENT_PATTERNS = {
+    'income_statement': re.compile(
+        r"income statements?|statements? of (?:consolidated )?(?:operations|income|earnings)"
+        r"|profit and loss|statements? of comprehensive income", re.IGNORECASE),
+    'balance_sheet': re.compile(
+        r"balance sheets?|statements? of (?:consolidated )?financial position", re.IGNORECASE),
+    'cash_flow': re.compile(
+        r"cash flows? statements?|statements? of (?:consolidated )?cash flows?", re.IGNORECASE),
+}
+
+_UNIT_RE = re.compile(r"\(?\s*in (thousands|millions|billions)(?: of [a-z. ]+)?(?:,? except [^)\n]*)?\s*\)?", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"^\(?[-−–]?[$€£]?\s*\(?\d[\d,]*(?:\.\d+)?\)?%?$|^[-−–—]+$")
+_NEGATIVE_RE = re.compile(r"^[$€£\s]*[(\-−–]")
+_YEAR_RE = re.compile(r"^(?:19|20)\d{2}$")
+_COLUMN_GAP_RE = re.compile(r"\s{2,}")
+
+# Average glyph width as a share of the font size, for estimating where text ends
+GLYPH_WIDTH = 0.5
+MIN_TABLE_ROWS = 2
+
+
+class TextFragment(NamedTuple):
+    """A piece of text drawn at (x, y) in page coordinates."""
+    x: float
+    y: float
+    size: float
+    text: str
+
+    @property
+    def end(self) -> float:
+        return self.x + len(self.text) * self.size * GLYPH_WIDTH
+
+
+@dataclass
+class StatementTable:
+    """A table rebuilt from text positions on a financial statement page.
+
+    ``rows`` hold the line item label followed by one value per column;
+    values are floats (None for blanks), with accounting parentheses read
+    as negatives. ``unit`` is the scale printed on the page, e.g. "millions".
+    """
+    page: int
+    statement: Optional[str]
+    columns: List[str]
+    rows: List[List[Any]] = field(default_factory=list)
+    unit: Optional[str] = None
+
+    @property
+    def frame(self):
+        """The table as a pandas DataFrame, one row per line item."""
+        import pandas as pd
+        return pd.DataFrame(self.rows, columns=self.columns)
+
+    def to_text(self) -> str:
+        """Compact CSV rendering with a one-line caption, for prompts and the text cache."""
+        caption = f"[Table: {(self.statement or 'table').replace('_', ' ')}, page {self.page}"
+        caption += f", in {self.unit}]" if self.unit else "]"
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(self.columns)
+        for row in self.rows:
+            writer.writerow(["" if value is None else _format_number(value) if isinstance(value, float) else value
+                             for value in row])
+        return caption + "\n" + out.getvalue().rstrip("\n")
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def classify_statement(text: str) -> Optional[str]:
+    """Kind of financial statement a page holds, judged by the earliest statement title on it."""
+    found = [(match.start(), kind) for kind, pattern in STATEMENT_PATTERNS.items()
+             for match in [pattern.search(text)] if match]
+    return min(found)[1] if found else None
+
+
+def parse_number(text: str) -> Optional[float]:
+    """Parse a statement figure: "1,250.0", "(700.2)", "-700.2", "$ (5)", "12%"; dashes are None."""
+    text = text.strip()
+    if not text or set(text) <= set("-−–—"):
+        return None
+    # The sign may follow the currency symbol, as in "$ (1,250.0)" on first and total rows
+    negative = bool(_NEGATIVE_RE.match(text))
+    digits = re.sub(r"[^\d.]", "", text)
+    if not digits or digits == ".":
+        return None
+    value = float(digits)
+    return -value if negative else value
+
+
+def _is_number(text: str) -> bool:
+    return bool(_NUMBER_RE.match(text.strip()))
+
+
+def page_fragments(page: PyPDF2.PageObject) -> List[TextFragment]:
+    """Text fragments of a page with their positions, as PyPDF2 reports them."""
+    fragments: List[TextFragment] = []
+
+    def visit(text, cm, tm, font_dict, font_size):
+        if not text or not text.strip():
+            return
+        size = (font_size or 10) * (abs(tm[3] * cm[3]) or 1.0)
+        x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        for line_number, line in enumerate(text.split("\n")):
+            stripped = line.lstrip()
+            position = len(line) - len(stripped)
+            # Runs of spaces inside one string usually separate columns
+            for piece in _COLUMN_GAP_RE.split(stripped.rstrip()):
+                if piece:
+                    start = line.index(piece, position)
+                    fragments.append(TextFragment(x + start * size * GLYPH_WIDTH, y - line_number * size * 1.2,
+                                                  size, piece))
+                    position = start + len(piece)
+
+    page.extract_text(visitor_text=visit)
+    return fragments
+
+
+def _group_lines(fragments: List[TextFragment]) -> List[List[TextFragment]]:
+    """Group fragments into lines by baseline, top to bottom, and merge words into cells."""
+    lines: List[List[TextFragment]] = []
+    for fragment in sorted(fragments, key=lambda f: (-f.y, f.x)):
+        if lines and abs(lines[-1][0].y - fragment.y) <= max(fragment.size * 0.5, 2.0):
+            lines[-1].append(fragment)
+        else:
+            lines.append([fragment])
+
+    merged_lines = []
+    for line in lines:
+        cells: List[TextFragment] = []
+        for fragment in sorted(line, key=lambda f: f.x):
+            previous = cells[-1] if cells else None
+            if (previous is not None and fragment.x - previous.end < fragment.size * 0.8
+                    and not (_is_number(previous.text) and _is_number(fragment.text))):
+                cells[-1] = previous._replace(text=f"{previous.text} {fragment.text}")
+            else:
+                cells.append(fragment)
+        merged_lines.append(cells)
+    return merged_lines
+
+
+def _is_header(cells: List[TextFragment]) -> bool:
+    """Column headings: several cells, none of them figures other than years."""
+    values = [cell.text for cell in cells[1:]] if len(cells) > 1 else []
+    return len(cells) >= 2 and all(not _is_number(v) or _YEAR_RE.match(v) for v in values)
+
+
+def _is_row(cells: List[TextFragment]) -> bool:
+    return len(cells) >= 2 and any(_is_number(cell.text) and not _YEAR_RE.match(cell.text) for cell in cells[1:])
+
+
+def _table_regions(lines: List[List[TextFragment]]) -> List[Tuple[int, int, bool]]:
+    """(first line, end line, has header) of each run of table rows.
+
+    Single-cell lines between rows (section labels like "Current assets:")
+    belong to the table; a heading line directly above the first row is
+    taken as the column header.
+    """
+    regions = []
+    i = 0
+    while i < len(lines):
+        if not _is_row(lines[i]):
+            i += 1
+            continue
+        start, end = i, i + 1
+        j = end
+        while j < len(lines):
+            if _is_row(lines[j]):
+                end = j = j + 1
+            elif len(lines[j]) == 1 and j + 1 < len(lines) and _is_row(lines[j + 1]):
+                j += 1
+            else:
+                break
+        has_header = start > 0 and _is_header(lines[start - 1])
+        if has_header:
+            start -= 1
+        if end - start - has_header >= MIN_TABLE_ROWS:
+            regions.append((start, end, has_header))
+        i = end
+    return regions
+
+
+def _columns(lines: List[List[TextFragment]]) -> List[float]:
+    """Right edges of the value columns, clustered across all rows of a table."""
+    edges = sorted(cell.end for cells in lines for cell in cells[1:])
+    if not edges:
+        return []
+    tolerance = 2.5 * max(cell.size for cells in lines for cell in cells)
+    clusters = [[edges[0]]]
+    for edge in edges[1:]:
+        if edge - clusters[-1][-1] <= tolerance:
+            clusters[-1].append(edge)
+        else:
+            clusters.append([edge])
+    return [sum(cluster) / len(cluster) for cluster in clusters]
+
+
+def _build_table(lines: List[List[TextFragment]], has_header: bool, page_number: int,
+                 statement: Optional[str], unit: Optional[str]) -> StatementTable:
+    edges = _columns(lines)
+    header = ["Line item"] + [f"Column {i + 1}" for i in range(len(edges))]
+    rows = []
+    for index, cells in enumerate(lines):
+        label_cell = cells[0] if not _is_number(cells[0].text) else None
+        values: List[Optional[str]] = [None] * len(edges)
+        for cell in cells[1:] if label_cell is not None else cells:
+            column = min(range(len(edges)), key=lambda c: abs(edges[c] - cell.end))
+            values[column] = cell.text if values[column] is None else f"{values[column]} {cell.text}"
+        label = label_cell.text if label_cell is not None else ""
+        if index == 0 and has_header:
+            header = [label or "Line item"] + [value or f"Column {i + 1}" for i, value in enumerate(values)]
+            continue
+        rows.append([label] + [parse_number(value) if value is not None else None for value in values])
+    return StatementTable(page=page_number, statement=statement, columns=header, rows=rows, unit=unit)
+
+
+def extract_page_tables(page: PyPDF2.PageObject, page_number: int,
+                        text: Optional[str] = None) -> Tuple[List[StatementTable], str]:
+    """Rebuild the tables of one page from text positions.
+
+    Returns the tables and the page text with each table replaced by its
+    compact CSV rendering; other lines are kept in reading order.
+    ``page_number`` is 1-based; ``text`` is the plain extracted text, if known.
+    """
+    lines = _group_lines(page_fragments(page))
+    plain = text if text is not None else "\n".join(" ".join(c.text for c in cells) for cells in lines)
+    statement = classify_statement(plain)
+    unit_match = _UNIT_RE.search(plain)
+    unit = unit_match.group(1).lower() if unit_match else None
+
+    tables, output, i = [], [], 0
+    for start, end, has_header in _table_regions(lines):
+        output.extend(" ".join(cell.text for cell in cells) for cells in lines[i:start])
+        table = _build_table(lines[start:end], has_header, page_number, statement, unit)
+        tables.append(table)
+        output.append(table.to_text())
+        i = end
+    output.extend(" ".join(cell.text for cell in cells) for cells in lines[i:])
+    return tables, "\n".join(output)
+
+
+def statement_page_text(page: PyPDF2.PageObject, page_number: int, text: str) -> str:
+    """Page text with statement tables rebuilt as CSV; other pages are returned unchanged."""
+    if classify_statement(text) is None:
+        return text
+    tables, layout_text = extract_page_tables(page, page_number, text)
+    return layout_text if tables else text
+
+
+def extract_statement_tables(file_path: str) -> List[StatementTable]:
+    """Tables on the income statement, balance sheet and cash flow pages of a PDF."""
+    from pdf_extraction import open_pdf
+
+    tables = []
+    with open(file_path, 'rb') as file:
+        reader = open_pdf(file)
+        for page_number, page in enumerate(reader.pages, start=1):
+            text = page.extract_text() or ""
+            if classify_statement(text) is not None:
+                tables.extend(extract_page_tables(page, page_number, text)[0])
+    return tables
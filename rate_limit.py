@@ -0,0 +1,261 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Hashable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process backend is available
+    fcntl = None
+
+# Bucket state: name -> (available units, last refill timestamp)
+BucketState = Dict[str, Tuple[float, float]]
+
+_current_job: contextvars.ContextVar = contextvars.ContextVar("rate_limit_job", default=None)
+
+# Job of each crewai task, keyed by task id: asynchronous tasks run on plain threads,
+# which do not copy contextvars, so the job set with RateLimiter.job() is lost there
+_task_jobs: Dict[Any, Hashable] = {}
+_task_jobs_lock = threading.Lock()
+
+
+class RateLimitTimeout(TimeoutError):
+    """Raised when capacity did not become available within the allowed wait."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+class BucketStore(ABC):
+    """Holds token bucket levels; ``take`` must refill and debit atomically."""
+
+    def __init__(self, limits: Dict[str, float]):
+        # Per-minute limits; a limit of 0 means unlimited and is not tracked
+        self.limits = {name: float(limit) for name, limit in limits.items() if limit > 0}
+
+    def _refill(self, state: BucketState, now: float) -> BucketState:
+        refilled = {}
+        for name, limit in self.limits.items():
+            level, updated = state.get(name, (limit, now))
+            refilled[name] = (min(limit, level + (now - updated) * limit / 60.0), now)
+        return refilled
+
+    def _debit(self, state: BucketState, costs: Dict[str, float],
+               force: bool) -> Tuple[BucketState, float]:
+        """Debit ``costs`` from a refilled state; return the new state and seconds to wait.
+
+        Unless ``force`` is set nothing is debited while a bucket is short. A
+        cost larger than a bucket's whole capacity is capped at the capacity so
+        it can still be served once the bucket is full.
+        """
+        debits = {name: costs.get(name, 0.0) for name in self.limits}
+        if not force:
+            debits = {name: min(cost, self.limits[name]) for name, cost in debits.items()}
+            wait = max(
+                (debits[name] - state[name][0]) * 60.0 / limit
+                for name, limit in self.limits.items()
+            )
+            if wait > 0:
+                return state, wait
+        return {
+            name: (min(limit, state[name][0] - debits[name]), state[name][1])
+            for name, limit in self.limits.items()
+        }, 0.0
+
+    @abstractmethod
+    def take(self, costs: Dict[str, float]) -> float:
+        """Debit ``costs`` if every bucket has enough; otherwise return the seconds to wait."""
+
+    @abstractmethod
+    def charge(self, costs: Dict[str, float]) -> None:
+        """Debit (or with negative costs, refund) unconditionally, e.g. to reconcile usage."""
+
+
+class InProcessBucketStore(BucketStore):
+    """Bucket levels shared by every thread of this process."""
+
+    def __init__(self, limits: Dict[str, float]):
+        super().__init__(limits)
+        self._lock = threading.Lock()
+        self._state: BucketState = {}
+
+    def take(self, costs: Dict[str, float]) -> float:
+        with self._lock:
+            state = self._refill(self._state, time.time())
+            self._state, wait = self._debit(state, costs, force=False)
+            return wait
+
+    def charge(self, costs: Dict[str, float]) -> None:
+        with self._lock:
+            state = self._refill(self._state, time.time())
+            self._state, _ = self._debit(state, costs, force=True)
+
+
+class FileLockBucketStore(BucketStore):
+    """Bucket levels in a JSON file guarded by ``flock``, shared by all processes on the host.
+
+    Use this when several uvicorn workers share one provider account.
+    """
+
+    def __init__(self, limits: Dict[str, float], path: str):
+        if fcntl is None:
+            raise ValueError("The file rate limit backend needs fcntl (not available on this platform)")
+        super().__init__(limits)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[List[BucketState]]:
+        """Yield a one-element list holding the state; the (replaced) state is written back."""
+        with open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    state = {name: tuple(value) for name, value in json.loads(raw).items()} if raw else {}
+                except ValueError:
+                    state = {}  # A torn or foreign file only resets the buckets
+                holder = [self._refill(state, time.time())]
+                yield holder
+                f.seek(0)
+                f.truncate()
+                json.dump(holder[0], f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def take(self, costs: Dict[str, float]) -> float:
+        with self._locked_state() as holder:
+            holder[0], wait = self._debit(holder[0], costs, force=False)
+            return wait
+
+    def charge(self, costs: Dict[str, float]) -> None:
+        with self._locked_state() as holder:
+            holder[0], _ = self._debit(holder[0], costs, force=True)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter with fair queuing between jobs.
+
+    Callers waiting for capacity are served round-robin by job, so one job
+    with many LLM calls cannot starve the others. The job is the one set with
+    ``job()`` (or bound to the running crewai task with ``bind_task_jobs``),
+    or else the calling thread. Fairness applies within a process;
+    the file backend shares the capacity itself across processes.
+    """
+
+    def __init__(self, store: BucketStore, max_wait: Optional[float] = None):
+        self.store = store
+        self.max_wait = max_wait
+        self._condition = threading.Condition()
+        self._waiting: Dict[Hashable, Deque[object]] = {}
+        self._turns: Deque[Hashable] = deque()
+
+    @staticmethod
+    @contextmanager
+    def job(job_id: Hashable) -> Iterator[None]:
+        """Attribute LLM calls made in this context to ``job_id`` for fair queuing."""
+        token = _current_job.set(job_id)
+        try:
+            yield
+        finally:
+            _current_job.reset(token)
+
+    @staticmethod
+    def _current_job() -> Hashable:
+        job_id = _current_job.get()
+        return job_id if job_id is not None else ("thread", threading.get_ident())
+
+    def acquire(self, tokens: int = 0, requests: int = 1) -> None:
+        """Block until one request (and ``tokens`` tokens) fit in the limits, then debit them."""
+        if not self.store.limits:
+            return
+        costs = {"requests": float(requests), "tokens": float(tokens)}
+        job_id, ticket = self._current_job(), object()
+        deadline = time.monotonic() + self.max_wait if self.max_wait is not None else None
+
+        with self._condition:
+            if job_id not in self._waiting:
+                self._waiting[job_id] = deque()
+                self._turns.append(job_id)
+            self._waiting[job_id].append(ticket)
+            served = False
+            try:
+                while True:
+                    wait = 0.5  # Recheck periodically even without a notification
+                    if self._turns[0] == job_id and self._waiting[job_id][0] is ticket:
+                        wait = self.store.take(costs)
+                        if not wait:
+                            served = True
+                            return
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise RateLimitTimeout(f"LLM rate limit capacity not available within {self.max_wait}s")
+                        wait = min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                self._leave(job_id, ticket, served)
+                self._condition.notify_all()
+
+    def _leave(self, job_id: Hashable, ticket: object, served: bool) -> None:
+        """Remove a ticket; a served job goes to the back of the round-robin."""
+        queue = self._waiting[job_id]
+        queue.remove(ticket)
+        if not queue:
+            self._turns.remove(job_id)
+            del self._waiting[job_id]
+        elif served:
+            self._turns.remove(job_id)
+            self._turns.append(job_id)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage of a call is known."""
+        if "tokens" in self.store.limits and actual_tokens != estimated_tokens:
+            self.store.charge({"tokens": float(actual_tokens - estimated_tokens)})
+
+
+def bind_task_jobs(tasks: Dict[str, Any], job_id: Hashable) -> None:
+    """Attribute the LLM calls of ``tasks`` (keyed by stage name) to ``job_id``, on whatever thread they run."""
+    with _task_jobs_lock:
+        for task in tasks.values():
+            _task_jobs[task.id] = job_id
+
+
+def release_task_jobs(tasks: Dict[str, Any]) -> None:
+    with _task_jobs_lock:
+        for task in tasks.values():
+            _task_jobs.pop(task.id, None)
+
+
+@contextmanager
+def task_job(task: Any) -> Iterator[None]:
+    """Run a task's block under the job it was bound to, if any."""
+    with _task_jobs_lock:
+        job_id = _task_jobs.get(getattr(task, "id", None))
+    if job_id is None:
+        yield
+        return
+    with RateLimiter.job(job_id):
+        yield
+
+
+def create_rate_limiter(rpm: float, tpm: float, backend: str = "memory", path: str = "",
+                        max_wait: Optional[float] = None) -> RateLimiter:
+    """Build the limiter for the configured backend ("memory" or "file")."""
+    limits = {"requests": rpm, "tokens": tpm}
+    if backend == "file":
+        return RateLimiter(FileLockBucketStore(limits, path), max_wait=max_wait)
+    if backend == "memory":
+        return RateLimiter(InProcessBucketStore(limits), max_wait=max_wait)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
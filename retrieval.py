@@ -0,0 +1,143 @@
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+# Words too common in filings to say anything about relevance
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word and number tokens of ``text``, without stop words."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """A passage of a document; ``source`` is the PDF page (1-based) or DOCX paragraph it starts at."""
+    index: int
+    source: int
+    text: str
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """Split text longer than ``max_chars`` at whitespace."""
+    pieces, current = [], ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_pages(pages: Sequence[str], max_chars: int = 1500, merge_pages: bool = False,
+                first_source: int = 1) -> List[Chunk]:
+    """Split page (or paragraph) texts into chunks of at most ``max_chars`` characters.
+
+    Lines are kept whole where possible. Chunks never span PDF pages; with
+    ``merge_pages`` (used for DOCX paragraphs) consecutive short pages are
+    packed into the same chunk.
+    """
+    chunks: List[Chunk] = []
+    lines: List[str] = []
+    size, source = 0, first_source
+
+    def flush():
+        nonlocal lines, size
+        if lines:
+            chunks.append(Chunk(index=len(chunks), source=source, text="\n".join(lines)))
+        lines, size = [], 0
+
+    for page_source, page in enumerate(pages, start=first_source):
+        if not merge_pages:
+            flush()
+        if not lines:
+            source = page_source
+        for line in page.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            for piece in _split_long(line, max_chars) if len(line) > max_chars else [line]:
+                if lines and size + len(piece) + 1 > max_chars:
+                    flush()
+                    source = page_source
+                lines.append(piece)
+                size += len(piece) + 1
+    flush()
+    return chunks
+
+
+class BM25Index:
+    """In-memory Okapi BM25 index over document chunks.
+
+    Postings are stored per term as NumPy arrays of chunk ids and term
+    frequencies, so scoring a query is a handful of vectorized updates
+    regardless of document length.
+    """
+
+    def __init__(self, chunks: Sequence[Chunk], k1: float = 1.5, b: float = 0.75):
+        self.chunks = list(chunks)
+        self.k1 = k1
+        postings: Dict[str, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+        lengths = np.zeros(len(self.chunks), dtype=np.float32)
+        for chunk in self.chunks:
+            terms = tokenize(chunk.text)
+            lengths[chunk.index] = len(terms)
+            for term, count in Counter(terms).items():
+                ids, counts = postings[term]
+                ids.append(chunk.index)
+                counts.append(count)
+
+        total = len(self.chunks)
+        average = float(lengths.mean()) if total and lengths.any() else 1.0
+        self._postings = {
+            term: (np.array(ids, dtype=np.int32), np.array(counts, dtype=np.float32))
+            for term, (ids, counts) in postings.items()
+        }
+        self._idf = {
+            term: math.log(1 + (total - len(ids) + 0.5) / (len(ids) + 0.5))
+            for term, (ids, _) in self._postings.items()
+        }
+        self._length_norm = k1 * (1 - b + b * lengths / average)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for ``query``."""
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term, weight in Counter(tokenize(query)).items():
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            ids, counts = posting
+            scores[ids] += weight * self._idf[term] * counts * (self.k1 + 1) / (counts + self._length_norm[ids])
+        return scores
+
+    def search(self, query: str, k: int = 5, within: Optional[Sequence[int]] = None) -> List[Tuple[Chunk, float]]:
+        """Return up to ``k`` chunks that match ``query``, best first, optionally only among chunk ids ``within``."""
+        scores = self.scores(query)
+        if within is not None:
+            allowed = np.zeros(len(scores), dtype=bool)
+            allowed[list(within)] = True
+            scores[~allowed] = 0
+        matching = np.flatnonzero(scores > 0)
+        if len(matching) > k:
+            matching = matching[np.argpartition(-scores[matching], k - 1)[:k]]
+        ranked = sorted(matching, key=lambda i: (-scores[i], i))
+        return [(self.chunks[i], float(scores[i])) for i in ranked]
+
+    def top_chunks(self, query: str, k: int = 5, within: Optional[Sequence[int]] = None) -> List[Chunk]:
+        """The ``k`` best chunks for ``query``, in document order for readable context."""
+        return sorted((chunk for chunk, _ in self.search(query, k, within)), key=lambda chunk: chunk.index)
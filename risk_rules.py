@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from scanner import PatternScanner
+
+try:
+    import yaml
+except ImportError:  # YAML rule packs are optional
+    yaml = None
+
+RULE_PACK_EXTENSIONS = ('.json', '.yaml', '.yml')
+
+
+@dataclass(frozen=True)
+class RiskRule:
+    """A single risk indicator pattern."""
+    category: str
+    pattern: str
+    description: str
+
+
+@dataclass(frozen=True)
+class RiskCategory:
+    """A group of risk rules reported together and weighted in the overall score."""
+    name: str
+    title: str
+    weight: float = 1.0
+    rules: Tuple[RiskRule, ...] = ()
+
+
+@dataclass
+class RiskMatch:
+    """Occurrences of one risk rule in a document."""
+    category: str
+    description: str
+    count: int
+    offsets: List[Tuple[int, int]] = field(default_factory=list)
+
+
+class RuleSet:
+    """An immutable, compiled snapshot of the loaded rule packs."""
+
+    def __init__(self, categories: List[RiskCategory]):
+        self.categories = categories
+        self.rules = [rule for category in categories for rule in category.rules]
+        self._scanner = PatternScanner(
+            [(index, rule.pattern) for index, rule in enumerate(self.rules)]
+        ) if self.rules else None
+
+    def classify(self, text: str) -> Dict[str, List[RiskMatch]]:
+        """Scan ``text`` once and return the matched rules of every category, in rule order."""
+        results: Dict[str, List[RiskMatch]] = {category.name: [] for category in self.categories}
+        if self._scanner is None:
+            return results
+
+        for index, matches in self._scanner.find_all(text).items():
+            rule = self.rules[index]
+            results[rule.category].append(RiskMatch(
+                category=rule.category,
+                description=rule.description,
+                count=len(matches),
+                offsets=[match.span() for match in matches]
+            ))
+        return results
+
+
+def _load_pack(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.lower().endswith('.json'):
+            return json.load(f)
+        if yaml is None:
+            raise ValueError(f"PyYAML is required to load YAML rule pack: {path}")
+        return yaml.safe_load(f) or {}
+
+
+def _pack_files(path: str) -> List[str]:
+    """A rule pack file, or every rule pack in a directory in name order."""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(RULE_PACK_EXTENSIONS)
+        )
+    return [path]
+
+
+def load_rule_set(path: str) -> RuleSet:
+    """Load and compile rule packs; later packs add rules to (or retitle) earlier categories."""
+    categories: Dict[str, dict] = {}
+    for pack_path in _pack_files(path):
+        pack = _load_pack(pack_path)
+        for name, spec in (pack.get('categories') or {}).items():
+            category = categories.setdefault(name, {
+                'title': f"{name.replace('_', ' ').title()} Risks", 'weight': 1.0, 'rules': []
+            })
+            category['title'] = spec.get('title', category['title'])
+            category['weight'] = float(spec.get('weight', category['weight']))
+            for rule in spec.get('rules') or []:
+                if 'pattern' not in rule or 'description' not in rule:
+                    raise ValueError(f"Rule in {pack_path} needs 'pattern' and 'description': {rule}")
+                category['rules'].append(RiskRule(name, rule['pattern'], rule['description']))
+
+    return RuleSet([
+        RiskCategory(name=name, title=spec['title'], weight=spec['weight'], rules=tuple(spec['rules']))
+        for name, spec in categories.items()
+    ])
+
+
+class RiskRuleEngine:
+    """Risk classifier backed by rule packs that are reloaded when they change on disk.
+
+    ``path`` may be a single JSON/YAML file or a directory of them. When a
+    reload fails (bad pattern, invalid file) the previous rules stay active.
+    """
+
+    def __init__(self, path: str, auto_reload: bool = True):
+        self.path = path
+        self.auto_reload = auto_reload
+        self._lock = threading.Lock()
+        self._signature = self._current_signature()
+        self._rule_set = load_rule_set(path)
+
+    @property
+    def rule_set(self) -> RuleSet:
+        """The active rules, reloaded first if a pack changed and auto_reload is on."""
+        if self.auto_reload:
+            self.reload_if_changed()
+        return self._rule_set
+
+    def _current_signature(self) -> Tuple[Tuple[str, float], ...]:
+        return tuple((f, os.path.getmtime(f)) for f in _pack_files(self.path) if os.path.exists(f))
+
+    def reload(self) -> None:
+        """Reload the rule packs unconditionally."""
+        with self._lock:
+            self._signature = self._current_signature()
+            self._rule_set = load_rule_set(self.path)
+
+    def reload_if_changed(self) -> bool:
+        """Reload when any rule pack was added, removed or modified; return True if reloaded."""
+        signature = self._current_signature()
+        if signature == self._signature:
+            return False
+        with self._lock:
+            if signature == self._signature:
+                return False
+            # Remember the signature even on failure so a broken pack is reported once
+            self._signature = signature
+            try:
+                self._rule_set = load_rule_set(self.path)
+            except Exception as e:
+                print(f"Warning: Failed to reload risk rules from {self.path}: {str(e)}")
+                return False
+        return True
+
+    def classify(self, text: str) -> Dict[str, List[RiskMatch]]:
+        """Classify ``text`` against the active rules."""
+        return self.rule_set.classify(text)
@@ -0,0 +1,193 @@
+import re
+from collections import defaultdict
+from typing import Dict, FrozenSet, Hashable, List, Optional, Sequence, Set, Tuple
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Limits that keep anchor expansion (and the anchor trie) small
+MAX_ANCHORS_PER_RULE = 64
+MAX_ANCHOR_LENGTH = 16
+
+# Characters matched by \s in str patterns (all of them are below U+3001)
+_WHITESPACE = frozenset(chr(c) for c in range(0x3001) if chr(c).isspace())
+
+
+def _class_chars(items) -> Optional[FrozenSet[str]]:
+    """Characters matched by a small character class, or None if not enumerable."""
+    chars: Set[str] = set()
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            chars.add(chr(av))
+        elif op is sre_constants.RANGE and av[1] - av[0] < 32:
+            chars.update(chr(c) for c in range(av[0], av[1] + 1))
+        elif op is sre_constants.CATEGORY and av is sre_constants.CATEGORY_SPACE:
+            chars |= _WHITESPACE
+        else:
+            return None
+    return frozenset(chars)
+
+
+def _item_strings(op, av) -> Optional[Set[str]]:
+    """Strings a single parsed item can match, if it is a short enumerable choice."""
+    if op is sre_constants.LITERAL:
+        return {chr(av)}
+    if op is sre_constants.IN:
+        return _class_chars(av)
+    if op is sre_constants.MAX_REPEAT and av[0] == 0 and av[1] == 1 and len(av[2]) == 1:
+        inner = _item_strings(*av[2][0])
+        return None if inner is None else inner | {""}
+    return None
+
+
+def _literal_prefixes(items) -> Tuple[Set[str], bool]:
+    """Return lower-cased literal prefixes that every match must start with.
+
+    The second value is True when the prefixes cover the whole item sequence,
+    meaning a caller may keep extending them with what follows.
+    """
+    prefixes = {""}
+    for op, av in items:
+        if op is sre_constants.AT:
+            continue  # Zero-width assertions such as \b do not consume a character
+
+        if op is sre_constants.BRANCH:
+            choices: Set[str] = set()
+            complete = True
+            for branch in av[1]:
+                branch_prefixes, branch_complete = _literal_prefixes(branch)
+                choices |= branch_prefixes
+                complete = complete and branch_complete
+        elif op is sre_constants.SUBPATTERN:
+            choices, complete = _literal_prefixes(av[-1])
+        else:
+            choices, complete = _item_strings(op, av), True
+            if choices is None:
+                return prefixes, False
+
+        extended = {prefix + choice for prefix in prefixes for choice in choices}
+        if len(extended) > MAX_ANCHORS_PER_RULE or "" in extended:
+            return prefixes, False
+        prefixes = {prefix[:MAX_ANCHOR_LENGTH].lower() for prefix in extended}
+        if not complete or any(len(prefix) >= MAX_ANCHOR_LENGTH for prefix in prefixes):
+            return prefixes, False
+    return prefixes, True
+
+
+def _trie_pattern(words: Sequence[str]) -> str:
+    """Build a regex alternation of ``words`` factored into a prefix trie."""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+
+class PatternScanner:
+    """Match many case-insensitive regex rules in one pass over a text.
+
+    Every rule is reduced to the literal prefixes ("anchors") its matches must
+    start with, and all anchors are compiled once into a single trie-shaped
+    regex, Aho-Corasick style. The text is scanned once for anchors; a rule
+    is only tried where one of its anchors occurs, including anchors that
+    overlap the one found, which are precomputed per anchor. Rules without
+    a usable anchor fall back to their own scan. Results are identical to
+    running ``re.search``/``re.finditer`` per rule.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[Hashable, str]], flags: int = re.IGNORECASE):
+        if not rules:
+            raise ValueError("PatternScanner needs at least one rule")
+        if not flags & re.IGNORECASE:
+            raise ValueError("PatternScanner rules are matched case-insensitively")
+
+        self.keys = [key for key, _ in rules]
+        self._patterns = [re.compile(pattern, flags) for _, pattern in rules]
+
+        anchors: Dict[str, List[int]] = defaultdict(list)
+        self._unanchored: List[int] = []
+        for index, pattern in enumerate(self._patterns):
+            prefixes, _ = _literal_prefixes(sre_parse.parse(pattern.pattern, flags))
+            if "" in prefixes:
+                self._unanchored.append(index)
+            else:
+                for prefix in prefixes:
+                    anchors[prefix].append(index)
+
+        # For each anchor, the (offset, rule) pairs worth verifying when it is
+        # found: its own rules plus rules whose anchors start inside it.
+        self._checks: Dict[str, List[Tuple[int, int]]] = {}
+        for anchor in anchors:
+            checks = set()
+            for offset in range(len(anchor)):
+                rest = anchor[offset:]
+                for other, indexes in anchors.items():
+                    if rest.startswith(other) or other.startswith(rest):
+                        checks.update((offset, index) for index in indexes)
+            self._checks[anchor] = sorted(checks)
+
+        self._anchor_regex = re.compile(_trie_pattern(list(anchors)), flags) if anchors else None
+
+    def _checks_for(self, hit: re.Match) -> List[Tuple[int, int]]:
+        checks = self._checks.get(hit.group().lower())
+        if checks is None:
+            # Case folding beyond str.lower() (e.g. the long s): verify everything
+            anchored = [i for i in range(len(self._patterns)) if i not in self._unanchored]
+            checks = [(offset, i) for offset in range(len(hit.group())) for i in anchored]
+        return checks
+
+    def _anchor_hits(self, text: str):
+        return self._anchor_regex.finditer(text) if self._anchor_regex is not None else ()
+
+    def first_matches(self, text: str) -> Dict[Hashable, re.Match]:
+        """Return the first match of every rule that occurs in ``text``, keyed by rule."""
+        found: Dict[int, re.Match] = {}
+        for index in self._unanchored:
+            match = self._patterns[index].search(text)
+            if match:
+                found[index] = match
+
+        remaining = len(self._patterns) - len(self._unanchored)
+        for hit in self._anchor_hits(text):
+            if not remaining:
+                break
+            start = hit.start()
+            for offset, index in self._checks_for(hit):
+                if index not in found:
+                    match = self._patterns[index].match(text, start + offset)
+                    if match:
+                        found[index] = match
+                        remaining -= 1
+        return {self.keys[index]: found[index] for index in sorted(found)}
+
+    def find_all(self, text: str) -> Dict[Hashable, List[re.Match]]:
+        """Return every non-overlapping match of every rule, as ``re.finditer`` would."""
+        matches: Dict[int, List[re.Match]] = defaultdict(list)
+        for index in self._unanchored:
+            matches[index].extend(self._patterns[index].finditer(text))
+
+        next_pos = [0] * len(self._patterns)
+        for hit in self._anchor_hits(text):
+            start = hit.start()
+            for offset, index in self._checks_for(hit):
+                pos = start + offset
+                if pos < next_pos[index]:
+                    continue
+                match = self._patterns[index].match(text, pos)
+                if match:
+                    matches[index].append(match)
+                    next_pos[index] = max(match.end(), pos + 1)
+        return {self.keys[index]: matches[index] for index in sorted(matches) if matches[index]}
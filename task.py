@@ -1,13 +1,15 @@
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 from datetime import datetime
 from pathlib import Path
 import os
-from crewai import Task, Crew
 from pydantic import BaseModel, Field
 
-from agents import financial_analyst, investment_advisor, risk_assessor
+from agents import get_agent
 from tools import FinancialDocumentTool, InvestmentAnalysisTool, RiskAssessmentTool
 
+if TYPE_CHECKING:  # crewai is imported when a task is created, not at startup
+    from crewai import Agent, Task
+
 class AnalysisResult(BaseModel):
     """Structured output format for analysis results."""
     metrics: Dict[str, str] = Field(..., description="Key financial metrics")
@@ -36,11 +38,63 @@ class ExecutiveSummary(BaseModel):
     risks: List[str] = Field(..., description="Major risks and mitigations")
     next_steps: List[str] = Field(..., description="Recommended next steps")
 
-def create_document_analysis_task(file_path: str) -> Task:
-    """Create a task for analyzing financial documents."""
+# Retrieval queries that pick the document passages each task is given
+RETRIEVAL_QUERIES = {
+    "document_analysis": (
+        "balance sheet income statement cash flow statement revenue net income operating expenses "
+        "gross margin earnings per share total assets liabilities equity quarter year"
+    ),
+    "investment_analysis": (
+        "growth outlook guidance valuation market share margin expansion free cash flow "
+        "dividend buyback competitive advantage demand"
+    ),
+    "risk_assessment": (
+        "risk uncertainty debt liquidity litigation regulatory competition volatility "
+        "impairment decline covenant default supply chain"
+    ),
+}
+
+# Page sections (see page_index) each task's passages are drawn from; 'other' keeps unclassified pages
+TASK_SECTIONS = {
+    "document_analysis": ('statement', 'mdna', 'notes', 'other'),
+    "investment_analysis": ('mdna', 'statement', 'other'),
+    "risk_assessment": ('risk_factors', 'mdna', 'notes', 'other'),
+    "executive_summary": (),  # Key figures only; the other tasks' outputs carry the rest
+}
+
+# Share of the context budget (window minus CONTEXT_RESERVED_TOKENS) each task's document
+# context may fill; later tasks also receive earlier task outputs, so they get less
+TASK_CONTEXT_SHARES = {
+    "document_analysis": 1.0,
+    "investment_analysis": 0.5,
+    "risk_assessment": 0.5,
+    "executive_summary": 0.15,
+}
+
+def _excerpts_section(excerpts: str) -> str:
+    """Description block with retrieved passages, escaped for crewai's input interpolation."""
+    if not excerpts:
+        return ""
+    escaped = excerpts.replace("{", "{{").replace("}", "}}")
+    return (
+        "\n\nRelevant document excerpts (selected for this task; use the document reader "
+        f"with a query to look up anything else):\n{escaped}"
+    )
+
+def create_document_analysis_task(file_path: str, async_execution: bool = False,
+                                  excerpts: str = "", agent: Optional["Agent"] = None) -> "Task":
+    """Create a task for analyzing financial documents.
+    
+    ``excerpts`` are passages retrieved for this task, included in the
+    description so the agent does not need to read the whole document.
+    Every factory takes the ``agent`` to run the task, defaulting to the
+    registry's shared one; run_crew passes agents built for its own crew.
+    """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Document not found: {file_path}")
     
+    from crewai import Task
+    
     return Task(
         description=(
             f"Analyze the financial document at '{file_path}'. Extract and analyze:\n"
@@ -50,6 +104,7 @@ def create_document_analysis_task(file_path: str) -> Task:
             "3. Year-over-year and quarter-over-quarter trends\n"
             "4. Any significant events or anomalies in the financial data\n\n"
             "Format your analysis using markdown with clear sections and subsections."
+            + _excerpts_section(excerpts)
         ),
         expected_output=(
             "A comprehensive financial analysis report in markdown format with:\n"
@@ -64,15 +119,23 @@ def create_document_analysis_task(file_path: str) -> Task:
             "- Notable trends and patterns\n"
             "- Areas of concern or opportunity"
         ),
-        agent=financial_analyst,
+        agent=agent or get_agent('financial_analyst'),
         tools=[FinancialDocumentTool],
-        async_execution=True,
+        async_execution=async_execution,
         output_json=AnalysisResult,
         context=[]  # Initialize with empty list, we'll add the file path to the task description
     )
 
-def create_investment_analysis_task(document_analysis_task: Task, query: str = "") -> Task:
-    """Create a task for investment analysis."""
+def create_investment_analysis_task(document_analysis_task: "Task", query: str = "",
+                                    async_execution: bool = False, excerpts: str = "",
+                                    agent: Optional["Agent"] = None) -> "Task":
+    """Create a task for investment analysis.
+    
+    With ``async_execution`` the task runs on its own thread once the document
+    analysis is done, alongside any other asynchronous task in the crew.
+    """
+    from crewai import Task
+    
     return Task(
         description=(
             f"Based on the financial analysis, provide detailed investment recommendations.\n"
@@ -83,6 +146,7 @@ def create_investment_analysis_task(document_analysis_task: Task, query: str = "
             "3. Market conditions and economic outlook\n"
             "4. Valuation metrics compared to peers\n\n"
             "Provide a clear recommendation with supporting rationale."
+            + _excerpts_section(excerpts)
         ),
         expected_output=(
             "## Investment Recommendation\n"
@@ -100,15 +164,18 @@ def create_investment_analysis_task(document_analysis_task: Task, query: str = "
             "### Supporting Analysis\n"
             "[Detailed analysis supporting the recommendation]"
         ),
-        agent=investment_advisor,
+        agent=agent or get_agent('investment_advisor'),
         context=[document_analysis_task],
         tools=[InvestmentAnalysisTool],
         output_json=InvestmentRecommendation,
-        async_execution=True
+        async_execution=async_execution
     )
 
-def create_risk_assessment_task(document_analysis_task: Task) -> Task:
-    """Create a task for risk assessment."""
+def create_risk_assessment_task(document_analysis_task: "Task", async_execution: bool = False,
+                                excerpts: str = "", agent: Optional["Agent"] = None) -> "Task":
+    """Create a task for risk assessment (see create_investment_analysis_task for async_execution)."""
+    from crewai import Task
+    
     return Task(
         description=(
             "Conduct a comprehensive risk assessment considering:\n"
@@ -119,6 +186,7 @@ def create_risk_assessment_task(document_analysis_task: Task) -> Task:
             "- Likelihood and potential impact\n"
             "- Mitigation strategies\n"
             "- Monitoring recommendations"
+            + _excerpts_section(excerpts)
         ),
         expected_output=(
             "## Risk Assessment Report\n\n"
@@ -137,29 +205,41 @@ def create_risk_assessment_task(document_analysis_task: Task) -> Task:
             "- [Monitoring action 1]\n"
             "- [Monitoring action 2]"
         ),
-        agent=risk_assessor,
+        agent=agent or get_agent('risk_assessor'),
         context=[document_analysis_task],
         tools=[RiskAssessmentTool],
         output_json=RiskAssessment,
-        async_execution=True
+        async_execution=async_execution
     )
 
-def create_executive_summary_task(document_analysis_task: Task, 
-                               investment_analysis_task: Task, 
-                               risk_assessment_task: Task) -> Task:
-    """Create a task for generating an executive summary."""
+def create_executive_summary_task(document_analysis_task: "Task", 
+                               investment_analysis_task: "Task", 
+                               risk_assessment_task: "Task",
+                               output_file: Optional[str] = None,
+                               excerpts: str = "",
+                               agent: Optional["Agent"] = None) -> "Task":
+    """Create a task for generating an executive summary.
+    
+    The summary always runs synchronously: it waits for every task in its
+    context, so it is the fan-in point for tasks that ran in parallel.
+    Its text is kept in memory on the task output; pass a per-job
+    ``output_file`` to also persist it.
+    """
+    from crewai import Task
+    
     return Task(
         description=(
             "Create an executive summary combining the financial analysis, "
             "investment recommendations, and risk assessment. The summary should be "
             "concise yet comprehensive, highlighting key findings, recommendations, "
             "and risks for executive decision-making."
+            + _excerpts_section(excerpts)
         ),
         expected_output=(
             "A well-structured executive summary in markdown format with sections for "
             "key findings, recommendations, risks, and next steps."
         ),
-        agent=financial_analyst,
+        agent=agent or get_agent('financial_analyst'),
         context=[document_analysis_task, investment_analysis_task, risk_assessment_task],
-        output_file="executive_summary.md"
+        output_file=output_file
     )
\ No newline at end of file
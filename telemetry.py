@@ -0,0 +1,125 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    from opentelemetry import context as otel_context, trace
+except ImportError:  # Tracing is optional; spans become no-ops
+    otel_context = None
+    trace = None
+
+from config import TRACING_EXPORTER, TRACING_FILE_PATH, TRACING_SERVICE_NAME
+
+_tracer = trace.get_tracer("financial_document_analyzer") if trace is not None else None
+
+# Stage name and parent context of each crewai task, which may run on a thread of its own
+_task_parents: Dict[Any, Tuple[str, Any]] = {}
+_task_parents_lock = threading.Lock()
+
+
+def _clean(attributes: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Drop None values, which OpenTelemetry does not accept as attributes."""
+    return {key: value for key, value in (attributes or {}).items() if value is not None}
+
+
+def setup_tracing(app=None) -> None:
+    """Install the configured span exporter and instrument the FastAPI app.
+
+    TRACING_EXPORTER is "none", "console", "file" (JSON lines at
+    TRACING_FILE_PATH) or "otlp" (configured by the standard
+    OTEL_EXPORTER_OTLP_* variables).
+    """
+    if trace is None or TRACING_EXPORTER == "none":
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+    elif TRACING_EXPORTER == "file":
+        directory = os.path.dirname(TRACING_FILE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        exporter = ConsoleSpanExporter(
+            out=open(TRACING_FILE_PATH, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    elif TRACING_EXPORTER == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        raise ValueError(f"Unknown tracing exporter: {TRACING_EXPORTER}")
+
+    provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+    if app is not None:
+        try:
+            from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+            FastAPIInstrumentor.instrument_app(app)
+        except ImportError:
+            print("Warning: opentelemetry-instrumentation-fastapi is not installed; HTTP spans are disabled")
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[None]:
+    """Run the block in a new child span; exceptions are recorded on it."""
+    if _tracer is None:
+        yield
+        return
+    with _tracer.start_as_current_span(name, attributes=_clean(attributes)):
+        yield
+
+
+def annotate(attributes: Dict[str, Any]) -> None:
+    """Set attributes on the current span, e.g. results known only at the end."""
+    if trace is not None:
+        trace.get_current_span().set_attributes(_clean(attributes))
+
+
+def bind_task_parents(tasks: Dict[str, Any]) -> None:
+    """Make the current span the parent of the spans of ``tasks`` (keyed by stage name).
+
+    crewai runs asynchronous tasks on threads of their own, which do not
+    inherit the current context, so it is looked up by task id instead.
+    """
+    parent = otel_context.get_current() if otel_context is not None else None
+    with _task_parents_lock:
+        for name, task in tasks.items():
+            _task_parents[task.id] = (name, parent)
+
+
+def release_task_parents(tasks: Dict[str, Any]) -> None:
+    with _task_parents_lock:
+        for task in tasks.values():
+            _task_parents.pop(task.id, None)
+
+
+def task_name(task: Any) -> Optional[str]:
+    """Stage name a task was bound with, if any."""
+    with _task_parents_lock:
+        binding = _task_parents.get(getattr(task, "id", None))
+    return binding[0] if binding is not None else None
+
+
+@contextmanager
+def task_span(task: Any, agent_role: str) -> Iterator[None]:
+    """Span for one crewai task, parented to the span that bound it."""
+    with _task_parents_lock:
+        name, parent = _task_parents.get(getattr(task, "id", None), (None, None))
+    token = otel_context.attach(parent) if parent is not None else None
+    try:
+        with span("crew.task", {
+            "task.name": name,
+            "agent.role": agent_role,
+            "task.async": bool(getattr(task, "async_execution", False)),
+            "task.description": task.description[:200],
+        }):
+            yield
+    finally:
+        if token is not None:
+            otel_context.detach(token)
@@ -1,16 +1,33 @@
 import unittest
 import os
+import time
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
 
 # Import the FastAPI app
-from main import app
+import agents
+from main import app, result_cache
+from executor import QueueFullError
+from scanner import PatternScanner
+from llm_cache import LLMResponseCache
+from retrieval import BM25Index, chunk_pages
+from cache import DocumentTextCache
+from financial_metrics import MetricExtractor
+from docx_extraction import iter_docx_blocks
+from pdf_tables import extract_statement_tables, parse_number
+from page_index import build_page_index
+from context_packer import ContextPacker, context_budget, context_window, count_tokens
+from rate_limit import RateLimiter, RateLimitTimeout, create_rate_limiter
 
 class TestFinancialDocumentAnalyzer(unittest.TestCase):
     def setUp(self):
         # Create test client
         self.client = TestClient(app)
         
+        # Start every test with an empty result cache
+        if result_cache is not None:
+            result_cache.clear()
+        
         # Create test data directory if it doesn't exist
         os.makedirs("data", exist_ok=True)
         
@@ -100,5 +117,963 @@ class TestFinancialDocumentAnalyzer(unittest.TestCase):
         self.assertIn("detail", response.json())
         self.assertIn("Error processing financial document", response.json()["detail"])
 
+    @patch('main.run_crew')
+    def test_analyze_uses_result_cache(self, mock_run_crew):
+        """Test that re-uploading the same document and query skips the crew"""
+        if result_cache is None:
+            self.skipTest("Result cache is disabled")
+        mock_run_crew.return_value = {
+            "status": "success",
+            "analysis": "Sample analysis result",
+            "executive_summary": "Sample executive summary"
+        }
+
+        responses = []
+        for _ in range(2):
+            with open(self.test_pdf_path, "rb") as f:
+                responses.append(self.client.post(
+                    "/analyze",
+                    files={"file": ("test.pdf", f, "application/pdf")},
+                    data={"query": "Analyze this document"}
+                ))
+
+        self.assertEqual(mock_run_crew.call_count, 1)
+        self.assertEqual(responses[1].status_code, 200)
+        self.assertTrue(responses[1].json()["cached"])
+        self.assertEqual(responses[1].json()["analysis"], "Sample analysis result")
+
+    @patch('main.MAX_FILE_SIZE', 100)
+    @patch('main.run_crew')
+    def test_analyze_file_too_large(self, mock_run_crew):
+        """Test that uploads over the size limit are rejected while streaming"""
+        with open(self.test_pdf_path, "rb") as f:
+            response = self.client.post(
+                "/analyze",
+                files={"file": ("test.pdf", f, "application/pdf")}
+            )
+
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("File size exceeds maximum limit", response.json()["detail"])
+        mock_run_crew.assert_not_called()
+
+    @patch('main.UPLOAD_OVERHEAD_BYTES', 1024)
+    @patch('main.MAX_FILE_SIZE', 4096)
+    @patch('main._save_upload')
+    def test_chunked_upload_rejected_while_received(self, mock_save_upload):
+        """Test that a body without Content-Length is refused as it arrives, before the form is parsed"""
+        def body():
+            yield b'--boundary\r\nContent-Disposition: form-data; name="file"; filename="big.pdf"\r\n' \
+                  b'Content-Type: application/pdf\r\n\r\n'
+            for _ in range(100):
+                yield b"%" * 1024
+            yield b"\r\n--boundary--\r\n"
+
+        response = self.client.post(
+            "/analyze", content=body(),
+            headers={"Content-Type": "multipart/form-data; boundary=boundary"}
+        )
+
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("File size exceeds maximum limit", response.json()["detail"])
+        self.assertNotIn("content-length", {name.lower() for name in response.request.headers})
+        mock_save_upload.assert_not_called()
+
+    @patch('main.crew_executor.run', side_effect=QueueFullError("queue full"))
+    def test_analyze_queue_full(self, mock_run):
+        """Test that a saturated worker pool is reported as 503"""
+        with open(self.test_pdf_path, "rb") as f:
+            response = self.client.post(
+                "/analyze",
+                files={"file": ("test.pdf", f, "application/pdf")}
+            )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response.headers)
+        self.assertIn("Server is busy", response.json()["detail"])
+
+    @patch('main.FinancialDocumentTool.read_pages')
+    @patch('main.run_crew')
+    def test_analyze_fast_mode(self, mock_run_crew, mock_read):
+        """Test the rule-based fast path that makes no LLM calls"""
+        mock_read.return_value = [
+            "Total revenue: $1,200,000. Net income: $150,000. "
+            "Revenue growth was strong, but the company faces significant debt."
+        ]
+
+        with open(self.test_pdf_path, "rb") as f:
+            response = self.client.post(
+                "/analyze",
+                files={"file": ("test.pdf", f, "application/pdf")},
+                data={"mode": "fast"}
+            )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["status"], "success")
+        self.assertEqual(data["mode"], "fast")
+        self.assertIn("Revenue", data["analysis"])
+        self.assertEqual(data["metrics"]["Revenue"]["first_amount"], 1200000.0)
+        self.assertIn("Risk Level", data["executive_summary"])
+        mock_run_crew.assert_not_called()
+
+    def test_analyze_invalid_mode(self):
+        """Test that an unknown analysis mode is rejected"""
+        with open(self.test_pdf_path, "rb") as f:
+            response = self.client.post(
+                "/analyze",
+                files={"file": ("test.pdf", f, "application/pdf")},
+                data={"mode": "turbo"}
+            )
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch('main.run_crew')
+    def test_job_submit_poll_result(self, mock_run_crew):
+        """Test the asynchronous submit/poll/result job flow"""
+        mock_run_crew.return_value = {
+            "status": "success",
+            "analysis": "Sample analysis result",
+            "executive_summary": "Sample executive summary"
+        }
+
+        with open(self.test_pdf_path, "rb") as f:
+            response = self.client.post(
+                "/jobs",
+                files={"file": ("test.pdf", f, "application/pdf")}
+            )
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+
+        for _ in range(50):
+            status = self.client.get(f"/jobs/{job_id}").json()
+            if status["status"] in ("completed", "failed"):
+                break
+            time.sleep(0.1)
+
+        self.assertEqual(status["status"], "completed")
+        result = self.client.get(f"/jobs/{job_id}/result")
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.json()["analysis"], "Sample analysis result")
+        self.assertEqual(result.json()["file_processed"], "test.pdf")
+
+    @patch('main.run_crew')
+    def test_analyze_batch_dedupes_identical_files(self, mock_run_crew):
+        """Test that a batch analyses identical uploads once and returns one result per file"""
+        mock_run_crew.return_value = {
+            "status": "success",
+            "analysis": "Sample analysis result",
+            "executive_summary": "Sample executive summary"
+        }
+        with open(self.test_pdf_path, "rb") as f:
+            content = f.read()
+
+        response = self.client.post(
+            "/analyze/batch",
+            files=[
+                ("files", ("q1.pdf", content, "application/pdf")),
+                ("files", ("q1-copy.pdf", content, "application/pdf")),
+                ("files", ("q2.pdf", content + b"\n% Q2", "application/pdf")),
+            ],
+            data={"query": "Analyze these quarterly reports"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(mock_run_crew.call_count, 2)
+        self.assertEqual(body["status"], "success")
+        self.assertEqual(body["unique_documents"], 2)
+        self.assertEqual([r["file_processed"] for r in body["results"]], ["q1.pdf", "q1-copy.pdf", "q2.pdf"])
+        self.assertEqual(body["results"][1]["duplicate_of"], "q1.pdf")
+        self.assertIn("## q2.pdf", body["combined_summary"])
+
+    @patch('main.run_crew')
+    def test_analyze_batch_reports_failures_per_document(self, mock_run_crew):
+        """Test that one failing document does not fail the rest of the batch"""
+        mock_run_crew.side_effect = [
+            {"status": "success", "analysis": "Sample analysis result", "executive_summary": "Summary"},
+            Exception("Test error")
+        ]
+        with open(self.test_pdf_path, "rb") as f:
+            content = f.read()
+
+        response = self.client.post(
+            "/analyze/batch",
+            files=[
+                ("files", ("q1.pdf", content, "application/pdf")),
+                ("files", ("q2.pdf", content + b"\n% Q2", "application/pdf")),
+            ]
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "partial")
+        self.assertEqual(sorted(r["status"] for r in response.json()["results"]), ["error", "success"])
+
+    def test_summary_written_per_upload_only_when_configured(self):
+        """Test that the summary task gets no output file by default and a per-upload one with SUMMARY_OUTPUT_DIR"""
+        import tempfile
+        import main
+
+        def summary_output_files(paths):
+            with patch.object(main, "build_agents", return_value=MagicMock()), \
+                    patch.object(main, "_task_excerpts", return_value=MagicMock()), \
+                    patch.object(main, "create_document_analysis_task"), \
+                    patch.object(main, "create_investment_analysis_task"), \
+                    patch.object(main, "create_risk_assessment_task"), \
+                    patch.object(main, "create_executive_summary_task") as create_summary:
+                for path in paths:
+                    main._run_crew("Analyze", path)  # The crew cannot start from mocks; only the summary task matters
+            return [call.kwargs["output_file"] for call in create_summary.call_args_list]
+
+        paths = ["data/financial_document_a.pdf", "data/financial_document_b.pdf"]
+        self.assertEqual(summary_output_files(paths), [None, None])
+        with tempfile.TemporaryDirectory() as tmp, patch.object(main, "SUMMARY_OUTPUT_DIR", tmp):
+            self.assertEqual(summary_output_files(paths), [
+                os.path.join(tmp, "financial_document_a_summary.md"),
+                os.path.join(tmp, "financial_document_b_summary.md"),
+            ])
+
+    def test_metrics_endpoint(self):
+        """Test that /metrics exposes request counts and pool gauges in Prometheus format"""
+        self.client.get("/")
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn('http_requests_total{method="GET",route="/",status="200"}', response.text)
+        self.assertIn("crew_queue_depth", response.text)
+        self.assertIn("pipeline_stage_duration_seconds", response.text)
+        self.assertIn("# TYPE cache_lookups_total counter", response.text)
+
+    def test_job_not_found(self):
+        """Test polling an unknown job id"""
+        response = self.client.get("/jobs/does-not-exist")
+        self.assertEqual(response.status_code, 404)
+
+class TestJobStore(unittest.TestCase):
+    def test_memory_store_evicts_expired_finished_jobs(self):
+        """Test that finished jobs are dropped after the TTL while unfinished ones stay"""
+        from datetime import datetime, timedelta, timezone
+        from jobs import InMemoryJobStore, Job, JobStatus
+
+        store = InMemoryJobStore(finished_ttl=60)
+        stale = datetime.now(timezone.utc) - timedelta(minutes=5)
+        done = store.add(Job(status=JobStatus.COMPLETED, updated_at=stale))
+        running = store.add(Job(status=JobStatus.RUNNING, updated_at=stale))
+        fresh = store.add(Job(status=JobStatus.FAILED))
+
+        self.assertIsNone(store.get(done.id))
+        self.assertNotIn(done.id, store._jobs)
+        self.assertIsNotNone(store.get(running.id))
+        self.assertIsNotNone(store.get(fresh.id))
+
+    def test_sqlite_store_fails_orphaned_jobs_on_startup(self):
+        """Test that jobs left queued or running by a stopped worker are marked failed"""
+        import tempfile
+        from jobs import Job, JobStatus, SQLiteJobStore
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "jobs.db")
+            store = SQLiteJobStore(path)
+            queued = store.add(Job())
+            running = store.add(Job(status=JobStatus.RUNNING, stage="risk_assessment"))
+            done = store.add(Job(status=JobStatus.COMPLETED, stage="done", result={"status": "success"}))
+
+            restarted = SQLiteJobStore(path)
+            for job in (queued, running):
+                job = restarted.get(job.id)
+                self.assertEqual((job.status, job.stage), (JobStatus.FAILED, "done"))
+                self.assertIn("restarted", job.error)
+            self.assertEqual(restarted.get(done.id).status, JobStatus.COMPLETED)
+
+    def test_sqlite_store_expires_finished_jobs(self):
+        """Test that finished SQLite jobs are deleted after the TTL while unfinished ones stay"""
+        import tempfile
+        from datetime import datetime, timedelta, timezone
+        from jobs import Job, JobStatus, SQLiteJobStore
+
+        stale = datetime.now(timezone.utc) - timedelta(minutes=5)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteJobStore(os.path.join(tmp, "jobs.db"), finished_ttl=60)
+            done = store.add(Job(status=JobStatus.COMPLETED, updated_at=stale, result={"status": "success"}))
+            running = store.add(Job(status=JobStatus.RUNNING, updated_at=stale))
+            self.assertIsNone(store.get(done.id))
+
+            store.add(Job())
+            with store._connect() as conn:
+                ids = [row[0] for row in conn.execute("SELECT id FROM jobs")]
+            self.assertNotIn(done.id, ids)
+            self.assertIn(running.id, ids)
+
+    def test_concurrent_updates_are_not_lost(self):
+        """Test that updates to different fields from two threads all land"""
+        import tempfile
+        import threading
+        from jobs import InMemoryJobStore, Job, SQLiteJobStore
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for store in (InMemoryJobStore(), SQLiteJobStore(os.path.join(tmp, "jobs.db"))):
+                job = store.add(Job())
+                threads = [
+                    threading.Thread(target=lambda: [store.update(job.id, stage=f"stage-{i}") for i in range(20)]),
+                    threading.Thread(target=lambda: [store.update(job.id, query=f"query-{i}") for i in range(20)]),
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+                job = store.get(job.id)
+                self.assertEqual((job.stage, job.query), ("stage-19", "query-19"))
+
+class TestCrewExecutor(unittest.TestCase):
+    @patch('executor.SLOT_POLL_INTERVAL', 0.01)
+    def test_run_when_free_waits_for_a_slot(self):
+        """Test that a job waits for the busy pool up to its timeout instead of failing at once"""
+        import asyncio
+        import threading
+        from executor import CrewExecutor
+
+        executor = CrewExecutor(max_workers=1, max_queue=0)
+        release = threading.Event()
+        executor.submit(release.wait)
+
+        async def scenario():
+            with self.assertRaises(QueueFullError):
+                await executor.run_when_free(0.05, lambda: "too late")
+            asyncio.get_running_loop().call_later(0.1, release.set)
+            return await executor.run_when_free(5, lambda: "done")
+
+        try:
+            self.assertEqual(asyncio.run(scenario()), "done")
+        finally:
+            release.set()
+            executor.shutdown()
+
+class TestPatternScanner(unittest.TestCase):
+    def test_matches_per_pattern_search(self):
+        """Test that the single-pass scanner agrees with one re scan per rule"""
+        import re
+        rules = [
+            ("revenue", r'(?:revenue|sales)[\s:]*[\$\d\.\s]+(?:million|billion|M|B)?'),
+            ("pe", r'P[/\s]?E[\s:]*[\d\.]+'),
+            ("dividend_yield", r'dividend yield[\s:]*[\d\.]+%?'),
+            ("dividend", r'\bdividend\b'),
+            ("growth", r'\bgrowth\b'),
+        ]
+        text = "Sales: $ 1.2 billion, P/E 14.5, dividend yield 3% and dividend growth; PE 12 then sales 4 M"
+        scanner = PatternScanner(rules)
+
+        first = scanner.first_matches(text)
+        every = scanner.find_all(text)
+        for key, pattern in rules:
+            expected = [m.span() for m in re.finditer(pattern, text, re.IGNORECASE)]
+            self.assertEqual(first[key].span(), expected[0])
+            self.assertEqual([m.span() for m in every[key]], expected)
+
+class TestRiskRules(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = os.path.join(self.tmp.name, "10_base.json")
+        self.extra = os.path.join(self.tmp.name, "20_extra.yaml")
+        self._write(self.base, '{"categories": {"financial": {"weight": 1.5, "rules": ['
+                               '{"pattern": "going[\\\\s-]concern", "description": "Going concern issues"}]}}}')
+        self._write(self.extra, "categories:\n"
+                                "  financial:\n"
+                                "    title: Solvency Risks\n"
+                                "    rules:\n"
+                                "      - {pattern: covenant breach, description: Covenant breach}\n"
+                                "  esg:\n"
+                                "    rules:\n"
+                                "      - {pattern: emissions, description: Emissions exposure}\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, path, content, mtime=None):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_merges_packs_in_name_order(self):
+        """Test that a directory of JSON and YAML packs merges into one rule set"""
+        from risk_rules import load_rule_set
+
+        rule_set = load_rule_set(self.tmp.name)
+        categories = {category.name: category for category in rule_set.categories}
+
+        self.assertEqual(list(categories), ["financial", "esg"])
+        self.assertEqual(categories["financial"].title, "Solvency Risks")
+        self.assertEqual(categories["financial"].weight, 1.5)
+        self.assertEqual([rule.description for rule in categories["financial"].rules],
+                         ["Going concern issues", "Covenant breach"])
+        self.assertEqual(categories["esg"].title, "Esg Risks")
+
+        matches = rule_set.classify("Going concern doubts follow a covenant breach.")
+        self.assertEqual([match.description for match in matches["financial"]],
+                         ["Going concern issues", "Covenant breach"])
+        self.assertEqual(matches["esg"], [])
+
+    def test_reloads_changed_pack(self):
+        """Test that a pack modified on disk is picked up on the next classification"""
+        from risk_rules import RiskRuleEngine
+
+        engine = RiskRuleEngine(self.base)
+        self.assertEqual(engine.classify("A liquidity crisis looms.")["financial"], [])
+
+        self._write(self.base, '{"categories": {"financial": {"rules": ['
+                               '{"pattern": "liquidity crisis", "description": "Potential liquidity crisis"}]}}}',
+                    mtime=os.path.getmtime(self.base) + 10)
+
+        matches = engine.classify("A liquidity crisis looms.")["financial"]
+        self.assertEqual([match.description for match in matches], ["Potential liquidity crisis"])
+        self.assertFalse(engine.reload_if_changed())
+
+    def test_keeps_previous_rules_when_reload_fails(self):
+        """Test that a malformed pack leaves the last good rule set active"""
+        from risk_rules import RiskRuleEngine
+
+        engine = RiskRuleEngine(self.tmp.name)
+        rule_set = engine.rule_set
+        self._write(self.extra, "categories:\n  esg:\n    rules:\n      - {pattern: '(unclosed', description: Broken}\n",
+                    mtime=os.path.getmtime(self.extra) + 10)
+
+        with patch("builtins.print") as warn:
+            self.assertFalse(engine.reload_if_changed())
+            self.assertIs(engine.rule_set, rule_set)
+        warn.assert_called_once()
+        self.assertEqual(len(engine.classify("Substantial doubt about going concern")["financial"]), 1)
+
+class TestLLMResponseCache(unittest.TestCase):
+    def test_lookup_is_keyed_on_model_and_prompt(self):
+        """Test that cached generations round-trip and other models or prompts miss"""
+        from langchain_core.load import dumps
+        from langchain_core.messages import AIMessage, HumanMessage
+        from langchain_core.outputs import ChatGeneration
+
+        cache = LLMResponseCache(max_entries=8, max_bytes=None, ttl=60)
+        prompt = dumps([HumanMessage(content="Summarize the document")])
+        cache.update(prompt, "model-a", [ChatGeneration(message=AIMessage(content="Summary"))])
+
+        cached = cache.lookup(prompt, "model-a")
+        self.assertEqual(cached[0].message.content, "Summary")
+        self.assertIsNone(cache.lookup(prompt, "model-b"))
+        self.assertIsNone(cache.lookup(dumps([HumanMessage(content="Other")]), "model-a"))
+        self.assertEqual(cache.stats.hits, 1)
+        self.assertEqual(cache.stats.misses, 2)
+
+class TestRetrieval(unittest.TestCase):
+    def test_top_chunks_ranks_relevant_pages(self):
+        """Test that chunking keeps page numbers and BM25 finds the relevant page"""
+        pages = [
+            "Revenue grew 12% to $1.2 billion.\nNet income was $150 million.",
+            "Risk factors: significant debt and pending litigation.",
+            "Cash flow from operations reached $300 million.",
+        ]
+        index = BM25Index(chunk_pages(pages, max_chars=200))
+
+        self.assertEqual([chunk.source for chunk in index.chunks], [1, 2, 3])
+        top = index.top_chunks("debt litigation", k=1)
+        self.assertEqual(len(top), 1)
+        self.assertEqual(top[0].source, 2)
+        self.assertEqual(index.search("unrelated words", k=3), [])
+
+class TestFinancialMetrics(unittest.TestCase):
+    def setUp(self):
+        self.table = MetricExtractor().extract([
+            "Q2 2025 Update\nTotal revenue was $1.2 billion, up 12% year over year.\n"
+            "Net income: (45.5) million. Return on equity: 14.5%.",
+            "Revenue for Q3 2025 was $1,350 million. Cost of revenue | 800.0 | 700.0",
+        ])
+
+    def test_parses_typed_records(self):
+        """Test that values are parsed with scale, currency, sign, period and page"""
+        revenue, net_income, roe, later_revenue = list(self.table)
+        self.assertEqual((revenue.metric, revenue.value, revenue.scale, revenue.currency),
+                         ("Revenue", 1.2, 1e9, "USD"))
+        self.assertEqual((revenue.period, revenue.page), ("Q2 2025", 1))
+        self.assertEqual(net_income.amount, -45.5e6)
+        self.assertTrue(roe.percent)
+        self.assertEqual((later_revenue.period, later_revenue.page), ("Q3 2025", 2))
+
+    def test_reads_signs_only_from_attached_minus_or_closed_parenthesis(self):
+        """Test that separator dashes and unclosed parentheses do not negate, and "$(x)" keeps its currency"""
+        def first(text):
+            record = list(MetricExtractor().extract([text]))[0]
+            return record.amount, record.currency
+
+        self.assertEqual(first("Revenue - $1.2B"), (1.2e9, "USD"))
+        self.assertEqual(first("Net Income – $150M (up 10% YoY)"), (150e6, "USD"))
+        self.assertEqual(first("Net income (150 this year"), (150, None))
+        self.assertEqual(first("Net income $(12.5) million"), (-12.5e6, "USD"))
+        self.assertEqual(first("Net income -$3.5 million"), (-3.5e6, "USD"))
+
+    def test_aggregates_every_occurrence(self):
+        """Test aggregate queries over all mentions without re-reading the text"""
+        self.assertEqual(self.table.aggregate("count", metric="Revenue"), 2)
+        self.assertEqual(self.table.aggregate("sum", by="period", metric="Revenue"),
+                         {"Q2 2025": 1.2e9, "Q3 2025": 1.35e9})
+        self.assertIsNone(self.table.aggregate("max", metric="EBITDA"))
+
+    def test_document_metrics_keep_real_page_numbers(self):
+        """Test that metrics of selected sections are numbered by PDF page, with blank lines inside pages"""
+        import tempfile
+        import tools
+
+        pages = ["Q2 2025 Update\n\nRevenue was $1.2 billion.", "Net income: $9.9 million.", "",
+                 "Net income: $45.5 million in Q3 2025."]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.pdf")
+            open(path, "wb").close()
+            document = tools.FinancialDocumentTool(file_path=path)
+            with patch.object(tools.FinancialDocumentTool, "read_pages", return_value=pages), \
+                    patch.object(tools.FinancialDocumentTool, "_section_positions", return_value=[0, 3]):
+                table = document.metric_table(sections=["mdna"])
+
+        self.assertEqual([(record.metric, record.page, record.period) for record in table],
+                         [("Revenue", 1, "Q2 2025"), ("Net Income", 4, "Q3 2025")])
+
+    def test_extraction_scales_linearly(self):
+        """Test that the period lookup keeps extraction linear in the page length"""
+        page = "Q2 2025 Update\n" + "Revenue was $1.2 billion in Q2 2025. Net income: $45.5 million.\n" * 50
+        extractor = MetricExtractor()
+
+        start = time.perf_counter()
+        extractor.extract([page * 40])
+        long_page = time.perf_counter() - start
+        start = time.perf_counter()
+        extractor.extract([page * 10])
+        short_page = time.perf_counter() - start
+        # Period lookup is bounded by the sentence, so 4x the text costs about 4x, not 16x
+        self.assertLess(long_page, short_page * 10)
+
+class TestDocumentTextCache(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        from docx import Document
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "report.docx")
+        doc = Document()
+        doc.add_paragraph("Revenue was $1.2 million.")
+        doc.save(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_second_read_is_served_from_cache(self):
+        """Test that a re-read skips parsing, and the upload is hashed only once"""
+        import cache
+        import tools
+
+        text_cache = DocumentTextCache(max_entries=8, max_bytes=None)
+        with patch.object(tools, "document_text_cache", text_cache), \
+                patch.object(tools.FinancialDocumentTool, "_read_docx_blocks",
+                             autospec=True, side_effect=lambda self: ["Revenue was $1.2 million."]) as parse, \
+                patch.object(cache, "hash_file", wraps=cache.hash_file) as hash_file:
+            document = tools.FinancialDocumentTool(file_path=self.path)
+            first = document.read_pages()
+            second = tools.FinancialDocumentTool(file_path=self.path).read_pages()
+            document.page_index()
+
+        self.assertEqual(first, second)
+        self.assertEqual(parse.call_count, 1)
+        # Misses: the first read and the page index; hits: the second read and the index build
+        self.assertEqual((text_cache.stats.hits, text_cache.stats.misses), (2, 2))
+        self.assertEqual(hash_file.call_count, 1)
+
+    def test_streamed_pages_match_with_cold_and_warm_cache(self):
+        """Test that iter_pages yields the same numbered pages before and after the text is cached"""
+        import tools
+
+        path = os.path.join(self.tmp.name, "report.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4 stub")
+        results = [(0, "Revenue 1,250.0", None), (1, "", "damaged content stream"), (2, "Net income 180.4", None)]
+        reader = MagicMock(pages=[None] * len(results))
+
+        text_cache = DocumentTextCache(max_entries=8, max_bytes=None)
+        with patch.object(tools, "document_text_cache", text_cache), \
+                patch.object(tools, "open_pdf", return_value=reader), \
+                patch.object(tools, "read_pages", return_value=results), \
+                patch.object(tools, "iter_pdf_pages", return_value=iter(results)), \
+                patch("builtins.print"):
+            document = tools.FinancialDocumentTool(file_path=path)
+            cold = list(document.iter_pages())
+            document.read_pages()
+            warm = list(document.iter_pages())
+
+        self.assertEqual(cold, [(1, "Revenue 1,250.0"), (2, ""), (3, "Net income 180.4")])
+        self.assertEqual(warm, cold)
+        self.assertEqual(text_cache.stats.hits, 1)
+
+    def test_pool_extraction_matches_serial_read(self):
+        """Test that a document read on the extraction process pool gives the same pages"""
+        import tools
+
+        with patch.object(tools, "document_text_cache", None), patch.object(tools, "PDF_EXTRACT_WORKERS", 2), \
+                patch.object(tools, "run_in_pool", wraps=tools.run_in_pool) as run_in_pool:
+            pooled = tools.FinancialDocumentTool(file_path=self.path).read_pages(in_pool=True)
+            serial = tools.FinancialDocumentTool(file_path=self.path).read_pages()
+
+        self.assertEqual(pooled, serial)
+        self.assertEqual(pooled, ["Revenue was $1.2 million."])
+        run_in_pool.assert_called_once()
+
+    def test_version_bump_invalidates_disk_entries(self):
+        """Test that pages cached by an older extractor version are not served"""
+        db_path = os.path.join(self.tmp.name, "text.db")
+        DocumentTextCache(max_entries=8, max_bytes=None, disk_path=db_path, version="1").set_pages(
+            "abc", "docx", ["stale text"])
+
+        self.assertEqual(
+            DocumentTextCache(max_entries=8, max_bytes=None, disk_path=db_path, version="1").get_pages("abc", "docx"),
+            ["stale text"]
+        )
+        self.assertIsNone(DocumentTextCache(max_entries=8, max_bytes=None, disk_path=db_path).get_pages("abc", "docx"))
+
+class TestDocxExtraction(unittest.TestCase):
+    def test_streams_headings_paragraphs_and_tables(self):
+        """Test that DOCX tables are extracted as rows, in order and under their heading"""
+        import tempfile
+        from docx import Document
+
+        doc = Document()
+        doc.add_heading("Income Statement", level=1)
+        doc.add_paragraph("Figures in millions.")
+        table = doc.add_table(rows=2, cols=2)
+        for row, cells in zip(table.rows, [("Revenue", "1,250.0"), ("Net income", "180.4")]):
+            for cell, text in zip(row.cells, cells):
+                cell.text = text
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.docx")
+            doc.save(path)
+            blocks = list(iter_docx_blocks(path))
+
+        self.assertEqual([block.kind for block in blocks], ["heading", "paragraph", "table"])
+        self.assertEqual(blocks[0].level, 1)
+        self.assertEqual(blocks[2].rows, [["Revenue", "1,250.0"], ["Net income", "180.4"]])
+        self.assertEqual(blocks[2].text, "Revenue | 1,250.0\nNet income | 180.4")
+        self.assertEqual(blocks[2].section, "Income Statement")
+
+class TestPageIndex(unittest.TestCase):
+    def test_labels_sections_and_carries_them_across_pages(self):
+        """Test that headings label pages, untitled pages continue their section and running headers are ignored"""
+        pages = [
+            "Table of Contents\nForward-Looking Statements\nThis report is filed pursuant to the Securities Exchange Act.",
+            "Table of Contents\nItem 1A. Risk Factors\nCompetition could harm our results.",
+            "Table of Contents\nRising rates may adversely affect demand and we cannot assure growth.",
+            "Table of Contents\nItem 7. Management's Discussion and Analysis\nRevenue increased 12% compared to 2024.",
+            "Table of Contents\nConsolidated Balance Sheets\nTotal assets 1,200 1,100",
+            "Table of Contents\nItem 9A. Controls and Procedures\nOur management evaluated its controls.",
+        ]
+        index = build_page_index(pages)
+
+        self.assertEqual(index.labels, ["boilerplate", "risk_factors", "risk_factors", "mdna", "statement", "other"])
+        self.assertEqual(index.positions(["risk_factors", "mdna"]), [1, 2, 3])
+
+    def test_retrieval_limited_to_chunk_ids(self):
+        """Test that BM25 search only returns chunks from the allowed pages"""
+        index = BM25Index(chunk_pages(["debt covenant risk", "debt maturity schedule", "revenue growth"]))
+        self.assertEqual([chunk.source for chunk in index.top_chunks("debt", k=2, within=[1])], [2])
+
+class TestContextPacker(unittest.TestCase):
+    def test_fills_budget_in_priority_order(self):
+        """Test that blocks beyond the budget are skipped or cut, and kept blocks render by tier and position"""
+        packer = ContextPacker(budget=60)
+        self.assertTrue(packer.add("- Revenue: $1.2 million", "Key figures", tier=0))
+        self.assertTrue(packer.add("late passage about debt", "Page 9", tier=2, position=9))
+        self.assertTrue(packer.add("early passage about debt", "Page 2", tier=2, position=2))
+        self.assertFalse(packer.add("x" * 400, "Page 5", tier=2, position=5))
+        table = "\n".join(f"Row {i},{i * 100}" for i in range(40))
+        self.assertTrue(packer.add(table, "Page 3", tier=1, position=3, truncate=True))
+
+        text = packer.text()
+        self.assertLessEqual(packer.used, packer.budget)
+        self.assertLessEqual(count_tokens(text), packer.budget)
+        self.assertEqual([line for line in text.splitlines() if line.startswith("[")],
+                         ["[Key figures]", "[Page 3]", "[Page 2]", "[Page 9]"])
+        self.assertIn("Row 0,0", text)
+        self.assertNotIn("Row 39,3900", text)
+
+    def test_context_window_lookup(self):
+        """Test that dated model names resolve to their family's window"""
+        self.assertEqual(context_window("gpt-3.5-turbo-0125"), 16385)
+        self.assertEqual(context_window("gpt-4-0613"), 8192)
+        self.assertEqual(context_window("gpt-4o-mini"), 128000)
+
+    def test_task_contexts_share_one_document_read(self):
+        """Test that several task contexts are packed from a single extraction, each within its budget"""
+        import tempfile
+        import tools
+        from docx import Document
+
+        doc = Document()
+        for i in range(30):
+            doc.add_paragraph(f"Revenue was ${i + 1}.0 million in Q{i % 4 + 1} 2025, and debt risk rose by {i}%.")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.docx")
+            doc.save(path)
+            document = tools.FinancialDocumentTool(file_path=path)
+            with patch.object(tools.metric_extractor, "extract", wraps=tools.metric_extractor.extract) as extract, \
+                    patch.object(tools.FinancialDocumentTool, "read_pages", autospec=True,
+                                 side_effect=tools.FinancialDocumentTool.read_pages) as read_pages:
+                contexts = document.packed_contexts({
+                    "risk": ("debt risk", 600, None),
+                    "summary": ("", 60, ()),
+                })
+
+        self.assertEqual((extract.call_count, read_pages.call_count), (1, 1))
+        self.assertIn("[Key figures]", contexts["summary"])
+        self.assertNotIn("[Paragraph", contexts["summary"])
+        self.assertIn("[Paragraph", contexts["risk"])
+        self.assertLessEqual(count_tokens(contexts["risk"]), 600)
+
+    def test_small_window_keeps_a_context_budget(self):
+        """Test that a reservation larger than the window still leaves document context"""
+        context_budget.cache_clear()
+        self.assertEqual(context_budget(16385, 6000), 10385)
+        with patch('builtins.print') as mock_print:
+            self.assertEqual(context_budget(4096, 6000), 2048)
+            self.assertEqual(context_budget(8192, 6000), 4096)
+        self.assertIn("CONTEXT_RESERVED_TOKENS", mock_print.call_args[0][0])
+
+class TestPdfTables(unittest.TestCase):
+    def _write_statement_pdf(self, path):
+        """Write a one-page PDF whose cells are drawn at separate positions, like most statement PDFs"""
+        rows = [
+            ("Consolidated Statements of Operations",),
+            ("(in millions)", "2025", "2024"),
+            ("Revenue", "1,250.0", "1,100.5"),
+            ("Cost of revenue", "(700.2)", "(650.0)"),
+            ("Net income", "180.4", "150.0"),
+        ]
+        ops = [f"BT /F1 10 Tf {[50, 300, 400][i]} {700 - 14 * n} Td ({cell}) Tj ET"
+               for n, row in enumerate(rows) for i, cell in enumerate(row)]
+        content = " ".join(ops)
+        objects = [
+            "<< /Type /Catalog /Pages 2 0 R >>",
+            "<< /Type /Pages /Kids [4 0 R] /Count 1 >>",
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            "/Resources << /Font << /F1 3 0 R >> >> /Contents 5 0 R >>",
+            f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        ]
+        out, offsets = bytearray(b"%PDF-1.4\n"), []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+        xref = len(out)
+        out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+        out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+        out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+        with open(path, "wb") as f:
+            f.write(bytes(out))
+
+    def test_rebuilds_statement_rows_and_columns(self):
+        """Test that statement cells are regrouped into a DataFrame and rendered as CSV in the page text"""
+        import tempfile
+        from pdf_extraction import iter_pdf_pages
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "statement.pdf")
+            self._write_statement_pdf(path)
+            tables = extract_statement_tables(path)
+            (_, text, warning), = iter_pdf_pages(path, tables=True)
+
+        self.assertEqual(len(tables), 1)
+        table = tables[0]
+        self.assertEqual((table.page, table.statement, table.unit), (1, "income_statement", "millions"))
+        frame = table.frame
+        self.assertEqual(list(frame.columns), ["(in millions)", "2025", "2024"])
+        self.assertEqual(list(frame["(in millions)"]), ["Revenue", "Cost of revenue", "Net income"])
+        self.assertEqual(list(frame["2025"]), [1250.0, -700.2, 180.4])
+        self.assertIsNone(warning)
+        self.assertIn("Cost of revenue,-700.2,-650", text)
+
+    def test_parses_statement_figures(self):
+        """Test accounting negatives, including a currency sign before the parenthesis"""
+        cases = {"1,250.0": 1250.0, "(700.2)": -700.2, "-700.2": -700.2, "$(5)": -5.0,
+                 "$ (1,250.0)": -1250.0, "€ -3": -3.0, "$5": 5.0, "12%": 12.0, "—": None}
+        self.assertEqual({text: parse_number(text) for text in cases}, cases)
+
+class TestRateLimiter(unittest.TestCase):
+    def test_jobs_take_turns_when_limited(self):
+        """Test that waiting jobs are served round-robin once the bucket is empty"""
+        import threading
+
+        limiter = create_rate_limiter(rpm=600, tpm=0)
+        limiter.store.charge({"requests": 600})
+        order = []
+
+        def run_job(job_id):
+            with RateLimiter.job(job_id):
+                for _ in range(3):
+                    limiter.acquire()
+                    order.append(job_id)
+
+        threads = [threading.Thread(target=run_job, args=(job_id,)) for job_id in "AB"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(order), list("AAABBB"))
+        self.assertNotIn("AAA", "".join(order))
+
+    def test_task_threads_charged_to_bound_job(self):
+        """Test that a crewai task on a child thread queues under its crew's job, not its own thread"""
+        import threading
+        from types import SimpleNamespace
+        from rate_limit import bind_task_jobs, release_task_jobs, task_job
+
+        limiter = create_rate_limiter(rpm=6, tpm=0, max_wait=0.3)
+        limiter.store.charge({"requests": 6})
+        task = SimpleNamespace(id="task-1")
+        waiting_jobs, errors = [], []
+
+        def run_task():
+            # Like crewai's async tasks: a plain thread that does not copy contextvars
+            with task_job(task):
+                try:
+                    limiter.acquire()
+                except RateLimitTimeout as e:
+                    errors.append(e)
+
+        with RateLimiter.job("job-A"):
+            bind_task_jobs({"risk_assessment": task}, "job-A")
+            thread = threading.Thread(target=run_task)
+            thread.start()
+            time.sleep(0.1)
+            with limiter._condition:
+                waiting_jobs.extend(limiter._waiting)
+            thread.join()
+        release_task_jobs({"risk_assessment": task})
+
+        self.assertEqual(waiting_jobs, ["job-A"])
+        self.assertEqual(len(errors), 1)
+
+    def test_token_limit_times_out(self):
+        """Test that a call gives up when token capacity does not free up in time"""
+        limiter = create_rate_limiter(rpm=0, tpm=600, max_wait=0.2)
+        limiter.acquire(tokens=500)
+        with self.assertRaises(RateLimitTimeout):
+            limiter.acquire(tokens=500)
+
+class TestTelemetry(unittest.TestCase):
+    def test_task_spans_parented_across_threads(self):
+        """Test that a task run on its own thread gets the span that bound it as parent"""
+        import threading
+        from types import SimpleNamespace
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        import telemetry
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        task = SimpleNamespace(id="task-1", description="Assess the risks", async_execution=True)
+
+        def run_task():
+            with telemetry.task_span(task, "Risk Assessor"):
+                pass
+
+        with patch.object(telemetry, "_tracer", provider.get_tracer("test")):
+            with telemetry.span("crew.run"):
+                telemetry.bind_task_parents({"risk_assessment": task})
+                thread = threading.Thread(target=run_task)
+                thread.start()
+                thread.join()
+            telemetry.release_task_parents({"risk_assessment": task})
+
+        spans = {span.name: span for span in exporter.get_finished_spans()}
+        self.assertEqual(spans["crew.task"].parent.span_id, spans["crew.run"].context.span_id)
+        self.assertEqual(spans["crew.task"].attributes["task.name"], "risk_assessment")
+        self.assertIsNone(telemetry.task_name(task))
+
+class TestAgentRegistry(unittest.TestCase):
+    def tearDown(self):
+        agents.use_llm(None)
+
+    def test_agents_built_on_first_use(self):
+        """Test that agents are created lazily, with the injected LLM and no API key"""
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+        llm = FakeListChatModel(responses=["Final Answer: ok"])
+        agents.use_llm(llm)
+        self.assertNotIn("financial_analyst", agents._registry)
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": ""}):
+            analyst = agents.financial_analyst
+        self.assertIs(analyst.llm, llm)
+        self.assertIs(agents.get_agent("financial_analyst"), analyst)
+        self.assertEqual(list(agents.get_agents()), list(agents.AGENT_NAMES))
+
+    def test_parallel_task_graph(self):
+        """Test that investment and risk run async off the document analysis, without delegating, and the summary joins them"""
+        import tempfile
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from config import CREW_PARALLEL_TASKS
+        from task import (create_document_analysis_task, create_investment_analysis_task,
+                          create_risk_assessment_task, create_executive_summary_task)
+
+        agents.use_llm(FakeListChatModel(responses=["Final Answer: ok"]))
+        with patch.dict(os.environ, {"OPENAI_API_KEY": ""}), tempfile.NamedTemporaryFile(suffix=".pdf") as pdf:
+            document = create_document_analysis_task(pdf.name)
+            investment = create_investment_analysis_task(document, "Outlook?", async_execution=True)
+            risk = create_risk_assessment_task(document, async_execution=True)
+            summary = create_executive_summary_task(document, investment, risk)
+
+        self.assertFalse(document.async_execution)
+        self.assertFalse(summary.async_execution)
+        for task in (investment, risk):
+            self.assertTrue(task.async_execution)
+            self.assertEqual(task.context, [document])
+            self.assertEqual(task.agent.allow_delegation, not CREW_PARALLEL_TASKS)
+        self.assertEqual(summary.context, [document, investment, risk])
+        self.assertIsNone(summary.output_file)
+
+    def test_concurrent_crews_get_their_own_agents(self):
+        """Test that two crews running at once never share an Agent object"""
+        import tempfile
+        import threading
+        from crewai import Crew
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        import main
+
+        barrier = threading.Barrier(2, timeout=10)
+        crew_agents = []
+
+        def kickoff(crew, inputs=None):
+            barrier.wait()  # Both crews are running at this point
+            crew_agents.append([task.agent for task in crew.tasks])
+            return "ok"
+
+        agents.use_llm(FakeListChatModel(responses=["Final Answer: ok"]))
+        with tempfile.TemporaryDirectory() as tmp, patch.dict(os.environ, {"OPENAI_API_KEY": ""}), \
+                patch.object(Crew, "kickoff", autospec=True, side_effect=kickoff), \
+                patch.object(main, "_task_excerpts", return_value={task: "" for task in main.TASK_CONTEXT_SHARES}):
+            paths = [os.path.join(tmp, f"report_{n}.pdf") for n in range(2)]
+            for path in paths:
+                open(path, "wb").close()
+            threads = [threading.Thread(target=main.run_crew, args=("Analyze", path)) for path in paths]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        first, second = crew_agents
+        self.assertIs(first[0], first[3])  # The analyst also writes the summary within a crew
+        self.assertFalse({id(agent) for agent in first} & {id(agent) for agent in second})
+
+    def test_unknown_agent(self):
+        """Test that unknown names still raise AttributeError"""
+        with self.assertRaises(AttributeError):
+            agents.portfolio_manager
+
 if __name__ == "__main__":
     unittest.main()
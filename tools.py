@@ -1,18 +1,86 @@
 import os
 import re
-from typing import Dict, List, Optional, Tuple
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 from pathlib import Path
 from datetime import datetime
 
 import PyPDF2
-from docx import Document
 from dotenv import load_dotenv
 from pydantic import Field, FilePath, HttpUrl, validator
 from crewai_tools import BaseTool
 from langchain_core.tools import tool
 
+from config import (
+    MAX_FILE_SIZE, PDF_EXTRACT_WORKERS, PDF_PARALLEL_MIN_PAGES, PDF_TABLE_EXTRACTION, RISK_RULES_PATH, TEXT_CACHE_ENABLED,
+    TEXT_CACHE_MAX_ENTRIES, TEXT_CACHE_MAX_BYTES, TEXT_CACHE_PATH, TEXT_CACHE_DISK_MAX_BYTES,
+    RETRIEVAL_TOP_K, RETRIEVAL_CHUNK_CHARS, RETRIEVAL_INDEX_CACHE_SIZE, PAGE_INDEX_ENABLED, LLM_MODEL
+)
+from cache import DocumentTextCache, LRUCache, file_content_hash
+from retrieval import BM25Index, chunk_pages
+from financial_metrics import MetricExtractor, MetricTable
+from page_index import INDEX_VERSION, PageIndex, build_page_index
+from context_packer import ContextPacker
+from scanner import PatternScanner
+from risk_rules import RiskCategory, RiskMatch, RiskRuleEngine
+from pdf_extraction import open_pdf, read_pages, extract_page_range, extract_pages_parallel, iter_pdf_pages, run_in_pool
+from pdf_tables import StatementTable, extract_statement_tables
+from docx_extraction import docx_texts, iter_docx_blocks
+from telemetry import annotate, span
+from metrics import STAGE_DURATION, record_extraction
+
 load_dotenv()
 
+# Extracted text shared by every tool instance; hit/miss counters live on .stats
+document_text_cache = DocumentTextCache(
+    max_entries=TEXT_CACHE_MAX_ENTRIES,
+    max_bytes=TEXT_CACHE_MAX_BYTES,
+    disk_path=TEXT_CACHE_PATH,
+    disk_max_bytes=TEXT_CACHE_DISK_MAX_BYTES
+) if TEXT_CACHE_ENABLED else None
+
+# Cache kind for PDF text; statement tables change the text, so they are cached apart
+PDF_TEXT_KIND = 'pdf-tables' if PDF_TABLE_EXTRACTION else 'pdf'
+
+# BM25 indexes of recently searched documents, keyed by content hash
+retrieval_indexes = LRUCache(max_entries=RETRIEVAL_INDEX_CACHE_SIZE)
+
+# Growth indicators
+GROWTH_INDICATORS = [
+    ('growth', 'Potential growth opportunity'),
+    ('expansion', 'Company is expanding operations'),
+    ('market share', 'Growing market share'),
+    ('new product', 'New product launch'),
+    ('acquisition', 'Recent or planned acquisitions'),
+    ('innovation', 'Innovation in products/services'),
+    ('partnership', 'Strategic partnerships formed'),
+]
+
+# Financial strength indicators
+STRENGTH_INDICATORS = [
+    ('profit margin', 'Healthy profit margins'),
+    ('cash flow', 'Strong cash flow generation'),
+    ('dividend', 'Consistent dividend payments'),
+    ('low debt', 'Low debt levels'),
+    ('efficiency', 'Operational efficiency improvements'),
+]
+
+# All indicator keywords, compiled once into a single-pass scanner
+INVESTMENT_SCANNER = PatternScanner(
+    [(('keyword', keyword), r'\b' + re.escape(keyword) + r'\b')
+     for keyword, _ in GROWTH_INDICATORS + STRENGTH_INDICATORS]
+)
+
+# Page sections (see page_index) each rule-based tool reads; 'other' keeps unclassified pages
+INVESTMENT_SECTIONS = ('statement', 'mdna', 'other')
+RISK_SECTIONS = ('risk_factors', 'mdna', 'notes', 'other')
+
+# Parses every mention of the metrics in financial_metrics.METRIC_DEFINITIONS into typed records
+metric_extractor = MetricExtractor()
+
+# Risk indicators loaded from rule packs; edits on disk are picked up without a restart
+risk_rule_engine = RiskRuleEngine(RISK_RULES_PATH)
+
 class FinancialDocumentTool(BaseTool):
     """Tool for reading and extracting text from financial documents (PDF, DOCX)."""
     
@@ -22,6 +90,8 @@ class FinancialDocumentTool(BaseTool):
     
     Args:
         file_path: Path to the financial document (PDF or DOCX)
+        query: Optional topic to search for; only the most relevant passages are returned
+        sections: Optional page sections to read (statement, mdna, risk_factors, notes, boilerplate, other)
         
     Returns:
         str: Extracted text content from the document
@@ -42,68 +112,334 @@ class FinancialDocumentTool(BaseTool):
         if ext not in ['.pdf', '.docx', '.doc']:
             raise ValueError(f"Unsupported file format: {ext}. Please provide a PDF or DOCX file.")
             
-        # Check file size (max 10MB)
-        max_size = 10 * 1024 * 1024  # 10MB
-        if os.path.getsize(v) > max_size:
-            raise ValueError(f"File size exceeds maximum limit of 10MB")
+        # Check file size (max 10MB by default)
+        if os.path.getsize(v) > MAX_FILE_SIZE:
+            raise ValueError(f"File size exceeds maximum limit of {MAX_FILE_SIZE // (1024 * 1024)}MB")
             
         return v
     
-    def _run(self) -> str:
-        """Read and process the financial document."""
+    def _run(self, query: Optional[str] = None, sections: Optional[List[str]] = None) -> str:
+        """Read and process the financial document, or only the passages relevant to ``query``.
+        
+        With ``sections``, only pages labelled with one of them are read (see page_index).
+        """
         try:
             self.validate_file_path(self.file_path)
-            
-            if self.file_path.lower().endswith('.pdf'):
-                return self._read_pdf()
-            else:  # .doc or .docx
-                return self._read_docx()
+            with span("tool.financial_document_reader", {
+                "document.path": self.file_path,
+                "document.size_bytes": os.path.getsize(self.file_path),
+                "retrieval.query": query
+            }):
+                if query:
+                    return self.relevant_excerpts(query, sections=sections)
+                return "\n\n".join(filter(None, self.section_pages(sections)))
                 
         except Exception as e:
             error_msg = f"Error processing document {self.file_path}: {str(e)}"
             print(error_msg)  # Log the error
             raise RuntimeError(error_msg) from e
     
+    def read_pages(self, in_pool: bool = False) -> List[str]:
+        """Return the text of each PDF page (or DOCX block: heading, paragraph or table), in document order.
+        
+        Results are cached by file content hash, so re-reading the same
+        document skips parsing entirely. With ``in_pool``, a document too
+        small for page-parallel extraction is parsed in one worker of the
+        extraction process pool, for callers that read several at once.
+        """
+        kind = 'pdf' if self.file_path.lower().endswith('.pdf') else 'docx'
+        cache_kind = self._cache_kind()
+        with span("document.read", {"document.type": kind}):
+            content_hash = file_content_hash(self.file_path) if document_text_cache is not None else None
+            
+            if content_hash is not None:
+                pages = document_text_cache.get_pages(content_hash, cache_kind)
+                annotate({"text_cache.hit": pages is not None})
+                if pages is not None:
+                    annotate({"document.pages": len(pages)})
+                    return pages
+            
+            start = time.perf_counter()
+            with STAGE_DURATION.time(stage="extraction"):
+                in_pool = in_pool and PDF_EXTRACT_WORKERS > 1
+                if kind == 'pdf':
+                    pages = self._read_pdf_pages(in_pool)
+                elif in_pool:
+                    pages = run_in_pool(docx_texts, self.file_path, workers=PDF_EXTRACT_WORKERS)
+                else:
+                    pages = self._read_docx_blocks()
+            record_extraction(kind, len(pages), time.perf_counter() - start)
+            annotate({"document.pages": len(pages)})
+            
+            if content_hash is not None:
+                try:
+                    document_text_cache.set_pages(content_hash, cache_kind, pages)
+                except Exception as e:
+                    print(f"Warning: Failed to cache extracted text for {self.file_path}: {str(e)}")
+            return pages
+    
+    def retrieval_index(self, pages: Optional[List[str]] = None) -> BM25Index:
+        """Return the BM25 index over this document's chunks, building it on first use.
+        
+        ``pages`` are the document's texts when the caller has already read them.
+        """
+        kind = 'pdf' if self.file_path.lower().endswith('.pdf') else 'docx'
+        key = f"{kind}:{file_content_hash(self.file_path)}"
+        index = retrieval_indexes.get(key)
+        if index is None:
+            chunks = chunk_pages(
+                self.read_pages() if pages is None else pages,
+                max_chars=RETRIEVAL_CHUNK_CHARS,
+                merge_pages=(kind == 'docx'),
+                first_source=1 if kind == 'pdf' else 0
+            )
+            index = BM25Index(chunks)
+            retrieval_indexes.set(key, index)
+        return index
+    
+    def page_index(self, pages: Optional[List[str]] = None) -> PageIndex:
+        """Section label of every page (or DOCX block), cached alongside the extracted text.
+        
+        ``pages`` are the document's texts when the caller has already read them.
+        """
+        content_hash = file_content_hash(self.file_path) if document_text_cache is not None else None
+        index_kind = f"{self._cache_kind()}:sections-v{INDEX_VERSION}"
+        if content_hash is not None:
+            labels = document_text_cache.get_pages(content_hash, index_kind)
+            if labels is not None:
+                return PageIndex(labels)
+        
+        with span("document.page_index"):
+            index = build_page_index(self.read_pages() if pages is None else pages)
+            annotate(index.counts())
+        if content_hash is not None:
+            try:
+                document_text_cache.set_pages(content_hash, index_kind, index.labels)
+            except Exception as e:
+                print(f"Warning: Failed to cache page index for {self.file_path}: {str(e)}")
+        return index
+    
+    def section_pages(self, sections: Optional[Sequence[str]] = None) -> List[str]:
+        """Texts of the pages labelled with any of ``sections``.
+        
+        Returns every page when ``sections`` is empty, PAGE_INDEX_ENABLED is
+        off, or no page carries those labels.
+        """
+        pages = self.read_pages()
+        positions = self._section_positions(sections)
+        return [pages[position] for position in positions] if positions else pages
+    
+    def metric_table(self, sections: Optional[Sequence[str]] = None) -> MetricTable:
+        """Metric mentions on the pages labelled with any of ``sections`` (all pages if none), by real page number."""
+        pages = self.read_pages()
+        positions = set(self._section_positions(sections))
+        if positions:
+            pages = [text if position in positions else "" for position, text in enumerate(pages)]
+        return metric_extractor.extract(pages, first_page=1 if self.file_path.lower().endswith('.pdf') else 0)
+    
+    def relevant_excerpts(self, query: str, top_k: int = RETRIEVAL_TOP_K,
+                          sections: Optional[Sequence[str]] = None) -> str:
+        """Return the ``top_k`` passages most relevant to ``query``, in document order.
+        
+        Documents short enough to fit in ``top_k`` passages are returned whole.
+        With ``sections``, passages are drawn from those pages only (see section_pages).
+        """
+        index = self.retrieval_index()
+        if len(index) <= top_k:
+            return "\n\n".join(chunk.text for chunk in index.chunks)
+        
+        within = None
+        positions = set(self._section_positions(sections))
+        if positions:
+            first_source = 1 if self.file_path.lower().endswith('.pdf') else 0
+            within = [chunk.index for chunk in index.chunks if chunk.source - first_source in positions] or None
+        
+        # Without any matching passage, fall back to the start of the document
+        chunks = index.top_chunks(query, top_k, within) or index.chunks[:top_k]
+        label = 'Page' if self.file_path.lower().endswith('.pdf') else 'Paragraph'
+        return "\n\n".join(f"[{label} {chunk.source}]\n{chunk.text}" for chunk in chunks)
+    
+    def iter_pages(self) -> Iterator[Tuple[int, str]]:
+        """Lazily yield ``(page_number, text)`` for each PDF page, starting at 1.
+        
+        Pages are parsed one at a time, so consumers can stream or stop early
+        with flat memory use. Unreadable pages are yielded empty with a
+        warning, as read_pages stores them, so page numbers are the same
+        whether or not the text cache already holds the document.
+        """
+        cached = self._cached_pages(PDF_TEXT_KIND)
+        if cached is not None:
+            yield from enumerate(cached, start=1)
+            return
+        
+        try:
+            for page_num, page_text, warning in iter_pdf_pages(self.file_path, PDF_TABLE_EXTRACTION):
+                if warning is not None:
+                    print(f"Warning: Could not read page {page_num + 1}: {warning}")
+                yield page_num + 1, page_text
+        except PyPDF2.errors.PdfReadError as e:
+            raise ValueError(f"Error reading PDF file: {str(e)}") from e
+    
+    def iter_paragraphs(self) -> Iterator[Tuple[int, str]]:
+        """Lazily yield ``(block_index, text)`` for each DOCX heading, paragraph and table.
+        
+        The document XML is streamed, so memory stays flat for large files.
+        """
+        cached = self._cached_pages('docx')
+        if cached is not None:
+            yield from enumerate(cached)
+            return
+        
+        for index, block in enumerate(iter_docx_blocks(self.file_path)):
+            yield index, block.text
+    
+    def iter_document(self) -> Iterator[Tuple[int, str]]:
+        """Yield PDF pages or DOCX blocks, depending on the file type."""
+        if self.file_path.lower().endswith('.pdf'):
+            return self.iter_pages()
+        return self.iter_paragraphs()
+    
+    def packed_context(self, query: str, budget: int, sections: Optional[Sequence[str]] = None,
+                       model: str = LLM_MODEL) -> str:
+        """Context for one task that fits in ``budget`` tokens; see packed_contexts."""
+        return self.packed_contexts({"task": (query, budget, sections)}, model)["task"]
+    
+    def packed_contexts(self, requests: Dict[str, Tuple[str, int, Optional[Sequence[str]]]],
+                        model: str = LLM_MODEL) -> Dict[str, str]:
+        """Contexts for several tasks, each fitting its own budget, from one read of the document.
+        
+        ``requests`` maps a task name to ``(query, budget, sections)``. Each
+        budget is filled in priority order: first a digest of the key figures,
+        then the statement pages (when ``sections`` includes 'statement'),
+        then the passages that rank best for ``query`` within ``sections``
+        until the budget is spent. Empty ``sections`` give the key figures only.
+        The pages, key figures and indexes are built once for all tasks.
+        """
+        pages = self.read_pages()
+        is_pdf = self.file_path.lower().endswith('.pdf')
+        first_source = 1 if is_pdf else 0
+        label = 'Page' if is_pdf else 'Paragraph'
+        
+        summary = metric_extractor.extract(pages, first_page=first_source).summary()
+        key_figures = "\n".join(
+            f"- {name}: {info['first']}" + (f" ({info['count']} mentions)" if info['count'] > 1 else "")
+            for name, info in summary.items()
+        )
+        page_index = self.page_index(pages) if PAGE_INDEX_ENABLED else None
+        statement_positions = page_index.positions(['statement']) if page_index is not None else []
+        retrieval_index = None
+        
+        contexts = {}
+        for task, (query, budget, sections) in requests.items():
+            packer = ContextPacker(budget, model)
+            if key_figures:
+                packer.add(key_figures, "Key figures", tier=0)
+            if sections is not None and not sections:
+                contexts[task] = packer.text()
+                continue
+            
+            statement_pages = set()
+            if sections is None or 'statement' in sections:
+                statement_pages = set(statement_positions)
+                for position in statement_positions:
+                    if packer.full:
+                        break
+                    packer.add(pages[position], f"{label} {position + first_source}", tier=1, position=position,
+                               truncate=True)
+            
+            if retrieval_index is None:
+                retrieval_index = self.retrieval_index(pages)
+            positions = set(page_index.positions(sections)) if page_index is not None and sections else set()
+            positions -= statement_pages
+            within = [chunk.index for chunk in retrieval_index.chunks
+                      if (not positions or chunk.source - first_source in positions)
+                      and chunk.source - first_source not in statement_pages]
+            for chunk, _ in retrieval_index.search(query, len(retrieval_index), within):
+                if packer.full:
+                    break
+                packer.add(chunk.text, f"{label} {chunk.source}", tier=2, position=chunk.index)
+            contexts[task] = packer.text()
+        return contexts
+    
+    def _section_positions(self, sections: Optional[Sequence[str]]) -> List[int]:
+        if not sections or not PAGE_INDEX_ENABLED:
+            return []
+        return self.page_index().positions(sections)
+    
+    def _cache_kind(self) -> str:
+        return PDF_TEXT_KIND if self.file_path.lower().endswith('.pdf') else 'docx'
+    
+    def _cached_pages(self, kind: str) -> Optional[List[str]]:
+        if document_text_cache is None:
+            return None
+        return document_text_cache.get_pages(file_content_hash(self.file_path), kind)
+    
     def _read_pdf(self) -> str:
         """Extract text from PDF file with improved error handling and formatting."""
+        return "\n\n".join(filter(None, self._read_pdf_pages()))
+    
+    def _read_pdf_pages(self, in_pool: bool = False) -> List[str]:
+        """Extract the text of every PDF page; unreadable pages are left empty.
+        
+        Documents with at least PDF_PARALLEL_MIN_PAGES pages are split across a
+        process pool; smaller ones are read serially, in one pool worker with
+        ``in_pool`` or else in this process.
+        """
         try:
-            text = []
-            with open(self.file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
+            with span("pdf.extract"), open(self.file_path, 'rb') as file:
+                reader = open_pdf(file)
+                page_count = len(reader.pages)
+                parallel = PDF_EXTRACT_WORKERS > 1 and page_count >= PDF_PARALLEL_MIN_PAGES
                 
-                # Check if PDF is encrypted
-                if reader.is_encrypted:
-                    # Try empty password as many PDFs have empty owner passwords
-                    try:
-                        reader.decrypt('')
-                    except Exception as e:
-                        raise ValueError("Cannot read encrypted PDF file") from e
-                
-                for page_num in range(len(reader.pages)):
-                    try:
-                        page = reader.pages[page_num]
-                        page_text = page.extract_text() or ""
-                        text.append(page_text.strip())
-                    except Exception as e:
-                        print(f"Warning: Could not read page {page_num + 1}: {str(e)}")
-                        continue
+                if parallel:
+                    pages = extract_pages_parallel(
+                        self.file_path, page_count, PDF_EXTRACT_WORKERS, PDF_TABLE_EXTRACTION
+                    )
+                elif in_pool:
+                    pages = run_in_pool(extract_page_range, self.file_path, 0, page_count, PDF_TABLE_EXTRACTION,
+                                        workers=PDF_EXTRACT_WORKERS)
+                else:
+                    pages = read_pages(reader, 0, page_count, PDF_TABLE_EXTRACTION)
+                annotate({
+                    "pdf.pages": page_count,
+                    "pdf.parallel": parallel,
+                    "pdf.failed_pages": sum(1 for _, _, warning in pages if warning is not None)
+                })
+            
+            text = []
+            for page_num, page_text, warning in pages:
+                if warning is not None:
+                    print(f"Warning: Could not read page {page_num + 1}: {warning}")
+                text.append(page_text)
                         
-            return "\n\n".join(filter(None, text))
+            return text
             
-        except PyPDF2.PdfReadError as e:
+        except PyPDF2.errors.PdfReadError as e:
+            raise ValueError(f"Error reading PDF file: {str(e)}") from e
+            
+    def statement_tables(self) -> List[StatementTable]:
+        """Income statement, balance sheet and cash flow tables of a PDF, rebuilt from text positions.
+        
+        Each table's ``frame`` is a pandas DataFrame; DOCX files have none.
+        """
+        if not self.file_path.lower().endswith('.pdf'):
+            return []
+        try:
+            return extract_statement_tables(self.file_path)
+        except PyPDF2.errors.PdfReadError as e:
             raise ValueError(f"Error reading PDF file: {str(e)}") from e
             
     def _read_docx(self) -> str:
         """Extract text from DOCX file with improved error handling."""
-        try:
-            doc = Document(self.file_path)
-            return "\n\n".join([
-                para.text.strip() 
-                for para in doc.paragraphs 
-                if para.text.strip()
-            ])
-        except Exception as e:
-            raise ValueError(f"Error reading DOCX file: {str(e)}") from e
+        return "\n\n".join(self._read_docx_blocks())
+    
+    def _read_docx_blocks(self) -> List[str]:
+        """Extract the headings, paragraphs and tables of a DOCX file, one text per block.
+        
+        Table rows are kept as lines of " | "-separated cells; use
+        docx_extraction.iter_docx_blocks for the cells themselves.
+        """
+        return docx_texts(self.file_path)
 
 
 class InvestmentAnalysisTool(BaseTool):
@@ -132,95 +468,74 @@ class InvestmentAnalysisTool(BaseTool):
             if not self.document_text.strip():
                 return "No text content provided for analysis."
                 
-            # Extract key metrics and indicators
-            metrics = self._extract_financial_metrics()
-            opportunities = self._identify_opportunities()
-            
-            # Generate analysis report
-            report = [
-                "# Investment Analysis Report\n",
-                "## Key Financial Metrics"
-            ]
+            # Typed metric records, and all indicator keywords from a single scan
+            with span("tool.investment_analysis", {"document.length": len(self.document_text)}):
+                metrics = self._extract_financial_metrics()
+                opportunities = self._identify_opportunities(self._scan())
+                annotate({"analysis.metrics": len(metrics), "analysis.opportunities": len(opportunities)})
             
-            if metrics:
-                for metric, value in metrics.items():
-                    report.append(f"- {metric}: {value}")
-            else:
-                report.append("No specific financial metrics found in the document.")
-                
-            report.append("\n## Investment Opportunities")
-            if opportunities:
-                for opp in opportunities:
-                    report.append(f"- {opp}")
-            else:
-                report.append("No specific investment opportunities identified.")
-                
-            return "\n".join(report)
+            return self._format_report(metrics, opportunities)
             
         except Exception as e:
             error_msg = f"Error in investment analysis: {str(e)}"
             print(error_msg)
             return error_msg
     
-    def _extract_financial_metrics(self) -> Dict[str, str]:
-        """Extract key financial metrics from the document text."""
-        metrics = {}
+    def _format_report(self, metrics: Dict[str, str], opportunities: List[str]) -> str:
+        """Render extracted metrics and opportunities as a markdown report."""
+        report = [
+            "# Investment Analysis Report\n",
+            "## Key Financial Metrics"
+        ]
         
-        # Common financial metrics patterns
-        patterns = {
-            'Revenue': r'(?:revenue|sales)[\s:]*[\$\d\.\s]+(?:million|billion|M|B)?',
-            'Net Income': r'net income[\s:]*[\$\d\.\s-]+(?:million|billion|M|B)?',
-            'EBITDA': r'EBITDA[\s:]*[\$\d\.\s-]+(?:million|billion|M|B)?',
-            'EPS': r'EPS[\s:]*[\$\d\.\s-]+',
-            'P/E Ratio': r'P[/\s]?E[\s:]*[\d\.]+',
-            'Dividend Yield': r'dividend yield[\s:]*[\d\.]+%?',
-            'ROE': r'return on equity[\s:]*[\d\.]+%?',
-            'Debt to Equity': r'debt[\s-]to[\s-]equity[\s:]*[\d\.]+',
-        }
+        if metrics:
+            for metric, value in metrics.items():
+                report.append(f"- {metric}: {value}")
+        else:
+            report.append("No specific financial metrics found in the document.")
+            
+        report.append("\n## Investment Opportunities")
+        if opportunities:
+            for opp in opportunities:
+                report.append(f"- {opp}")
+        else:
+            report.append("No specific investment opportunities identified.")
+            
+        return "\n".join(report)
+    
+    def _scan(self) -> Dict[Tuple[str, str], re.Match]:
+        """Find every indicator keyword in one pass over the text."""
+        return INVESTMENT_SCANNER.first_matches(self.document_text)
+    
+    def metric_table(self) -> MetricTable:
+        """Every metric mention in the document text, parsed into typed records.
         
-        for name, pattern in patterns.items():
-            matches = re.finditer(pattern, self.document_text, re.IGNORECASE)
-            for match in matches:
-                metrics[name] = match.group(0)
-                break  # Just get the first match for each metric
-                
+        The text carries no page breaks, so every record is on page 1; use
+        FinancialDocumentTool.metric_table for page numbers.
+        """
+        return metric_extractor.extract([self.document_text])
+    
+    def _extract_financial_metrics(self, table: Optional[MetricTable] = None) -> Dict[str, str]:
+        """Extract key financial metrics from the document text."""
+        table = self.metric_table() if table is None else table
+        
+        # The first value of each metric, in definition order, and how often it is mentioned
+        metrics = {}
+        for name, summary in table.summary().items():
+            count = summary['count']
+            metrics[name] = summary['first'] + (f" ({count} mentions)" if count > 1 else "")
         return metrics
     
-    def _identify_opportunities(self) -> List[str]:
+    def _identify_opportunities(self, matches: Optional[Dict[Tuple[str, str], re.Match]] = None) -> List[str]:
         """Identify potential investment opportunities."""
-        opportunities = []
+        matches = self._scan() if matches is None else matches
         
-        # Look for growth indicators
-        growth_indicators = [
-            ('growth', 'Potential growth opportunity'),
-            ('expansion', 'Company is expanding operations'),
-            ('market share', 'Growing market share'),
-            ('new product', 'New product launch'),
-            ('acquisition', 'Recent or planned acquisitions'),
-            ('innovation', 'Innovation in products/services'),
-            ('partnership', 'Strategic partnerships formed'),
-        ]
-        
-        for keyword, opportunity in growth_indicators:
-            if re.search(r'\b' + re.escape(keyword) + r'\b', 
-                        self.document_text, re.IGNORECASE):
-                opportunities.append(opportunity)
-                
-        # Look for financial strength indicators
-        strength_indicators = [
-            ('profit margin', 'Healthy profit margins'),
-            ('cash flow', 'Strong cash flow generation'),
-            ('dividend', 'Consistent dividend payments'),
-            ('low debt', 'Low debt levels'),
-            ('efficiency', 'Operational efficiency improvements'),
+        opportunities = [
+            description
+            for keyword, description in GROWTH_INDICATORS + STRENGTH_INDICATORS
+            if ('keyword', keyword) in matches
         ]
-        
-        for keyword, strength in strength_indicators:
-            if re.search(r'\b' + re.escape(keyword) + r'\b', 
-                        self.document_text, re.IGNORECASE):
-                opportunities.append(strength)
-                
-        return list(set(opportunities))  # Remove duplicates
+        return list(dict.fromkeys(opportunities))  # Remove duplicates, keep order
 
 
 class RiskAssessmentTool(BaseTool):
@@ -249,113 +564,52 @@ class RiskAssessmentTool(BaseTool):
             if not self.document_text.strip():
                 return "No text content provided for risk assessment."
                 
-            # Identify different types of risks
-            financial_risks = self._identify_financial_risks()
-            operational_risks = self._identify_operational_risks()
-            market_risks = self._identify_market_risks()
-            
-            # Generate risk assessment report
-            report = ["# Risk Assessment Report\n"]
-            
-            # Financial Risks
-            report.append("## Financial Risks")
-            if financial_risks:
-                for risk in financial_risks:
-                    report.append(f"- {risk}")
-            else:
-                report.append("No significant financial risks identified.")
-                
-            # Operational Risks
-            report.append("\n## Operational Risks")
-            if operational_risks:
-                for risk in operational_risks:
-                    report.append(f"- {risk}")
-            else:
-                report.append("No significant operational risks identified.")
-                
-            # Market Risks
-            report.append("\n## Market Risks")
-            if market_risks:
-                for risk in market_risks:
-                    report.append(f"- {risk}")
-            else:
-                report.append("No significant market risks identified.")
-                
-            # Overall Risk Assessment
-            report.append("\n## Overall Risk Assessment")
-            risk_level, risk_summary = self._assess_overall_risk(
-                financial_risks, operational_risks, market_risks)
-                
-            report.append(f"**Risk Level:** {risk_level}")
-            report.append(f"**Summary:** {risk_summary}")
+            # Identify every category of risk in a single pass
+            with span("tool.risk_assessment", {"document.length": len(self.document_text)}):
+                rule_set = risk_rule_engine.rule_set
+                risks = rule_set.classify(self.document_text)
+                annotate({"analysis.risks": sum(len(matches) for matches in risks.values())})
             
-            return "\n".join(report)
+            return self._format_report(rule_set.categories, risks)
             
         except Exception as e:
             error_msg = f"Error in risk assessment: {str(e)}"
             print(error_msg)
             return error_msg
     
-    def _identify_financial_risks(self) -> List[str]:
-        """Identify financial risks."""
-        financial_risk_indicators = [
-            (r'debt[\s-]to[\s-]equity', 'High debt-to-equity ratio'),
-            (r'interest[\s-]coverage', 'Low interest coverage ratio'),
-            (r'liquidity[\s-]crisis', 'Potential liquidity crisis'),
-            (r'going[\s-]concern', 'Going concern issues'),
-            (r'default', 'Risk of default on obligations'),
-            (r'credit[\s-]rating[\s-]downgrade', 'Credit rating downgrade risk'),
-        ]
+    def _format_report(self, categories: List[RiskCategory],
+                       risks: Dict[str, List[RiskMatch]]) -> str:
+        """Render classified risks and the overall assessment as a markdown report."""
+        report = ["# Risk Assessment Report"]
         
-        return self._find_risks(financial_risk_indicators)
-    
-    def _identify_operational_risks(self) -> List[str]:
-        """Identify operational risks."""
-        operational_risk_indicators = [
-            (r'cyber[\s-]security', 'Cybersecurity vulnerabilities'),
-            (r'data[\s-]breach', 'Data breach risks'),
-            (r'supply[\s-]chain', 'Supply chain disruptions'),
-            (r'regulatory[\s-]compliance', 'Regulatory compliance issues'),
-            (r'key[\s-]person[\s-]risk', 'Key person risk'),
-            (r'operational[\s-]disruption', 'Operational disruption risks'),
-        ]
-        
-        return self._find_risks(operational_risk_indicators)
-    
-    def _identify_market_risks(self) -> List[str]:
-        """Identify market risks."""
-        market_risk_indicators = [
-            (r'market[\s-]volatility', 'Market volatility'),
-            (r'economic[\s-]downturn', 'Economic downturn risks'),
-            (r'competition', 'Increased competition'),
-            (r'commodity[\s-]prices', 'Commodity price fluctuations'),
-            (r'foreign[\s-]exchange', 'Foreign exchange risk'),
-            (r'interest[\s-]rate', 'Interest rate risk'),
-        ]
+        for category in categories:
+            report.append(f"\n## {category.title}")
+            if risks[category.name]:
+                for risk in risks[category.name]:
+                    mentions = "mention" if risk.count == 1 else "mentions"
+                    report.append(f"- {risk.description} ({risk.count} {mentions})")
+            else:
+                report.append(f"No significant {category.title.lower()} identified.")
+            
+        # Overall Risk Assessment
+        report.append("\n## Overall Risk Assessment")
+        risk_level, risk_summary = self._assess_overall_risk(categories, risks)
+            
+        report.append(f"**Risk Level:** {risk_level}")
+        report.append(f"**Summary:** {risk_summary}")
         
-        return self._find_risks(market_risk_indicators)
-    
-    def _find_risks(self, risk_indicators: List[Tuple[str, str]]) -> List[str]:
-        """Helper method to find risks based on indicators."""
-        risks = []
-        for pattern, risk_description in risk_indicators:
-            if re.search(pattern, self.document_text, re.IGNORECASE):
-                risks.append(risk_description)
-        return risks
-    
-    def _assess_overall_risk(self, financial_risks: List[str], 
-                           operational_risks: List[str],
-                           market_risks: List[str]) -> Tuple[str, str]:
+        return "\n".join(report)
+    
+    def _assess_overall_risk(self, categories: List[RiskCategory],
+                           risks: Dict[str, List[RiskMatch]]) -> Tuple[str, str]:
         """Assess overall risk level based on identified risks."""
-        total_risks = len(financial_risks) + len(operational_risks) + len(market_risks)
+        total_risks = sum(len(matches) for matches in risks.values())
         
         if total_risks == 0:
             return "Low", "No significant risks identified in the document."
         
-        risk_score = 0
-        risk_score += len(financial_risks) * 1.5  # Financial risks are weighted more heavily
-        risk_score += len(operational_risks) * 1.0
-        risk_score += len(market_risks) * 1.0
+        # Categories are weighted by their rule pack (financial risks more heavily)
+        risk_score = sum(len(risks[category.name]) * category.weight for category in categories)
         
         if risk_score >= 5:
             return "High", "Significant risks identified across multiple categories that could materially impact the company's performance."